@@ -29,6 +29,7 @@ from utils.display import (
 )
 from utils.auth import get_auth_manager, get_user_context, require_auth
 from utils.session import auto_restore_dataset_selection, save_dataset_selection
+from utils.status import calculate_status_buckets, MATRIX_RULES
 
 # Import comprehensive results validation
 from components.comprehensive_results import validate_comprehensive_results
@@ -252,15 +253,15 @@ def load_dataset_combination(pharmacy_tag: str, states_tag: str, validated_tag:
                 else:
                     st.success(f"✅ Computed {result.get('scores_computed', 0)} scores")
         
-        # Get comprehensive results
-        results = client.get_comprehensive_results(states_tag, pharmacy_tag, validated_tag or "")
-        
-        if isinstance(results, dict) and 'error' in results:
-            st.error(f"Failed to load data: {results['error']}")
+        # Get comprehensive results, paged so large dataset pairs don't time out
+        try:
+            results = client.get_comprehensive_results_frame(states_tag, pharmacy_tag, validated_tag or "")
+        except Exception as e:
+            st.error(f"Failed to load data: {e}")
             return False
         
         # Store in session state (compatible with existing code)
-        st.session_state.comprehensive_results = pd.DataFrame(results)
+        st.session_state.comprehensive_results = results
         st.session_state.loaded_tags = {
             'pharmacies': pharmacy_tag,
             'states': states_tag, 
@@ -1435,25 +1436,7 @@ def render_states_dashboard():
             return
         
         # Calculate status buckets (same as Results Matrix)
-        def calculate_status_simple(row):
-            if row.get('result_status') == 'no_results_found':
-                return 'not found'
-            elif pd.isna(row.get('result_id')):
-                return 'no data'
-            elif pd.notna(row.get('override_type')):
-                return 'validated'  
-            elif pd.notna(row.get('score_overall')):
-                score = float(row['score_overall'])
-                if score >= 85:
-                    return 'match'
-                elif score >= 60:
-                    return 'weak match'
-                else:
-                    return 'no match'
-            else:
-                return 'no data'
-        
-        results_df['status_bucket'] = results_df.apply(calculate_status_simple, axis=1)
+        results_df['status_bucket'] = calculate_status_buckets(results_df, MATRIX_RULES)
         
         # Prepare grid data
         grid_df = prepare_states_grid(results_df, loaded_states)
@@ -1862,26 +1845,7 @@ def render_results_matrix():
         return
     
     # Update status buckets using simple validation check
-    # Simple status calculation (replacing calculate_status_simple)
-    def calculate_status_simple(row):
-        if row.get('result_status') == 'no_results_found':
-            return 'not found'
-        elif pd.isna(row.get('result_id')):
-            return 'no data'
-        elif pd.notna(row.get('override_type')):
-            return 'validated'  
-        elif pd.notna(row.get('score_overall')):
-            score = float(row['score_overall'])
-            if score >= 85:
-                return 'match'
-            elif score >= 60:
-                return 'weak match'  # Fixed: use space not underscore
-            else:
-                return 'no match'
-        else:
-            return 'no data'  # Fixed: use consistent naming
-    
-    results_df['status_bucket'] = results_df.apply(calculate_status_simple, axis=1)
+    results_df['status_bucket'] = calculate_status_buckets(results_df, MATRIX_RULES)
     
     # Log status results for validation records
     if 'override_type' in results_df.columns:
@@ -11,7 +11,7 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-from supabase_client import SupabaseClient
+from supabase_client import RPC_PAGE_SIZE, SupabaseClient
 
 
 class UnifiedClient:
@@ -38,6 +38,10 @@ class UnifiedClient:
         """Test connection to Supabase"""
         return self.supabase_client.test_connection()
     
+    def get_latency_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-endpoint request latency histogram (slowest total first)"""
+        return self.supabase_client.get_latency_stats()
+    
     def get_datasets(self) -> List[Dict]:
         """Get datasets from Supabase"""
         return self.supabase_client.get_datasets_supabase()
@@ -62,6 +66,38 @@ class UnifiedClient:
         """Get comprehensive results from Supabase"""
         return self.supabase_client.get_comprehensive_results_supabase(states_tag, pharmacies_tag, validated_tag)
     
+    def iter_comprehensive_results(self, states_tag: str, pharmacies_tag: str, validated_tag: str = "",
+                                   page_size: int = RPC_PAGE_SIZE):
+        """Yield comprehensive results in pages of at most page_size rows (whole pharmacy/state pairs)"""
+        return self.supabase_client.iter_comprehensive_results(states_tag, pharmacies_tag, validated_tag, page_size)
+    
+    def get_comprehensive_results_frame(self, states_tag: str, pharmacies_tag: str, validated_tag: str = "",
+                                        page_size: int = RPC_PAGE_SIZE) -> pd.DataFrame:
+        """
+        Get comprehensive results as a DataFrame built page by page.
+        
+        Each page is converted to a DataFrame as it arrives, so the full
+        result set is never held as a list of dicts.
+        """
+        frames = [
+            pd.DataFrame(page)
+            for page in self.iter_comprehensive_results(states_tag, pharmacies_tag, validated_tag, page_size)
+        ]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+    
+    def get_missing_score_pairs(self, states_tag: str, pharmacies_tag: str, limit: int = RPC_PAGE_SIZE,
+                                after_pharmacy_id: int = None, after_result_id: int = None) -> List[Dict]:
+        """Get one keyset page of unscored pharmacy/result pairs"""
+        return self.supabase_client.get_missing_score_pairs(
+            states_tag, pharmacies_tag, limit, after_pharmacy_id, after_result_id
+        )
+    
+    def iter_missing_score_pairs(self, states_tag: str, pharmacies_tag: str, page_size: int = RPC_PAGE_SIZE):
+        """Yield pages of unscored pharmacy/result pairs"""
+        return self.supabase_client.iter_missing_score_pairs(states_tag, pharmacies_tag, page_size)
+    
     def get_table_data(self, table: str, limit: int = 1000, filters: Dict = None, select: str = None) -> List[Dict]:
         """Get data from any table"""
         result = self.supabase_client.get_table_data_via_rest(table, limit=limit, filters=filters)
@@ -89,7 +125,8 @@ class UnifiedClient:
                 "/validated_overrides": {},
                 "/match_scores": {},
                 "/app_users": {},
-                "/rpc/get_all_results_with_context": {}
+                "/rpc/get_all_results_with_context": {},
+                "/rpc/get_missing_score_pairs": {}
             }
         }
     
@@ -128,7 +165,6 @@ class UnifiedClient:
     def update_table_record(self, table: str, record_id: int, data: Dict) -> Dict:
         """Update a record in any table"""
         try:
-            import requests
             url = f"{self.supabase_client.url}/rest/v1/{table}"
             
             headers = self.supabase_client.headers.copy()
@@ -136,11 +172,11 @@ class UnifiedClient:
             
             params = {'id': f'eq.{record_id}'}
             
-            response = requests.patch(url, 
-                                     headers=headers,
-                                     params=params,
-                                     json=data,
-                                     timeout=10)
+            response = self.supabase_client.session.patch(url, 
+                                                         headers=headers,
+                                                         params=params,
+                                                         json=data,
+                                                         timeout=10)
             
             if response.status_code in [200, 204]:
                 return {"success": True}
@@ -152,15 +188,14 @@ class UnifiedClient:
     def delete_table_record(self, table: str, record_id: int) -> Dict:
         """Delete a record from any table"""
         try:
-            import requests
             url = f"{self.supabase_client.url}/rest/v1/{table}"
             
             params = {'id': f'eq.{record_id}'}
             
-            response = requests.delete(url, 
-                                      headers=self.supabase_client.headers,
-                                      params=params,
-                                      timeout=10)
+            response = self.supabase_client.session.delete(url, 
+                                                          headers=self.supabase_client.headers,
+                                                          params=params,
+                                                          timeout=10)
             
             if response.status_code in [200, 204]:
                 return {"success": True}
@@ -203,44 +238,41 @@ class UnifiedClient:
     def trigger_scoring(self, states_tag: str, pharmacies_tag: str, batch_size: int = 200) -> Dict[str, Any]:
         """Trigger client-side scoring computation for dataset pair"""
         try:
-            # Step 1: Get all results (including those without scores)
-            results = self.get_comprehensive_results(states_tag, pharmacies_tag, "")
-            if isinstance(results, dict) and 'error' in results:
-                return results
+            scores_computed = 0
             
-            # Step 2: Find pharmacy/result pairs that need scoring
-            missing_pairs = []
-            for result in results:
-                if result.get('result_id') and result.get('score_overall') is None:
-                    missing_pairs.append({
-                        'pharmacy_id': result['pharmacy_id'],
-                        'result_id': result['result_id'],
-                        'pharmacy_address': result.get('pharmacy_address', ''),
-                        'pharmacy_city': result.get('pharmacy_city', ''),
-                        'pharmacy_state': result.get('pharmacy_state', ''),
-                        'pharmacy_zip': result.get('pharmacy_zip', ''),
-                        'result_address': result.get('result_address', ''),
-                        'result_city': result.get('result_city', ''),
-                        'result_state': result.get('result_state', ''),
-                        'result_zip': result.get('result_zip', '')
-                    })
+            # Step 1: Page through pharmacy/result pairs that need scoring (server-side anti-join)
+            for page in self.iter_missing_score_pairs(states_tag, pharmacies_tag, page_size=batch_size):
+                missing_pairs = [{
+                    'pharmacy_id': row['pharmacy_id'],
+                    'result_id': row['result_id'],
+                    'pharmacy_address': row.get('pharmacy_address', ''),
+                    'pharmacy_suite': row.get('pharmacy_suite'),
+                    'pharmacy_city': row.get('pharmacy_city', ''),
+                    'pharmacy_state': row.get('pharmacy_state', ''),
+                    'pharmacy_zip': row.get('pharmacy_zip', ''),
+                    'result_address': row.get('result_address', ''),
+                    'result_city': row.get('result_city', ''),
+                    'result_state': row.get('result_state', ''),
+                    'result_zip': row.get('result_zip', '')
+                } for row in page]
+                
+                # Step 2: Compute scores client-side using scoring_plugin.py
+                computed_scores = self._compute_scores_client_side(missing_pairs, states_tag, pharmacies_tag)
+                
+                # Step 3: Insert scores via API
+                if computed_scores:
+                    insert_result = self._insert_scores(computed_scores)
+                    if 'error' in insert_result:
+                        return insert_result
+                    scores_computed += len(computed_scores)
             
-            if not missing_pairs:
+            if not scores_computed:
                 return {'success': True, 'message': 'No scoring needed - all pairs already scored', 'scores_computed': 0}
             
-            # Step 3: Compute scores client-side using scoring_plugin.py
-            computed_scores = self._compute_scores_client_side(missing_pairs, states_tag, pharmacies_tag)
-            
-            # Step 4: Insert scores via API
-            if computed_scores:
-                insert_result = self._insert_scores(computed_scores)
-                if 'error' in insert_result:
-                    return insert_result
-            
             return {
                 'success': True, 
-                'message': f'Computed {len(computed_scores)} scores client-side',
-                'scores_computed': len(computed_scores)
+                'message': f'Computed {scores_computed} scores client-side',
+                'scores_computed': scores_computed
             }
             
         except Exception as e:
@@ -257,59 +289,57 @@ class UnifiedClient:
         if str(project_root) not in sys.path:
             sys.path.insert(0, str(project_root))
         
-        try:
-            from scoring_plugin import Address, match_addresses
-        except ImportError as e:
-            return []  # Return empty if can't import plugin
+        # Import and scoring errors propagate: trigger_scoring reports them, and its
+        # keyset has already moved past these pairs, so an empty result would lose them
+        from scoring_plugin import SCORING_VERSION, address_fingerprints, match_addresses_batch
         
         # Get dataset IDs for the scores
         states_id = self._get_dataset_id(states_tag, 'states')
         pharmacies_id = self._get_dataset_id(pharmacies_tag, 'pharmacies')
         
+        if not missing_pairs:
+            return []
+        
+        # Build columnar address inputs for the vectorized scorer
+        result_addrs = {
+            'address': [pair['result_address'] for pair in missing_pairs],
+            'city': [pair['result_city'] for pair in missing_pairs],
+            'state': [pair['result_state'] for pair in missing_pairs],
+            'zip': [pair['result_zip'] for pair in missing_pairs]
+        }
+        pharmacy_addrs = {
+            'address': [pair['pharmacy_address'] for pair in missing_pairs],
+            'suite': [pair.get('pharmacy_suite') for pair in missing_pairs],
+            'city': [pair['pharmacy_city'] for pair in missing_pairs],
+            'state': [pair['pharmacy_state'] for pair in missing_pairs],
+            'zip': [pair['pharmacy_zip'] for pair in missing_pairs]
+        }
+        
+        street_scores, csz_scores, overall_scores = match_addresses_batch(result_addrs, pharmacy_addrs)
+        fingerprints = address_fingerprints(result_addrs, pharmacy_addrs)
+        
         computed_scores = []
         
-        for pair in missing_pairs:
-            try:
-                # Create address objects
-                pharmacy_addr = Address(
-                    address=pair['pharmacy_address'],
-                    suite=None,
-                    city=pair['pharmacy_city'],
-                    state=pair['pharmacy_state'],
-                    zip=pair['pharmacy_zip']
-                )
-                
-                result_addr = Address(
-                    address=pair['result_address'],
-                    suite=None,
-                    city=pair['result_city'],
-                    state=pair['result_state'],
-                    zip=pair['result_zip']
-                )
-                
-                # Compute scores using plugin
-                street_score, csz_score, overall_score = match_addresses(result_addr, pharmacy_addr)
-                
-                # Prepare score record
-                computed_scores.append({
-                    'states_dataset_id': states_id,
-                    'pharmacies_dataset_id': pharmacies_id,
-                    'pharmacy_id': pair['pharmacy_id'],
-                    'result_id': pair['result_id'],
-                    'score_overall': round(overall_score, 2),
-                    'score_street': round(street_score, 2),
-                    'score_city_state_zip': round(csz_score, 2),
-                    'scoring_meta': {
-                        'algorithm': 'v1.0',
-                        'computed_client_side': True,
-                        'states_tag': states_tag,
-                        'pharmacies_tag': pharmacies_tag
-                    }
-                })
-                
-            except Exception as e:
-                # Skip this pair if scoring fails
-                continue
+        for pair, street_score, csz_score, overall_score, fingerprint in zip(
+                missing_pairs, street_scores, csz_scores, overall_scores, fingerprints):
+            # Prepare score record
+            computed_scores.append({
+                'states_dataset_id': states_id,
+                'pharmacies_dataset_id': pharmacies_id,
+                'pharmacy_id': pair['pharmacy_id'],
+                'result_id': pair['result_id'],
+                'score_overall': round(float(overall_score), 2),
+                'score_street': round(float(street_score), 2),
+                'score_city_state_zip': round(float(csz_score), 2),
+                'scoring_version': SCORING_VERSION,
+                'input_fingerprint': fingerprint,
+                'scoring_meta': {
+                    'algorithm': SCORING_VERSION,
+                    'computed_client_side': True,
+                    'states_tag': states_tag,
+                    'pharmacies_tag': pharmacies_tag
+                }
+            })
         
         return computed_scores
     
@@ -319,7 +349,6 @@ class UnifiedClient:
             return {'success': True, 'inserted': 0}
         
         try:
-            import requests
             url = f"{self.supabase_client.url}/rest/v1/match_scores"
             
             # Convert scoring_meta to JSON string for database
@@ -327,10 +356,10 @@ class UnifiedClient:
                 if isinstance(score.get('scoring_meta'), dict):
                     score['scoring_meta'] = json.dumps(score['scoring_meta'])
             
-            response = requests.post(url, 
-                                   headers=self.supabase_client.headers,
-                                   json=scores,
-                                   timeout=30)
+            response = self.supabase_client.session.post(url, 
+                                                       headers=self.supabase_client.headers,
+                                                       json=scores,
+                                                       timeout=30)
             
             if response.status_code in [200, 201]:
                 return {'success': True, 'inserted': len(scores)}
@@ -350,16 +379,15 @@ class UnifiedClient:
             return {'error': 'Dataset IDs not found'}
         
         try:
-            import requests
             url = f"{self.supabase_client.url}/rest/v1/match_scores"
             params = {
                 'states_dataset_id': f'eq.{states_id}',
                 'pharmacies_dataset_id': f'eq.{pharmacies_id}'
             }
-            response = requests.delete(url, 
-                                     headers=self.supabase_client.headers, 
-                                     params=params, 
-                                     timeout=30)
+            response = self.supabase_client.session.delete(url, 
+                                                         headers=self.supabase_client.headers, 
+                                                         params=params, 
+                                                         timeout=30)
             if response.status_code in [200, 204]:
                 return {'success': True, 'message': 'Scores cleared'}
             else:
@@ -416,13 +444,12 @@ class UnifiedClient:
                     record[target_field] = value
         
         try:
-            import requests
             url = f"{self.supabase_client.url}/rest/v1/validated_overrides"
             
-            response = requests.post(url, 
-                                   headers=self.supabase_client.headers,
-                                   json=[record],
-                                   timeout=30)
+            response = self.supabase_client.session.post(url, 
+                                                       headers=self.supabase_client.headers,
+                                                       json=[record],
+                                                       timeout=30)
             
             if response.status_code in [200, 201]:
                 return {"success": True, "message": "Validation record created"}
@@ -435,7 +462,6 @@ class UnifiedClient:
                                license_number: str = None) -> Dict:
         """Delete a validation record via API"""
         try:
-            import requests
             url = f"{self.supabase_client.url}/rest/v1/validated_overrides"
             
             params = {
@@ -449,10 +475,10 @@ class UnifiedClient:
             else:
                 params['license_number'] = 'is.null'
             
-            response = requests.delete(url, 
-                                     headers=self.supabase_client.headers,
-                                     params=params,
-                                     timeout=30)
+            response = self.supabase_client.session.delete(url, 
+                                                         headers=self.supabase_client.headers,
+                                                         params=params,
+                                                         timeout=30)
             
             if response.status_code in [200, 204]:
                 return {"success": True, "message": "Validation record deleted"}
@@ -464,8 +490,6 @@ class UnifiedClient:
     def create_dataset(self, kind: str, tag: str, description: str = None, created_by: str = "gui_user") -> Dict:
         """Create a new dataset via API"""
         try:
-            import requests
-            
             # Find unique tag if conflicts exist
             unique_tag = self._find_unique_tag(kind, tag)
             
@@ -477,19 +501,19 @@ class UnifiedClient:
             }
             
             url = f"{self.supabase_client.url}/rest/v1/datasets"
-            response = requests.post(url, 
-                                   headers=self.supabase_client.headers,
-                                   json=[record],
-                                   timeout=30)
+            response = self.supabase_client.session.post(url, 
+                                                       headers=self.supabase_client.headers,
+                                                       json=[record],
+                                                       timeout=30)
             
             if response.status_code in [200, 201]:
                 # Get the created dataset to return ID
                 get_url = f"{self.supabase_client.url}/rest/v1/datasets"
                 params = {'kind': f'eq.{kind}', 'tag': f'eq.{unique_tag}'}
-                get_response = requests.get(get_url, 
-                                          headers=self.supabase_client.headers,
-                                          params=params,
-                                          timeout=30)
+                get_response = self.supabase_client.session.get(get_url, 
+                                                              headers=self.supabase_client.headers,
+                                                              params=params,
+                                                              timeout=30)
                 
                 if get_response.status_code == 200:
                     datasets = get_response.json()
@@ -440,53 +440,55 @@ def render_match_analysis(df: pd.DataFrame):
             st.dataframe(top_matches, use_container_width=True)
 
 
-def validate_comprehensive_results(results: List[Dict], states_tag: str, pharmacies_tag: str) -> List[str]:
+def validate_comprehensive_results(results, states_tag: str, pharmacies_tag: str) -> List[str]:
     """
     Validate comprehensive results and return warnings about data quality issues.
     
     Fast local checks for common problems that should always be caught.
+    Accepts either a list of result dicts or a comprehensive results DataFrame.
     """
     warnings = []
     
-    if not results or len(results) == 0:
+    df = results if isinstance(results, pd.DataFrame) else pd.DataFrame(results or [])
+    if df.empty:
         return warnings
     
+    def column(name):
+        return df[name] if name in df.columns else pd.Series(None, index=df.index, dtype=object)
+    
+    has_result = column('result_id').notna()
+    scores = column('score_overall')
+    
     # Check 1: At least one result should have a score (primary validation)
-    results_with_scores = [r for r in results if r.get('score_overall') is not None and r.get('result_id') is not None]
-    results_needing_scores = [r for r in results if r.get('result_id') is not None and r.get('score_overall') is None]
+    results_with_scores = scores.notna() & has_result
+    results_needing_scores = has_result & scores.isna()
     
-    if len(results_needing_scores) > 0 and len(results_with_scores) == 0:
+    if results_needing_scores.any() and not results_with_scores.any():
         warnings.append(f"No scores found for {pharmacies_tag} + {states_tag}. Scoring should have been computed automatically.")
     
     # Check 2: Validate score ranges (scores should be 0-100)
-    invalid_scores = []
-    for r in results_with_scores:
-        score = r.get('score_overall')
-        if score is not None and (score < 0 or score > 100):
-            invalid_scores.append(score)
+    scored = pd.to_numeric(scores[results_with_scores], errors='coerce')
+    invalid_scores = scores[results_with_scores][(scored < 0) | (scored > 100)]
     
-    if invalid_scores:
-        warnings.append(f"Found {len(invalid_scores)} scores outside valid range (0-100). Example: {invalid_scores[0]}")
+    if len(invalid_scores) > 0:
+        warnings.append(f"Found {len(invalid_scores)} scores outside valid range (0-100). Example: {invalid_scores.iloc[0]}")
     
     # Check 3: Results with search data should have license numbers
-    results_with_search = [r for r in results if r.get('result_id') is not None]
-    results_missing_license = [r for r in results_with_search if not r.get('license_number')]
+    license_numbers = column('license_number')
+    missing_license = has_result & (license_numbers.isna() | (license_numbers == ''))
     
-    if len(results_missing_license) > 10:  # Only warn if significant number
-        warnings.append(f"{len(results_missing_license)} search results missing license numbers")
+    if missing_license.sum() > 10:  # Only warn if significant number
+        warnings.append(f"{int(missing_license.sum())} search results missing license numbers")
     
     # Check 4: Basic data consistency - pharmacy names should be consistent
-    pharmacy_name_mismatches = []
-    seen_pharmacies = {}
-    for r in results:
-        pid = r.get('pharmacy_id')
-        name = r.get('pharmacy_name')
-        if pid and name:
-            if pid in seen_pharmacies and seen_pharmacies[pid] != name:
-                pharmacy_name_mismatches.append(f"Pharmacy {pid}: '{seen_pharmacies[pid]}' vs '{name}'")
-            seen_pharmacies[pid] = name
-    
-    if pharmacy_name_mismatches:
-        warnings.append(f"Pharmacy name inconsistencies detected: {len(pharmacy_name_mismatches)} cases")
-    
-    return warnings
\ No newline at end of file
+    pharmacy_ids = column('pharmacy_id')
+    pharmacy_names = column('pharmacy_name')
+    named = pharmacy_ids.notna() & (pharmacy_ids != 0) & pharmacy_names.notna() & (pharmacy_names != '')
+    names = pd.DataFrame({'pharmacy_id': pharmacy_ids[named], 'pharmacy_name': pharmacy_names[named]})
+    previous_names = names.groupby('pharmacy_id')['pharmacy_name'].shift()
+    name_mismatches = int((previous_names.notna() & (previous_names != names['pharmacy_name'])).sum())
+    
+    if name_mismatches:
+        warnings.append(f"Pharmacy name inconsistencies detected: {name_mismatches} cases")
+    
+    return warnings
@@ -299,6 +299,10 @@ class APIImporter:
             # Initialize image storage
             storage = create_image_storage('supabase')
             
+            # Store all screenshots up front: one bulk existence check, concurrent uploads
+            png_files = [json_file.with_suffix('.png') for json_file in json_files]
+            image_report = storage.store_images([png for png in png_files if png.exists()])
+            
             # Process each file
             total_results = 0
             success_files = 0
@@ -345,9 +349,14 @@ class APIImporter:
                     
                     # Handle screenshot if it exists
                     png_file = json_file.with_suffix('.png')
-                    if png_file.exists():
+                    if str(png_file) in image_report:
                         try:
-                            content_hash, storage_path, metadata_dict = storage.store_image(png_file)
+                            stored = image_report[str(png_file)]
+                            if stored['status'] == 'failed':
+                                raise RuntimeError(stored['error'])
+                            content_hash = stored['content_hash']
+                            storage_path = stored['storage_path']
+                            metadata_dict = stored['metadata']
                             
                             asset_data = {
                                 'dataset_id': dataset_id,
@@ -5,22 +5,32 @@ Implements the Fast and Safe Upload Plan for PharmChecker state imports
 """
 
 import asyncio
-import aiohttp
 import json
 import gc
 import hashlib
 import shutil
 import csv
+import sys
+import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Iterator
+from collections import deque
+import os
 import requests
 import time
 import logging
 from enum import Enum
 
+# Make project-root modules importable when run as a script
+_PROJECT_ROOT = Path(__file__).parent.parent
+if str(_PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(_PROJECT_ROOT))
+
+from utils.hash_cache import HASH_CACHE_FILENAME, HashCache, hash_files
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -32,6 +42,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Key on prepared search_results records naming the parse.json they came from
+# (file_to_record_mapping is indexed by it); stripped before records are sent
+SOURCE_FILE_KEY = '_source_file'
+
 
 class WorkItemStatus(Enum):
     PENDING = "pending"
@@ -65,6 +79,7 @@ class WorkItem:
     error_message: Optional[str] = None
     retry_count: int = 0
     last_attempt: Optional[str] = None
+    spool_offset: Optional[int] = None  # Byte offset of this file's parsed record in the spool
 
 
 @dataclass
@@ -81,35 +96,173 @@ class WorkState:
     completed_items: List[str]
     last_update: str
     current_phase: ProcessingPhase = ProcessingPhase.PLANNING
+    spool_file: Optional[str] = None  # Parsed-record spool written during planning
+    
+    def __post_init__(self):
+        # work_id -> WorkItem index (not a dataclass field, so it is never serialized;
+        # it is rebuilt whenever a state is created or loaded)
+        self._items_by_id: Dict[str, WorkItem] = {}
+        for item in self.work_items:
+            self._items_by_id.setdefault(item.work_id, item)
+        self._failed_ids = set(self.failed_items)
+        self._completed_ids = set(self.completed_items)
+        self._on_item_change = None  # Set by WorkStateManager to journal item updates
+        self._lock = threading.RLock()  # Pipelined imports update items from several threads
+    
+    def get_item(self, work_id: str) -> Optional[WorkItem]:
+        """Look up a work item by ID in O(1)"""
+        return self._items_by_id.get(work_id)
+    
+    def update_item(self, work_id: str, **changes) -> Optional[WorkItem]:
+        """Update a work item's fields by ID, keeping failed/completed lists in sync"""
+        item = self._items_by_id.get(work_id)
+        if item is None:
+            return None
+        
+        with self._lock:
+            for field_name, value in changes.items():
+                setattr(item, field_name, value)
+            
+            status = changes.get('status')
+            if status == WorkItemStatus.FAILED and work_id not in self._failed_ids:
+                self._failed_ids.add(work_id)
+                self.failed_items.append(work_id)
+            elif status == WorkItemStatus.COMPLETED and work_id not in self._completed_ids:
+                self._completed_ids.add(work_id)
+                self.completed_items.append(work_id)
+                if work_id in self._failed_ids:
+                    # Retried successfully (e.g. on resume)
+                    self._failed_ids.discard(work_id)
+                    self.failed_items.remove(work_id)
+            
+            if self._on_item_change is not None:
+                self._on_item_change(work_id, changes)
+        return item
 
 
 class WorkStateManager:
-    """Manages work state persistence and resume capability"""
+    """
+    Manages work state persistence and resume capability.
+    
+    State is kept as a compact JSON snapshot plus an append-only JSONL journal
+    (<state file>.journal) of work item updates and phase changes. checkpoint()
+    only appends to the journal, so it is cheap enough to call after every batch;
+    save_state() compacts by rewriting the snapshot and truncating the journal.
+    load_state() replays the journal over the snapshot.
+    """
     
-    def __init__(self, state_file: str = "work_state.json"):
+    def __init__(self, state_file: str = "work_state.json", compact_every: int = 100000):
         self.state_file = Path(state_file)
+        self.journal_file = Path(f"{state_file}.journal")
+        self.compact_every = compact_every  # Journal entries before checkpoint() compacts
         self.state: Optional[WorkState] = None
+        self._journal = None
+        self._journal_entries = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _encode(value):
+        return value.value if isinstance(value, Enum) else value
+    
+    def _append(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self._lock:
+            if self._journal is None:
+                self._journal = open(self.journal_file, 'a', encoding='utf-8')
+            self._journal.write(line)
+            self._journal_entries += 1
+    
+    def attach(self, state: WorkState):
+        """Journal every update_item() call on this state from now on"""
+        self.state = state
+        state._on_item_change = lambda work_id, changes: self._append(
+            {'id': work_id, **{k: self._encode(v) for k, v in changes.items()}}
+        )
+    
+    def checkpoint(self, state: WorkState):
+        """Record phase progress and flush the journal (compacts once the journal grows large)"""
+        if self.state is not state:
+            self.attach(state)
+        if self._journal_entries >= self.compact_every:
+            self.save_state(state)
+            return
+        with state._lock:
+            state.last_update = datetime.now(timezone.utc).isoformat()
+            self._append({'state': {
+                'current_phase': state.current_phase.value,
+                'phases': state.phases,
+                'last_update': state.last_update
+            }})
+        with self._lock:
+            self._journal.flush()
     
     def save_state(self, state: WorkState):
-        """Save current work state to file"""
-        state.last_update = datetime.now(timezone.utc).isoformat()
-        
-        # Convert to serializable format
-        state_dict = asdict(state)
-        state_dict['work_items'] = [asdict(item) for item in state.work_items]
-        
-        # Convert enums to strings
-        state_dict['current_phase'] = state.current_phase.value
-        for item in state_dict['work_items']:
-            item['status'] = item['status'].value
-        
-        with open(self.state_file, 'w') as f:
-            json.dump(state_dict, f, indent=2)
-        
+        """Write a full snapshot of the work state and truncate the journal"""
+        # Hold the state's lock throughout so no update_item() lands between the
+        # snapshot and the truncation (it would be in neither); same lock order as
+        # update_item(): state, then journal
+        with state._lock, self._lock:
+            state.last_update = datetime.now(timezone.utc).isoformat()
+            
+            # Convert to serializable format (enums as strings)
+            state_dict = {f.name: getattr(state, f.name) for f in fields(state) if f.name != 'work_items'}
+            state_dict['current_phase'] = state.current_phase.value
+            work_items = []
+            for item in state.work_items:
+                item_dict = item.__dict__.copy()
+                item_dict['status'] = item.status.value
+                work_items.append(item_dict)
+            state_dict['work_items'] = work_items
+            
+            tmp_file = self.state_file.with_name(self.state_file.name + '.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump(state_dict, f, separators=(',', ':'))
+            os.replace(tmp_file, self.state_file)
+            
+            # Everything in the journal is now in the snapshot
+            if self._journal is not None:
+                self._journal.close()
+            self._journal = open(self.journal_file, 'w', encoding='utf-8')
+            self._journal_entries = 0
+            
+            if self.state is not state:
+                self.attach(state)
         logger.info(f"💾 Work state saved to {self.state_file}")
     
+    def close(self):
+        """Flush and close the journal (the snapshot plus journal remain resumable)"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+    
+    def _replay_journal(self, state: WorkState) -> int:
+        """Apply journal entries to a freshly loaded snapshot; returns entries applied"""
+        if not self.journal_file.exists():
+            return 0
+        applied = 0
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn final line from an interrupted write
+                    logger.warning(f"⚠️  Ignoring unreadable journal entry in {self.journal_file}")
+                    break
+                if 'state' in entry:
+                    state.current_phase = ProcessingPhase(entry['state']['current_phase'])
+                    state.phases = entry['state']['phases']
+                    state.last_update = entry['state']['last_update']
+                else:
+                    work_id = entry.pop('id')
+                    if 'status' in entry:
+                        entry['status'] = WorkItemStatus(entry['status'])
+                    state.update_item(work_id, **entry)
+                applied += 1
+        return applied
+    
     def load_state(self) -> Optional[WorkState]:
-        """Load work state from file"""
+        """Load work state from the snapshot and replay the journal"""
         if not self.state_file.exists():
             return None
         
@@ -126,8 +279,15 @@ class WorkStateManager:
             state_dict['work_items'] = work_items
             state_dict['current_phase'] = ProcessingPhase(state_dict['current_phase'])
             
-            self.state = WorkState(**state_dict)
-            logger.info(f"📂 Loaded work state from {self.state_file}")
+            state = WorkState(**state_dict)
+            replayed = self._replay_journal(state)
+            logger.info(f"📂 Loaded work state from {self.state_file}"
+                        f"{f' (+{replayed} journal entries)' if replayed else ''}")
+            if self.journal_file.exists() and self.journal_file.stat().st_size:
+                # Fold the journal in so new entries never follow a torn line
+                self.save_state(state)
+            else:
+                self.attach(state)
             return self.state
             
         except Exception as e:
@@ -135,19 +295,249 @@ class WorkStateManager:
             return None
 
 
+class RecordSpool:
+    """
+    Append-only JSONL spool of parsed parse.json contents.
+    
+    Planning writes one compact line per file (pre-serialized meta/raw strings plus
+    the license list), and later phases read lines back by byte offset, so the source
+    JSON is parsed once per import and never re-serialized per license.
+    """
+    
+    def __init__(self, spool_file: str):
+        self.spool_file = Path(spool_file)
+        self._writer = None
+        self._reader = None
+        self._offset = 0
+    
+    @staticmethod
+    def build_entry(data: Dict) -> Dict:
+        """Reduce a parsed parse.json document to what record preparation needs"""
+        metadata = data.get('metadata', {})
+        search_result = data.get('search_result', {})
+        entry = {
+            'meta': json.dumps(metadata),
+            'raw': json.dumps(data),
+            'source_html_file': metadata.get('source_html_file', 'unknown'),
+            'licenses': search_result.get('licenses', [])
+        }
+        if 'result_status' in search_result:
+            entry['result_status'] = search_result['result_status']
+        return entry
+    
+    @staticmethod
+    def encode_entry(entry: Dict) -> bytes:
+        return json.dumps(entry, separators=(',', ':')).encode('utf-8') + b'\n'
+    
+    def open_for_write(self):
+        """Start a fresh spool, replacing any previous one"""
+        self.close()
+        self.spool_file.parent.mkdir(parents=True, exist_ok=True)
+        self._writer = open(self.spool_file, 'wb')
+        self._offset = 0
+    
+    def append(self, line: bytes) -> int:
+        """Append one encoded entry, returning its byte offset"""
+        offset = self._offset
+        self._writer.write(line)
+        self._offset += len(line)
+        return offset
+    
+    def read(self, offset: int) -> Dict:
+        """Read the entry stored at a byte offset"""
+        if self._reader is None:
+            self._reader = open(self.spool_file, 'rb')
+        self._reader.seek(offset)
+        line = self._reader.readline()
+        if not line.endswith(b'\n'):
+            raise ValueError(f"Truncated spool entry at offset {offset}")
+        return json.loads(line)
+    
+    def close(self):
+        for handle in (self._writer, self._reader):
+            if handle:
+                handle.close()
+        self._writer = None
+        self._reader = None
+
+
+class BufferedCsvWriter:
+    """
+    Thread-safe csv.DictWriter that buffers rows and writes them in blocks.
+    
+    Rows are flushed once flush_rows accumulate or flush_interval seconds have
+    passed since the last write, and on close(), so per-file debug logging does
+    not cost a write + flush per row and can be shared by parallel phases.
+    """
+    
+    def __init__(self, path: str, fieldnames: List[str], flush_rows: int = 500,
+                 flush_interval: float = 2.0):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._buffer: List[Dict[str, Any]] = []
+        self._last_flush = time.monotonic()
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+        self._writer.writeheader()
+    
+    def writerow(self, row: Dict[str, Any]):
+        with self._lock:
+            if self._file is None:
+                return
+            self._buffer.append(row)
+            if (len(self._buffer) >= self.flush_rows or
+                    time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+    
+    def _flush_locked(self):
+        if self._buffer:
+            self._writer.writerows(self._buffer)
+            self._buffer.clear()
+        self._file.flush()
+        self._last_flush = time.monotonic()
+    
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._flush_locked()
+    
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._flush_locked()
+                self._file.close()
+                self._file = None
+
+
+class AdaptiveBatcher:
+    """
+    Picks search_results insert batch sizes from observed request outcomes.
+    
+    Each batch is capped by a record count and a byte budget (estimated from the
+    pre-serialized raw/meta strings, which dominate payload size). The count grows
+    while requests finish under the latency target, shrinks when they run well over
+    it, and halves on 413 / timeouts.
+    """
+    
+    RECORD_OVERHEAD_BYTES = 512  # Non-JSON columns and JSON framing per record
+    
+    def __init__(self, initial_size: int = 25, max_size: int = 500,
+                 target_bytes: int = 2 * 1024 * 1024, target_latency: float = 2.0,
+                 adaptive: bool = True):
+        self.adaptive = adaptive
+        self.max_size = max(1, max_size if adaptive else initial_size)
+        self.size = max(1, min(initial_size, self.max_size))
+        self.initial_size = self.size
+        self.target_bytes = target_bytes
+        self.target_latency = target_latency
+        self.size_counts: Dict[int, int] = {}
+        self.grows = 0
+        self.shrinks = 0
+        self.retries = 0
+    
+    @classmethod
+    def record_bytes(cls, record: Dict) -> int:
+        """Rough serialized size of one record"""
+        return len(record.get('raw') or '') + len(record.get('meta') or '') + cls.RECORD_OVERHEAD_BYTES
+    
+    def next_batch_end(self, records: List[Dict], start: int) -> int:
+        """End index of the next batch starting at start (always at least one record)"""
+        end = min(len(records), start + self.size)
+        if not self.adaptive:
+            return end
+        total_bytes = 0
+        for i in range(start, end):
+            total_bytes += self.record_bytes(records[i])
+            if total_bytes > self.target_bytes and i > start:
+                return i
+        return end
+    
+    def is_full(self, record_count: int, byte_count: int) -> bool:
+        """Whether an accumulating batch has reached the current size or byte budget"""
+        return record_count >= self.size or (self.adaptive and byte_count >= self.target_bytes)
+    
+    def observe(self, batch_len: int, latency: float, too_large: bool = False):
+        """Adjust the batch size after a request of batch_len records"""
+        if too_large:
+            # 413 / timeout: retry at half of what was just attempted, and never grow back to it
+            self.retries += 1
+            self.shrinks += 1
+            self.max_size = max(1, min(self.max_size, batch_len - 1))
+            self.size = max(1, batch_len // 2)
+            return
+        
+        self.size_counts[batch_len] = self.size_counts.get(batch_len, 0) + 1
+        if not self.adaptive:
+            return
+        if latency > self.target_latency * 2 and self.size > 1:
+            self.shrinks += 1
+            self.size = max(1, int(self.size * 0.75))
+        elif latency < self.target_latency and batch_len >= self.size and self.size < self.max_size:
+            # Only grow when the batch was actually full-sized (not byte-capped or a tail)
+            self.grows += 1
+            self.size = min(self.max_size, self.size + max(1, self.size // 4))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Summary of the batch sizes used, for the import phase stats"""
+        sent = sum(self.size_counts.values())
+        records = sum(size * count for size, count in self.size_counts.items())
+        return {
+            'adaptive': self.adaptive,
+            'initial': self.initial_size,
+            'final': self.size,
+            'min': min(self.size_counts) if self.size_counts else 0,
+            'max': max(self.size_counts) if self.size_counts else 0,
+            'mean': round(records / sent, 1) if sent else 0,
+            'grows': self.grows,
+            'shrinks': self.shrinks,
+            'retries': self.retries,
+            'sizes': {str(size): count for size, count in sorted(self.size_counts.items())}
+        }
+
+
 class ResilientImporter:
     """Main resilient importer with parallel processing"""
     
     def __init__(self, max_workers: int = 16, 
                  max_concurrent_uploads: int = 10, batch_size: int = 25,
                  state_file: str = "work_state.json", verify_writes: bool = False,
-                 debug_log: bool = False, single_file: str = None):
+                 debug_log: bool = False, single_file: str = None,
+                 hash_cache_file: Optional[str] = "", hash_processes: bool = False,
+                 plan_window: int = 1024, spool_file: Optional[str] = "",
+                 pipelined: bool = False, pipeline_queue_size: int = 256,
+                 adaptive_batches: bool = True, max_batch_size: int = 500,
+                 batch_target_bytes: int = 2 * 1024 * 1024, batch_target_latency: float = 2.0,
+                 insert_timeout: float = 120):
         self.max_workers = max_workers
         self.max_concurrent_uploads = max_concurrent_uploads
         self.batch_size = batch_size
         self.verify_writes = verify_writes
         self.debug_log = debug_log
         self.single_file = single_file
+        self.hash_processes = hash_processes
+        self.plan_window = plan_window  # Max parse files in flight while planning
+        self.pipelined = pipelined  # Overlap hashing, uploads and inserts instead of sequential phases
+        self.pipeline_queue_size = pipeline_queue_size  # Max items buffered between pipeline stages
+        self.bulk_upsert_available = True  # Cleared if the upsert_search_results RPC is missing
+        
+        # Insert batch sizing (batch_size is the starting size when adaptive)
+        self.adaptive_batches = adaptive_batches
+        self.max_batch_size = max_batch_size
+        self.batch_target_bytes = batch_target_bytes
+        self.batch_target_latency = batch_target_latency
+        self.insert_timeout = insert_timeout
+        
+        # Persistent SHA256 cache next to the work state file ("" = default location, None = disabled)
+        if hash_cache_file == "":
+            hash_cache_file = str(Path(state_file).parent / HASH_CACHE_FILENAME)
+        self.hash_cache_file = hash_cache_file
+        
+        # Parsed-record spool ("" = <state file>.records.jsonl, None = re-read source JSON on import)
+        if spool_file == "":
+            spool_file = str(Path(state_file).with_suffix('.records.jsonl'))
+        self.spool_file = spool_file
         
         # Initialize state manager
         self.state_manager = WorkStateManager(state_file)
@@ -181,8 +571,7 @@ class ResilientImporter:
         }
         
         # CSV debug logging setup
-        self.debug_csv_file = None
-        self.debug_csv_writer = None
+        self.debug_csv_writer: Optional[BufferedCsvWriter] = None
         if debug_log:
             self._setup_csv_debug_logging()
     
@@ -191,8 +580,7 @@ class ResilientImporter:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         csv_filename = f'resilient_import_debug_{timestamp}.csv'
         
-        self.debug_csv_file = open(csv_filename, 'w', newline='', encoding='utf-8')
-        self.debug_csv_writer = csv.DictWriter(self.debug_csv_file, fieldnames=[
+        self.debug_csv_writer = BufferedCsvWriter(csv_filename, fieldnames=[
             'json_file_path',
             'pharmacy_name', 
             'search_state',
@@ -204,7 +592,6 @@ class ResilientImporter:
             'error_message',
             'processed_at'
         ])
-        self.debug_csv_writer.writeheader()
         
         logger.info(f"📝 CSV debug logging enabled: {csv_filename}")
     
@@ -225,7 +612,6 @@ class ResilientImporter:
                 'error_message': error_msg or '',
                 'processed_at': datetime.now(timezone.utc).isoformat()
             })
-            self.debug_csv_file.flush()
     
     def _setup_api_client(self):
         """Setup Supabase API client"""
@@ -238,6 +624,7 @@ class ResilientImporter:
         if not base_url or not service_key:
             raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set")
         
+        self.base_url = base_url
         self.api_url = f"{base_url}/rest/v1"
         self.session.headers.update({
             'apikey': service_key,
@@ -290,6 +677,120 @@ class ResilientImporter:
             logger.error(f"❌ Failed to create dataset: {e}")
             return None
     
+    @staticmethod
+    def _scan_parse_files(root: str) -> Iterator[str]:
+        """Walk a directory tree with os.scandir, yielding *_parse.json paths as they are found"""
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.name.endswith('_parse.json') and entry.is_file():
+                                yield entry.path
+                        except OSError:
+                            continue
+            except OSError as e:
+                logger.warning(f"⚠️  Cannot scan {directory}: {e}")
+    
+    @staticmethod
+    def _plan_single_file(json_path: str, dataset_id: int,
+                          spool: bool = False) -> Tuple[WorkItem, bool, Optional[str], Optional[bytes]]:
+        """
+        Build the WorkItem for one parse file (runs in planner threads).
+        
+        Returns:
+            (work_item, png_exists, source_image_file from metadata, encoded spool entry or None)
+        """
+        json_file = Path(json_path)
+        
+        # Read metadata quickly, keeping only the fields the plan needs
+        with open(json_file, 'r') as f:
+            data = json.load(f)
+        metadata = data.get('metadata', {})
+        pharmacy_name = metadata.get('pharmacy_name', 'Unknown')
+        search_state = metadata.get('state', 'XX')
+        search_timestamp = metadata.get('search_timestamp')
+        source_image_file = metadata.get('source_image_file')
+        licenses = data.get('search_result', {}).get('licenses', [])
+        license_number = licenses[0].get('license_number') if licenses else None
+        spool_line = RecordSpool.encode_entry(RecordSpool.build_entry(data)) if spool else None
+        del data
+        
+        # Find corresponding PNG from JSON metadata
+        if source_image_file:
+            png_file = Path(source_image_file)
+        else:
+            # Fallback to old calculation method if no source_image_file
+            png_filename = json_file.stem.replace('_parse', '') + '.png'
+            png_file = json_file.parent / png_filename
+        
+        # Generate work ID and dedup key
+        work_id = f"{search_state}_{pharmacy_name}_{json_file.stem}"
+        work_id = "".join(c for c in work_id if c.isalnum() or c in '_-')  # Clean ID
+        
+        if license_number:
+            # Use first license number for dedup key when license exists
+            dedup_key = f"{dataset_id}|{pharmacy_name}|{search_state}|{license_number}"
+        else:
+            # No license (or null license_number) - use parse.json file name for uniqueness
+            dedup_key = f"{dataset_id}|{pharmacy_name}|{search_state}|no_license|{json_file.name}"
+        
+        # Single stat for both existence and size
+        try:
+            estimated_size = png_file.stat().st_size
+            png_exists = True
+        except OSError:
+            estimated_size = 0
+            png_exists = False
+        
+        work_item = WorkItem(
+            work_id=work_id,
+            json_path=str(json_file),
+            png_path=str(png_file),
+            directory=json_file.parent.name,
+            pharmacy_name=pharmacy_name,
+            search_state=search_state,
+            search_timestamp=search_timestamp,
+            dedup_key=dedup_key,
+            estimated_size=estimated_size
+        )
+        return work_item, png_exists, source_image_file, spool_line
+    
+    def iter_work_items(self, json_paths: Iterator[str], dataset_id: int,
+                        spool: bool = False) -> Iterator[Tuple[Optional[WorkItem], bool, str, Optional[str], Optional[bytes]]]:
+        """
+        Parse files in a thread pool and yield results in discovery order.
+        
+        At most plan_window files are in flight at once, so neither the file
+        list nor pending parses grow with the size of the tree.
+        
+        Yields:
+            (work_item or None on failure, png_exists, json_path, source_image_file or error,
+             encoded spool entry when spool=True)
+        """
+        window = max(1, self.plan_window)
+        in_flight = deque()
+        
+        def _drain_one():
+            json_path, future = in_flight.popleft()
+            try:
+                work_item, png_exists, source_image_file, spool_line = future.result()
+                return work_item, png_exists, json_path, source_image_file, spool_line
+            except Exception as e:
+                return None, False, json_path, str(e), None
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for json_path in json_paths:
+                in_flight.append((json_path, executor.submit(self._plan_single_file, json_path, dataset_id, spool)))
+                if len(in_flight) >= window:
+                    yield _drain_one()
+            while in_flight:
+                yield _drain_one()
+    
     def plan_work(self, states_dir: str, tag: str, created_by: str = None, 
                   description: str = None) -> WorkState:
         """Phase 1: Planning - scan directories and build work catalog"""
@@ -304,110 +805,76 @@ class ResilientImporter:
         if not dataset_id:
             raise ValueError("Failed to create dataset")
         
-        # Scan for JSON files
-        json_files = list(states_path.rglob("*_parse.json"))
-        
-        # Filter to single file if specified
+        # Stream JSON files from the tree (or just the single requested file)
         if self.single_file:
-            json_files = [f for f in json_files if str(f) == self.single_file]
-            if not json_files:
+            single_path = Path(self.single_file)
+            if not (single_path.is_file() and single_path.name.endswith('_parse.json')
+                    and states_path.resolve() in single_path.resolve().parents):
                 raise ValueError(f"Single file not found: {self.single_file}")
+            json_paths = iter([self.single_file])
             logger.info(f"🎯 Processing single file: {self.single_file}")
         else:
-            logger.info(f"📊 Found {len(json_files)} JSON files to process")
+            json_paths = self._scan_parse_files(str(states_path))
         
         work_items = []
-        files_without_png = []
+        files_without_png = []  # First few examples only
+        total_images = 0
+        scanned = 0
         
-        for json_file in json_files:
-            try:
-                # Read metadata quickly
-                with open(json_file, 'r') as f:
-                    data = json.load(f)
-                
-                metadata = data.get('metadata', {})
-                pharmacy_name = metadata.get('pharmacy_name', 'Unknown')
-                search_state = metadata.get('state', 'XX')
-                search_timestamp = metadata.get('search_timestamp')
-                
-                # Find corresponding PNG from JSON metadata
-                source_image_file = metadata.get('source_image_file')
-                if source_image_file:
-                    png_file = Path(source_image_file)
-                else:
-                    # Fallback to old calculation method if no source_image_file
-                    png_filename = json_file.stem.replace('_parse', '') + '.png'
-                    png_file = json_file.parent / png_filename
-                
-                # Generate work ID and dedup key
-                work_id = f"{search_state}_{pharmacy_name}_{json_file.stem}"
-                work_id = "".join(c for c in work_id if c.isalnum() or c in '_-')  # Clean ID
-                
-                # Create dedup key based on search results
-                search_result = data.get('search_result', {})
-                licenses = search_result.get('licenses', [])
+        # Spool parsed contents so the import phase never re-reads the source JSON
+        spool = RecordSpool(self.spool_file) if self.spool_file else None
+        if spool:
+            spool.open_for_write()
+        
+        try:
+            planned = self.iter_work_items(json_paths, dataset_id, spool=spool is not None)
+            for work_item, png_exists, json_path, detail, spool_line in planned:
+                scanned += 1
+                if work_item is None:
+                    logger.warning(f"⚠️  Failed to process {json_path}: {detail}")
+                    continue
                 
-                if licenses:
-                    # Use first license number for dedup key when license exists
-                    license_number = licenses[0].get('license_number')
-                    if license_number:  # Check if license_number is not None/empty
-                        dedup_key = f"{dataset_id}|{pharmacy_name}|{search_state}|{license_number}"
-                    else:
-                        # License object exists but license_number is null - treat as no license
-                        json_filename = Path(json_file).name
-                        dedup_key = f"{dataset_id}|{pharmacy_name}|{search_state}|no_license|{json_filename}"
-                else:
-                    # No license - use parse.json file path for uniqueness (always available and unique)
-                    json_filename = Path(json_file).name
-                    dedup_key = f"{dataset_id}|{pharmacy_name}|{search_state}|no_license|{json_filename}"
+                if spool:
+                    work_item.spool_offset = spool.append(spool_line)
                 
                 # Track PNG analysis
-                if png_file.exists():
-                    estimated_size = png_file.stat().st_size
+                if png_exists:
+                    total_images += 1
                     self.stats['files_with_png'] += 1
                 else:
-                    estimated_size = 0
                     self.stats['files_without_png'] += 1
-                    files_without_png.append(str(json_file))
+                    if len(files_without_png) < 5:
+                        files_without_png.append(json_path)
                     if self.debug_log:
-                        logger.debug(f"Missing PNG for {json_file}: expected {png_file} (from metadata: {source_image_file})")
-                
-                work_item = WorkItem(
-                    work_id=work_id,
-                    json_path=str(json_file),
-                    png_path=str(png_file),
-                    directory=json_file.parent.name,
-                    pharmacy_name=pharmacy_name,
-                    search_state=search_state,
-                    search_timestamp=search_timestamp,
-                    dedup_key=dedup_key,
-                    estimated_size=estimated_size
-                )
+                        logger.debug(f"Missing PNG for {json_path}: expected {work_item.png_path} (from metadata: {detail})")
                 
                 work_items.append(work_item)
                 
-            except Exception as e:
-                logger.warning(f"⚠️  Failed to process {json_file}: {e}")
-                continue
+                if scanned % 10000 == 0:
+                    logger.info(f"📊 Planned {scanned} JSON files...")
+        finally:
+            if spool:
+                spool.close()
+        
+        if not self.single_file:
+            logger.info(f"📊 Found {scanned} JSON files to process")
         
         # Sort by timestamp for proper conflict resolution
         work_items.sort(key=lambda x: x.search_timestamp or "")
         
-        # Create work state
-        total_images = sum(1 for item in work_items if Path(item.png_path).exists())
-        
         # Detailed file analysis
         logger.info(f"📊 File Analysis:")
         logger.info(f"  Total JSON files: {len(work_items)}")
         logger.info(f"  Files with PNG: {self.stats['files_with_png']}")
         logger.info(f"  Files without PNG: {self.stats['files_without_png']}")
         
-        if files_without_png:
-            logger.warning(f"⚠️  {len(files_without_png)} files missing PNG images:")
-            for missing_file in files_without_png[:5]:  # Show first 5
+        missing_png_count = self.stats['files_without_png']
+        if missing_png_count:
+            logger.warning(f"⚠️  {missing_png_count} files missing PNG images:")
+            for missing_file in files_without_png:  # Show first 5
                 logger.warning(f"    {missing_file}")
-            if len(files_without_png) > 5:
-                logger.warning(f"    ... and {len(files_without_png) - 5} more")
+            if missing_png_count > 5:
+                logger.warning(f"    ... and {missing_png_count - 5} more")
         
         work_state = WorkState(
             dataset_id=dataset_id,
@@ -425,7 +892,8 @@ class ResilientImporter:
             failed_items=[],
             completed_items=[],
             last_update=datetime.now(timezone.utc).isoformat(),
-            current_phase=ProcessingPhase.PLANNING
+            current_phase=ProcessingPhase.PLANNING,
+            spool_file=self.spool_file
         )
         
         logger.info(f"✅ Planning complete: {len(work_items)} work items, {total_images} images")
@@ -447,55 +915,60 @@ class ResilientImporter:
             work_state.phases['sha256']['status'] = 'completed'
             return
         
-        def compute_single_hash(work_item: WorkItem) -> Tuple[str, str]:
-            """Compute SHA256 for a single image"""
-            try:
-                sha256_hash = hashlib.sha256()
-                with open(work_item.png_path, "rb") as f:
-                    for chunk in iter(lambda: f.read(8192), b""):
-                        sha256_hash.update(chunk)
-                return work_item.work_id, sha256_hash.hexdigest()
-            except Exception as e:
-                logger.error(f"❌ SHA256 failed for {work_item.work_id}: {e}")
-                return work_item.work_id, None
+        # Several work items can point at the same screenshot
+        items_by_path: Dict[str, List[WorkItem]] = {}
+        for item in items_needing_hash:
+            items_by_path.setdefault(item.png_path, []).append(item)
         
         start_time = time.time()
         completed = 0
-        
-        # Process in parallel
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_item = {
-                executor.submit(compute_single_hash, item): item 
-                for item in items_needing_hash
-            }
-            
-            for future in as_completed(future_to_item):
-                work_id, sha256_hash = future.result()
+        processed = 0
+        cached = 0
+        bytes_hashed = 0
+        
+        def on_hashed(png_path: str, sha256_hash: Optional[str], from_cache: bool):
+            nonlocal completed, processed, cached, bytes_hashed
+            for item in items_by_path[png_path]:
+                processed += 1
                 
                 # Update work item
-                for item in work_state.work_items:
-                    if item.work_id == work_id:
-                        item.sha256_hash = sha256_hash
-                        if sha256_hash:
-                            completed += 1
-                        break
+                work_state.update_item(item.work_id, sha256_hash=sha256_hash)
+                if sha256_hash:
+                    completed += 1
+                    if from_cache:
+                        cached += 1
+                    else:
+                        bytes_hashed += item.estimated_size
+                else:
+                    logger.error(f"❌ SHA256 failed for {item.work_id}")
                 
                 # Progress update
-                if completed % 50 == 0:
+                if processed % 50 == 0 or processed == len(items_needing_hash):
                     elapsed = time.time() - start_time
-                    rate = completed / elapsed if elapsed > 0 else 0
-                    logger.info(f"🔢 SHA256 progress: {completed}/{len(items_needing_hash)} "
-                              f"({rate:.1f} files/sec)")
+                    rate = processed / elapsed if elapsed > 0 else 0
+                    mb_rate = bytes_hashed / (1024 * 1024) / elapsed if elapsed > 0 else 0
+                    logger.info(f"🔢 SHA256 progress: {processed}/{len(items_needing_hash)} "
+                              f"({completed} hashed, {cached} cached, {rate:.1f} files/sec, {mb_rate:.1f} MB/sec)")
+        
+        # Unchanged files are served from the sidecar cache; the rest are hashed in parallel
+        cache = HashCache(self.hash_cache_file) if self.hash_cache_file else None
+        try:
+            hash_files(items_by_path.keys(), cache=cache, max_workers=self.max_workers,
+                       use_processes=self.hash_processes, progress=on_hashed)
+        finally:
+            if cache is not None:
+                cache.close()
         
         # Update phase status
         duration = time.time() - start_time
         work_state.phases['sha256'] = {
             'status': 'completed',
             'processed': completed,
+            'cached': cached,
             'duration_seconds': round(duration, 2)
         }
         
-        logger.info(f"✅ SHA256 computation complete: {completed} hashes in {duration:.1f}s")
+        logger.info(f"✅ SHA256 computation complete: {completed} hashes ({cached} from cache) in {duration:.1f}s")
     
     def check_existing_images(self, work_state: WorkState) -> None:
         """Check database for existing image assets to avoid duplicate uploads"""
@@ -509,36 +982,20 @@ class ResilientImporter:
         
         # Query database for existing assets
         try:
-            # Build query for multiple hashes
-            hash_list = list(hashes)
-            existing_hashes = set()
+            from supabase_client import AsyncBulkClient, run_async
             
-            # Query in batches to avoid URL length limits
-            batch_size = 50
-            for i in range(0, len(hash_list), batch_size):
-                batch = hash_list[i:i + batch_size]
-                hash_filter = ','.join(f'"{h}"' for h in batch)
-                
-                response = self.session.get(
-                    f"{self.api_url}/image_assets",
-                    params={
-                        'select': 'content_hash',
-                        'content_hash': f'in.({hash_filter})'
-                    }
-                )
-                response.raise_for_status()
-                
-                batch_existing = {asset['content_hash'] for asset in response.json()}
-                existing_hashes.update(batch_existing)
+            # Batches of 50 hashes (URL length limit), checked concurrently
+            bulk = AsyncBulkClient(self.base_url, dict(self.session.headers),
+                                   max_concurrency=self.max_concurrent_uploads)
+            existing_hashes = run_async(bulk.find_existing_hashes(hashes, batch_size=50))
             
             # Update work items
             skipped_count = 0
             for item in work_state.work_items:
-                if item.sha256_hash in existing_hashes:
-                    item.image_exists = True
+                exists = item.sha256_hash in existing_hashes
+                work_state.update_item(item.work_id, image_exists=exists)
+                if exists:
                     skipped_count += 1
-                else:
-                    item.image_exists = False
             
             logger.info(f"📋 Found {len(existing_hashes)} existing images, "
                        f"{skipped_count} uploads can be skipped")
@@ -548,10 +1005,37 @@ class ResilientImporter:
             # Assume all need upload if check fails
             for item in work_state.work_items:
                 if item.sha256_hash:
-                    item.image_exists = False
+                    work_state.update_item(item.work_id, image_exists=False)
+    
+    def _store_and_register_image(self, work_item: WorkItem, storage) -> str:
+        """Upload one screenshot to storage and create its image_assets row; returns the content hash"""
+        png_path = Path(work_item.png_path)
+        content_hash, storage_path, metadata = storage.store_image(png_path)
+        
+        # Create asset record via API
+        asset_data = {
+            'content_hash': content_hash,
+            'storage_path': storage_path,
+            'storage_type': storage.backend_type,
+            'file_size': metadata['file_size'],
+            'content_type': metadata['content_type'],
+            'width': metadata.get('width'),
+            'height': metadata.get('height')
+        }
+        
+        # Use requests session for database operations
+        response = self.session.post(f"{self.api_url}/image_assets", json=asset_data)
+        response.raise_for_status()
+        return content_hash
     
     async def upload_images_concurrent(self, work_state: WorkState) -> None:
-        """Phase 3: Concurrent image uploads"""
+        """
+        Phase 3: Concurrent image uploads.
+        
+        Screenshots go straight to the Storage endpoint over one shared aiohttp session
+        (file reads and metadata run in worker threads so the event loop never blocks),
+        and image_assets rows are registered in batches as uploads finish.
+        """
         logger.info(f"📤 Phase 3: Uploading images with {self.max_concurrent_uploads} concurrent uploads...")
         work_state.current_phase = ProcessingPhase.UPLOAD
         
@@ -566,374 +1050,567 @@ class ResilientImporter:
             work_state.phases['upload']['status'] = 'completed'
             return
         
-        connector = aiohttp.TCPConnector(limit=50, limit_per_host=self.max_concurrent_uploads)
-        timeout = aiohttp.ClientTimeout(total=300)  # 5 minute timeout
+        from supabase_client import AsyncBulkClient
+        from utils.image_storage import create_image_storage
+        
+        # One storage helper for paths/metadata; several work items may share a screenshot
+        storage = create_image_storage('supabase')
+        items_by_hash: Dict[str, List[WorkItem]] = {}
+        for item in items_needing_upload:
+            items_by_hash.setdefault(item.sha256_hash, []).append(item)
         
-        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-            semaphore = asyncio.Semaphore(self.max_concurrent_uploads)
+        bulk = AsyncBulkClient(self.base_url, dict(self.session.headers),
+                               max_concurrency=self.max_concurrent_uploads + 1, timeout=300)  # 5 minute timeout
+        upload_slots = asyncio.Semaphore(self.max_concurrent_uploads)
+        request_slots = asyncio.Semaphore(self.max_concurrent_uploads + 1)  # Uploads plus one registration
+        register_batch_size = max(1, self.batch_size * 2)
+        pending_assets: List[Tuple[Dict[str, Any], List[WorkItem]]] = []
+        register_lock = asyncio.Lock()
+        
+        start_time = time.time()
+        completed = 0
+        failed = 0
+        deduplicated = 0
+        in_flight = 0
+        peak_in_flight = 0
+        upload_seconds = 0.0
+        
+        def mark_failed(items: List[WorkItem], error: str):
+            for work_item in items:
+                work_state.update_item(work_item.work_id, status=WorkItemStatus.FAILED, error_message=error)
+        
+        async def register_pending(session):
+            """Register queued image_assets rows in one request, retrying the batch"""
+            nonlocal completed, failed
+            async with register_lock:
+                if not pending_assets:
+                    return
+                batch = pending_assets[:]
+                pending_assets.clear()
+                rows = [row for row, _ in batch]
+                for attempt in range(3):
+                    try:
+                        await bulk.insert_rows(session, request_slots, 'image_assets', rows, on_conflict='content_hash')
+                        break
+                    except Exception as e:
+                        if attempt < 2:
+                            logger.warning(f"⚠️  image_assets registration retry {attempt + 1}/3 ({len(rows)} rows): {e}")
+                            await asyncio.sleep(1.0 * (2 ** attempt))
+                        else:
+                            logger.error(f"❌ image_assets registration failed for {len(rows)} images: {e}")
+                            for _, items in batch:
+                                mark_failed(items, str(e))
+                            failed += len(batch)
+                            return
+                for _, items in batch:
+                    for work_item in items:
+                        work_state.update_item(work_item.work_id, image_exists=True)
+                        logger.debug(f"📤 Uploaded: {work_item.work_id}")
+                completed += len(batch)
+        
+        async def upload_single_image(session, content_hash: str, items: List[WorkItem]) -> bool:
+            """Upload one screenshot with retry logic, then queue its image_assets row"""
+            nonlocal in_flight, peak_in_flight, upload_seconds, deduplicated, failed
+            work_item = items[0]
+            png_path = Path(work_item.png_path)
+            max_retries = 3
+            retry_delay = 1.0
             
-            async def upload_single_image(work_item: WorkItem) -> bool:
-                """Upload a single image with retry logic"""
-                async with semaphore:
-                    max_retries = 3
-                    retry_delay = 1.0
-                    
-                    for attempt in range(max_retries):
+            for attempt in range(max_retries):
+                try:
+                    async with upload_slots:
+                        in_flight += 1
+                        peak_in_flight = max(peak_in_flight, in_flight)
+                        started = time.perf_counter()
                         try:
-                            # Add current directory to path for module imports
-                            import sys
-                            from pathlib import Path
-                            current_dir = Path(__file__).parent.parent
-                            if str(current_dir) not in sys.path:
-                                sys.path.insert(0, str(current_dir))
-                            
-                            # Store image using existing image storage
-                            from utils.image_storage import create_image_storage
-                            storage = create_image_storage('supabase')
-                            
-                            png_path = Path(work_item.png_path)
-                            content_hash, storage_path, metadata = storage.store_image(png_path)
-                            
-                            # Create asset record via API
-                            asset_data = {
-                                'content_hash': content_hash,
-                                'storage_path': storage_path,
-                                'storage_type': storage.backend_type,
-                                'file_size': metadata['file_size'],
-                                'content_type': metadata['content_type'],
-                                'width': metadata.get('width'),
-                                'height': metadata.get('height')
-                            }
-                            
-                            # Use requests session for database operations (async aiohttp for file uploads)
-                            response = self.session.post(f"{self.api_url}/image_assets", json=asset_data)
-                            response.raise_for_status()
-                            
-                            logger.debug(f"📤 Uploaded: {work_item.work_id}")
-                            return True
-                            
-                        except Exception as e:
-                            work_item.retry_count = attempt + 1
-                            work_item.error_message = str(e)
-                            work_item.last_attempt = datetime.now(timezone.utc).isoformat()
-                            
-                            if attempt < max_retries - 1:
-                                await asyncio.sleep(retry_delay * (2 ** attempt))  # Exponential backoff
-                                logger.warning(f"⚠️  Upload retry {attempt + 1}/{max_retries} for {work_item.work_id}: {e}")
-                            else:
-                                logger.error(f"❌ Upload failed after {max_retries} attempts for {work_item.work_id}: {e}")
-                                work_item.status = WorkItemStatus.FAILED
-                                return False
-                
-                return False
-            
-            # Start uploads
-            start_time = time.time()
-            completed = 0
-            failed = 0
+                            data = await asyncio.to_thread(png_path.read_bytes)
+                            metadata = storage.get_image_metadata(png_path, header=data)  # No second read
+                            storage_path = storage.get_storage_path(content_hash, png_path.suffix)
+                            uploaded = await bulk.upload_object(session, request_slots, 'imagecache', storage_path,
+                                                                data, metadata['content_type'])
+                        finally:
+                            in_flight -= 1
+                            upload_seconds += time.perf_counter() - started
+                    if not uploaded:
+                        deduplicated += 1
+                    
+                    asset_row = {
+                        'content_hash': content_hash,
+                        'storage_path': storage_path,
+                        'storage_type': 'supabase',
+                        'file_size': metadata['file_size'],
+                        'content_type': metadata['content_type'],
+                        'width': metadata.get('width'),
+                        'height': metadata.get('height')
+                    }
+                    pending_assets.append((asset_row, items))
+                    if len(pending_assets) >= register_batch_size:
+                        await register_pending(session)
+                    return True
+                    
+                except Exception as e:
+                    for item in items:
+                        work_state.update_item(
+                            item.work_id,
+                            retry_count=attempt + 1,
+                            error_message=str(e),
+                            last_attempt=datetime.now(timezone.utc).isoformat()
+                        )
+                    
+                    if attempt < max_retries - 1:
+                        await asyncio.sleep(retry_delay * (2 ** attempt))  # Exponential backoff
+                        logger.warning(f"⚠️  Upload retry {attempt + 1}/{max_retries} for {work_item.work_id}: {e}")
+                    else:
+                        logger.error(f"❌ Upload failed after {max_retries} attempts for {work_item.work_id}: {e}")
+                        mark_failed(items, str(e))
+                        failed += 1
+                        return False
             
-            tasks = [upload_single_image(item) for item in items_needing_upload]
+            return False
+        
+        async def upload_via_storage_client(content_hash: str, items: List[WorkItem]) -> bool:
+            """Local/fallback backend: run the synchronous store in a worker thread"""
+            nonlocal completed, failed
+            async with upload_slots:
+                try:
+                    await asyncio.to_thread(self._store_and_register_image, items[0], storage)
+                except Exception as e:
+                    logger.error(f"❌ Upload failed for {items[0].work_id}: {e}")
+                    mark_failed(items, str(e))
+                    failed += 1
+                    return False
+            for work_item in items:
+                work_state.update_item(work_item.work_id, image_exists=True)
+            completed += 1
+            return True
+        
+        total = len(items_by_hash)
+        async with bulk.open_session() as session:
+            if storage.backend_type == 'supabase':
+                tasks = [upload_single_image(session, h, items) for h, items in items_by_hash.items()]
+            else:
+                logger.warning("⚠️  Supabase storage unavailable, storing images via the local backend")
+                tasks = [upload_via_storage_client(h, items) for h, items in items_by_hash.items()]
             
+            done_count = 0
             for task in asyncio.as_completed(tasks):
-                success = await task
-                if success:
-                    completed += 1
-                else:
-                    failed += 1
+                await task
+                done_count += 1
                 
                 # Progress update
-                total_done = completed + failed
-                if total_done % 25 == 0:
+                if done_count % 25 == 0 or done_count == total:
                     elapsed = time.time() - start_time
-                    rate = total_done / elapsed if elapsed > 0 else 0
-                    logger.info(f"📤 Upload progress: {completed} success, {failed} failed, "
-                              f"{total_done}/{len(items_needing_upload)} total ({rate:.1f} uploads/sec)")
+                    rate = done_count / elapsed if elapsed > 0 else 0
+                    logger.info(f"📤 Upload progress: {completed} registered, {failed} failed, "
+                              f"{done_count}/{total} total ({rate:.1f} uploads/sec, peak {peak_in_flight} in flight)")
+            
+            await register_pending(session)
         
         # Update phase status
         duration = time.time() - start_time
+        avg_concurrency = upload_seconds / duration if duration > 0 else 0
         work_state.phases['upload'] = {
             'status': 'completed',
             'completed': completed,
             'failed': failed,
+            'deduplicated': deduplicated,
             'skipped': len(work_state.work_items) - len(items_needing_upload),
+            'peak_concurrency': peak_in_flight,
+            'avg_concurrency': round(avg_concurrency, 2),
             'duration_seconds': round(duration, 2)
         }
         
-        logger.info(f"✅ Image upload complete: {completed} uploaded, {failed} failed in {duration:.1f}s")
+        logger.info(f"✅ Image upload complete: {completed} uploaded, {failed} failed in {duration:.1f}s "
+                    f"(avg concurrency {avg_concurrency:.1f}, peak {peak_in_flight}/{self.max_concurrent_uploads})")
+    
+    def _open_record_spool(self, work_state: WorkState) -> Optional[RecordSpool]:
+        """Open the planning spool for reading, if this work state has one"""
+        if work_state.spool_file and Path(work_state.spool_file).exists():
+            logger.info(f"📼 Reading parsed records from spool {work_state.spool_file}")
+            return RecordSpool(work_state.spool_file)
+        return None
+    
+    def _prepare_item_records(self, work_state: WorkState, work_item: WorkItem,
+                              spool: Optional[RecordSpool], file_to_record_mapping: Dict) -> Tuple[List[Dict], bool]:
+        """
+        Build the search_results rows for one work item.
+        
+        Returns:
+            (records, whether the parsed contents came from the spool)
+        """
+        parsed = None
+        if spool and work_item.spool_offset is not None:
+            try:
+                parsed = spool.read(work_item.spool_offset)
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️  Spool entry unreadable for {work_item.work_id}, re-reading source: {e}")
+        from_spool = parsed is not None
+        if parsed is None:
+            with open(work_item.json_path, 'r') as f:
+                parsed = RecordSpool.build_entry(json.load(f))
+        
+        meta_json = parsed['meta']
+        raw_json = parsed['raw']
+        records = []
+        
+        # Parse timestamp safely
+        search_ts = None
+        if work_item.search_timestamp:
+            try:
+                search_ts = datetime.fromisoformat(work_item.search_timestamp.replace('Z', '+00:00'))
+            except ValueError:
+                logger.warning(f"⚠️  Invalid timestamp for {work_item.work_id}, using current time")
+                search_ts = datetime.now(timezone.utc)
+        
+        # Process licenses
+        licenses = parsed['licenses']
+        png_exists = Path(work_item.png_path).exists()
+        
+        # Track this file for CSV logging
+        file_record_ids = []
+        
+        if not licenses:
+            # No results found
+            result_status = parsed.get('result_status', 'not_found')
+            record = {
+                'dataset_id': work_state.dataset_id,
+                'search_name': work_item.pharmacy_name,
+                'search_state': work_item.search_state,
+                'search_ts': search_ts.isoformat() if search_ts else None,
+                'license_number': None,
+                'result_status': result_status,
+                'meta': meta_json,
+                'raw': raw_json,
+                'image_hash': work_item.sha256_hash,
+                SOURCE_FILE_KEY: work_item.json_path
+            }
+            records.append(record)
+            # Generate a unique ID for this record for tracking
+            record_id = f"{work_state.dataset_id}-{work_item.pharmacy_name}-{work_item.search_state}-no_license"
+            file_record_ids.append(record_id)
+        else:
+            # Process each license
+            for i, license_info in enumerate(licenses):
+                address_info = license_info.get('address', {})
+                
+                record = {
+                    'dataset_id': work_state.dataset_id,
+                    'search_name': work_item.pharmacy_name,
+                    'search_state': work_item.search_state,
+                    'search_ts': search_ts.isoformat() if search_ts else None,
+                    'license_number': license_info.get('license_number'),
+                    'license_status': license_info.get('license_status'),
+                    'license_name': license_info.get('pharmacy_name'),
+                    'license_type': license_info.get('license_type'),
+                    'address': address_info.get('street'),
+                    'city': address_info.get('city'),
+                    'state': address_info.get('state'),
+                    'zip': address_info.get('zip_code'),
+                    'issue_date': self._clean_date_field(license_info.get('issue_date')),
+                    'expiration_date': self._clean_date_field(license_info.get('expiration_date')),
+                    'result_status': parsed.get('result_status', 'found'),
+                    'meta': meta_json,
+                    'raw': raw_json,
+                    'image_hash': work_item.sha256_hash,
+                    SOURCE_FILE_KEY: work_item.json_path
+                }
+                records.append(record)
+                # Generate a unique ID for this record for tracking
+                license_num = license_info.get('license_number', f'license_{i}')
+                record_id = f"{work_state.dataset_id}-{work_item.pharmacy_name}-{work_item.search_state}-{license_num}"
+                file_record_ids.append(record_id)
+        
+        # Store mapping for later CSV logging with unique identifiers
+        source_html = parsed['source_html_file']
+        file_to_record_mapping[work_item.json_path] = {
+            'pharmacy_name': work_item.pharmacy_name,
+            'search_state': work_item.search_state,
+            'search_timestamp': work_item.search_timestamp,
+            'png_exists': png_exists,
+            'licenses_count': len(licenses),
+            'record_ids': file_record_ids,
+            'status': 'prepared',
+            'source_html_file': source_html,  # Add unique identifier
+            'json_path': work_item.json_path   # Store the exact path
+        }
+        
+        # Debug: Log how many records this file will generate
+        if self.debug_log:
+            logger.debug(f"📂 FILE PREPARATION: {work_item.json_path}")
+            logger.debug(f"   🏪 Pharmacy: {work_item.pharmacy_name}")
+            logger.debug(f"   🗺️  State: {work_item.search_state}")
+            logger.debug(f"   📄 Source HTML: {source_html}")
+            logger.debug(f"   📜 Licenses found: {len(licenses)}")
+            logger.debug(f"   📋 Records to create: {len(file_record_ids)}")
+            for idx, record_id in enumerate(file_record_ids):
+                license_num = licenses[idx].get('license_number', 'no_license') if idx < len(licenses) else 'no_license'
+                logger.debug(f"     [{idx+1}] {record_id} (license: {license_num})")
+        
+        return records, from_spool
+    
+    def _record_preparation_failure(self, work_state: WorkState, work_item: WorkItem, error: Exception):
+        """Mark a work item failed when its records could not be prepared"""
+        error_msg = str(error)
+        logger.error(f"❌ Failed to prepare data for {work_item.work_id}: {error}")
+        work_state.update_item(work_item.work_id, status=WorkItemStatus.FAILED, error_message=error_msg)
+        
+        # Log failure to CSV
+        self._log_file_processing(
+            work_item.json_path,
+            work_item.pharmacy_name,
+            work_item.search_state,
+            work_item.search_timestamp,
+            Path(work_item.png_path).exists(),
+            0,
+            'failed_preparation',
+            [],
+            error_msg
+        )
+    
+    def _log_batch_debug_details(self, cleaned_batch: List[Dict]):
+        """Log the records of a rejected batch to help identify bad data"""
+        logger.error(f"💀 BATCH DEBUGGING - Records in failed batch: {len(cleaned_batch)}")
+        logger.error(f"💀 All field names in batch: {set().union(*(r.keys() for r in cleaned_batch))}")
+        
+        # Log first few records to identify the problem
+        for i, record in enumerate(cleaned_batch[:3]):
+            logger.error(f"💀 Record {i+1}/{len(cleaned_batch)}: {json.dumps(record, indent=2, default=str)}")
+        
+        # Check for common problems
+        for i, record in enumerate(cleaned_batch):
+            # Check for None values in required fields
+            if record.get('dataset_id') is None:
+                logger.error(f"💀 Record {i+1} has NULL dataset_id")
+            # Check for invalid JSON in meta/raw fields  
+            for json_field in ['meta', 'raw']:
+                if json_field in record and record[json_field]:
+                    try:
+                        if isinstance(record[json_field], str):
+                            json.loads(record[json_field])
+                    except json.JSONDecodeError:
+                        logger.error(f"💀 Record {i+1} has invalid JSON in {json_field}: {record[json_field][:100]}")
+    
+    def _new_batcher(self) -> AdaptiveBatcher:
+        return AdaptiveBatcher(self.batch_size, self.max_batch_size, self.batch_target_bytes,
+                               self.batch_target_latency, adaptive=self.adaptive_batches)
+    
+    def _insert_batch(self, batch: List[Dict], batch_num: int, total_batches: Any,
+                      file_to_record_mapping: Dict, allow_retry: bool = False) -> Tuple[int, Optional[str], bool]:
+        """
+        Insert one batch of search_results, falling back to per-record UPSERT on conflicts.
+        
+        With allow_retry, a batch rejected as too large (413) or timed out is not logged
+        as failed; the caller is expected to resend its records in smaller batches.
+        
+        Returns:
+            (records imported, error message or None if the batch succeeded, should retry smaller)
+        """
+        # Clean batch data and normalize keys for PostgREST compatibility
+        cleaned_batch = []
+        
+        # First pass: collect all unique keys across all records
+        all_keys = set()
+        for result in batch:
+            all_keys.update(result.keys())
+        all_keys.discard(SOURCE_FILE_KEY)  # Local bookkeeping only
+        
+        # Second pass: ensure all records have the same keys
+        for result in batch:
+            cleaned_result = {}
+            for key in all_keys:
+                value = result.get(key)
+                if value is not None and value != '':
+                    cleaned_result[key] = value
+                else:
+                    # Add missing keys with null for PostgREST compatibility
+                    cleaned_result[key] = None
+            cleaned_batch.append(cleaned_result)
+        
+        try:
+            # Try batch insert first
+            response = self.session.post(f"{self.api_url}/search_results", json=cleaned_batch,
+                                         timeout=self.insert_timeout)
+            
+            # Payload too large or statement/gateway timeout - let the caller split the batch
+            too_large = (response.status_code in (413, 504) or
+                         (response.status_code == 500 and '57014' in response.text))
+            if allow_retry and too_large:
+                logger.warning(f"⚠️  Batch {batch_num}/{total_batches} of {len(batch)} records rejected "
+                               f"(HTTP {response.status_code}), retrying in smaller batches")
+                return 0, f"HTTP {response.status_code}", True
+            
+            # Debug: Log batch insert attempt details
+            if self.debug_log and response.status_code == 409:
+                logger.debug(f"🔍 BATCH INSERT CONFLICT - HTTP 409 Details:")
+                logger.debug(f"   Response: {response.text[:500]}...")  # First 500 chars
+                logger.debug(f"   Batch size: {len(cleaned_batch)} records")
+            
+            if response.status_code == 201:
+                # Success!
+                imported_records = response.json() if response.json() else []
+                imported_count = len(imported_records)
+                logger.info(f"📥 Batch {batch_num}/{total_batches}: {imported_count} records imported")
+                
+                # Log successful records to CSV
+                self._log_batch_success_to_csv(batch, imported_records, file_to_record_mapping)
+                return imported_count, None, False
+            
+            elif response.status_code == 409:
+                # Conflict - handle duplicates with individual UPSERT
+                logger.info(f"🔄 Batch {batch_num}/{total_batches} has conflicts, using individual UPSERT...")
+                
+                # Debug: Show what's in this conflicting batch
+                if self.debug_log:
+                    logger.debug(f"🔍 CONFLICT BATCH ANALYSIS - {len(cleaned_batch)} records:")
+                    seen_keys = {}
+                    for i, record in enumerate(cleaned_batch):
+                        key = f"{record.get('search_name')}/{record.get('search_state')}/{record.get('license_number')}"
+                        if key in seen_keys:
+                            logger.debug(f"   DUPLICATE KEY IN BATCH: {key}")
+                            logger.debug(f"     First occurrence: record {seen_keys[key]}")
+                            logger.debug(f"     Duplicate: record {i}")
+                        else:
+                            seen_keys[key] = i
+                        logger.debug(f"   [{i}] {key}")
+                
+                imported_count = self._handle_batch_conflicts(cleaned_batch, batch_num, file_to_record_mapping,
+                                                              source_files=[r.get(SOURCE_FILE_KEY) for r in batch])
+                return imported_count, None, False
+            
+            else:
+                # Other error - log details before raising
+                logger.error(f"💀 HTTP Status: {response.status_code}")
+                logger.error(f"💀 Error details: {response.text}")
+                
+                # Log batch details for 400 Bad Request
+                if response.status_code == 400 and cleaned_batch:
+                    self._log_batch_debug_details(cleaned_batch)
+                
+                response.raise_for_status()
+                return 0, f"HTTP {response.status_code}", False
+            
+        except requests.exceptions.Timeout as e:
+            if allow_retry:
+                logger.warning(f"⚠️  Batch {batch_num}/{total_batches} of {len(batch)} records timed out, "
+                               f"retrying in smaller batches")
+                return 0, str(e), True
+            logger.error(f"❌ Batch {batch_num}/{total_batches} failed: {e}")
+            self._log_batch_failure_to_csv(batch, str(e), file_to_record_mapping)
+            return 0, str(e), False
+        
+        except requests.exceptions.RequestException as e:
+            logger.error(f"❌ Batch {batch_num}/{total_batches} failed: {e}")
+            
+            # Log failed batch to CSV
+            self._log_batch_failure_to_csv(batch, str(e), file_to_record_mapping)
+            
+            # Enhanced debugging for 400 errors
+            if hasattr(e, 'response') and e.response:
+                logger.error(f"💀 HTTP Status: {e.response.status_code}")
+                logger.error(f"💀 Error details: {e.response.text}")
+                
+                # Log batch details for 400 Bad Request
+                if e.response.status_code == 400 and cleaned_batch:
+                    self._log_batch_debug_details(cleaned_batch)
+                
+                elif cleaned_batch:
+                    logger.error(f"First record in failed batch: {json.dumps(cleaned_batch[0], indent=2, default=str)}")
+            
+            return 0, str(e), False
     
     def import_search_results_batched(self, work_state: WorkState) -> None:
         """Phase 4: Import search results in resilient batches"""
-        logger.info(f"📥 Phase 4: Importing search results in batches of {self.batch_size}...")
+        logger.info(f"📥 Phase 4: Importing search results in batches of {self.batch_size}"
+                    f"{' (adaptive)' if self.adaptive_batches else ''}...")
         work_state.current_phase = ProcessingPhase.IMPORT
         
         # Prepare search results data
         search_results = []
+        record_work_ids = []  # work_id of the file that produced each search_results entry
         file_to_record_mapping = {}  # Track which files produce which records
         
+        # Stream parsed contents from the planning spool when it is available
+        spool = self._open_record_spool(work_state)
+        spool_misses = 0
+        
         for work_item in work_state.work_items:
+            if work_item.status == WorkItemStatus.COMPLETED:
+                continue  # Imported before an interruption
             try:
-                with open(work_item.json_path, 'r') as f:
-                    data = json.load(f)
-                
-                metadata = data.get('metadata', {})
-                search_result = data.get('search_result', {})
-                
-                # Parse timestamp safely
-                search_ts = None
-                if work_item.search_timestamp:
-                    try:
-                        search_ts = datetime.fromisoformat(work_item.search_timestamp.replace('Z', '+00:00'))
-                    except ValueError:
-                        logger.warning(f"⚠️  Invalid timestamp for {work_item.work_id}, using current time")
-                        search_ts = datetime.now(timezone.utc)
-                
-                # Process licenses
-                licenses = search_result.get('licenses', [])
-                png_exists = Path(work_item.png_path).exists()
-                
-                # Track this file for CSV logging
-                file_record_ids = []
-                
-                if not licenses:
-                    # No results found
-                    result_status = search_result.get('result_status', 'not_found')
-                    record = {
-                        'dataset_id': work_state.dataset_id,
-                        'search_name': work_item.pharmacy_name,
-                        'search_state': work_item.search_state,
-                        'search_ts': search_ts.isoformat() if search_ts else None,
-                        'license_number': None,
-                        'result_status': result_status,
-                        'meta': json.dumps(metadata),
-                        'raw': json.dumps(data),
-                        'image_hash': work_item.sha256_hash
-                    }
-                    search_results.append(record)
-                    # Generate a unique ID for this record for tracking
-                    record_id = f"{work_state.dataset_id}-{work_item.pharmacy_name}-{work_item.search_state}-no_license"
-                    file_record_ids.append(record_id)
-                else:
-                    # Process each license
-                    for i, license_info in enumerate(licenses):
-                        address_info = license_info.get('address', {})
-                        
-                        record = {
-                            'dataset_id': work_state.dataset_id,
-                            'search_name': work_item.pharmacy_name,
-                            'search_state': work_item.search_state,
-                            'search_ts': search_ts.isoformat() if search_ts else None,
-                            'license_number': license_info.get('license_number'),
-                            'license_status': license_info.get('license_status'),
-                            'license_name': license_info.get('pharmacy_name'),
-                            'license_type': license_info.get('license_type'),
-                            'address': address_info.get('street'),
-                            'city': address_info.get('city'),
-                            'state': address_info.get('state'),
-                            'zip': address_info.get('zip_code'),
-                            'issue_date': self._clean_date_field(license_info.get('issue_date')),
-                            'expiration_date': self._clean_date_field(license_info.get('expiration_date')),
-                            'result_status': search_result.get('result_status', 'found'),
-                            'meta': json.dumps(metadata),
-                            'raw': json.dumps(data),
-                            'image_hash': work_item.sha256_hash
-                        }
-                        search_results.append(record)
-                        # Generate a unique ID for this record for tracking
-                        license_num = license_info.get('license_number', f'license_{i}')
-                        record_id = f"{work_state.dataset_id}-{work_item.pharmacy_name}-{work_item.search_state}-{license_num}"
-                        file_record_ids.append(record_id)
-                
-                # Store mapping for later CSV logging with unique identifiers
-                source_html = metadata.get('source_html_file', 'unknown')
-                file_to_record_mapping[work_item.json_path] = {
-                    'pharmacy_name': work_item.pharmacy_name,
-                    'search_state': work_item.search_state,
-                    'search_timestamp': work_item.search_timestamp,
-                    'png_exists': png_exists,
-                    'licenses_count': len(licenses),
-                    'record_ids': file_record_ids,
-                    'status': 'prepared',
-                    'source_html_file': source_html,  # Add unique identifier
-                    'json_path': work_item.json_path   # Store the exact path
-                }
-                
-                # Debug: Log how many records this file will generate
-                if self.debug_log:
-                    source_html = metadata.get('source_html_file', 'unknown')
-                    logger.debug(f"📂 FILE PREPARATION: {work_item.json_path}")
-                    logger.debug(f"   🏪 Pharmacy: {work_item.pharmacy_name}")
-                    logger.debug(f"   🗺️  State: {work_item.search_state}")
-                    logger.debug(f"   📄 Source HTML: {source_html}")
-                    logger.debug(f"   📜 Licenses found: {len(licenses)}")
-                    logger.debug(f"   📋 Records to create: {len(file_record_ids)}")
-                    for idx, record_id in enumerate(file_record_ids):
-                        license_num = licenses[idx].get('license_number', 'no_license') if idx < len(licenses) else 'no_license'
-                        logger.debug(f"     [{idx+1}] {record_id} (license: {license_num})")
-                
+                records, from_spool = self._prepare_item_records(work_state, work_item, spool,
+                                                                 file_to_record_mapping)
             except Exception as e:
-                error_msg = str(e)
-                logger.error(f"❌ Failed to prepare data for {work_item.work_id}: {e}")
-                
-                # Log failure to CSV
-                self._log_file_processing(
-                    work_item.json_path,
-                    work_item.pharmacy_name,
-                    work_item.search_state,
-                    work_item.search_timestamp,
-                    Path(work_item.png_path).exists(),
-                    0,
-                    'failed_preparation',
-                    [],
-                    error_msg
-                )
+                self._record_preparation_failure(work_state, work_item, e)
                 continue
+            if not from_spool:
+                spool_misses += 1
+            search_results.extend(records)
+            record_work_ids.extend([work_item.work_id] * len(records))
+        
+        if spool:
+            spool.close()
+            if spool_misses:
+                logger.info(f"📼 {spool_misses} files were not in the spool and were read from source JSON")
         
         # Import in batches with error isolation
         if not search_results:
             logger.warning("⚠️  No search results to import")
             return
         
-        total_batches = (len(search_results) + self.batch_size - 1) // self.batch_size
+        batcher = self._new_batcher()
         completed_batches = 0
         failed_batches = 0
         total_imported = 0
         
         start_time = time.time()
-        
-        for i in range(0, len(search_results), self.batch_size):
-            batch = search_results[i:i + self.batch_size]
-            batch_num = i // self.batch_size + 1
+        failed_work_ids = {}
+        # Records still to be sent per file; a file's status is settled (and journaled)
+        # as soon as the batch holding its last record finishes
+        remaining_records: Dict[str, int] = {}
+        for work_id in record_work_ids:
+            remaining_records[work_id] = remaining_records.get(work_id, 0) + 1
+        
+        i = 0
+        batch_num = 0
+        while i < len(search_results):
+            end = batcher.next_batch_end(search_results, i)
+            batch = search_results[i:end]
+            batch_work_ids = record_work_ids[i:end]
+            batch_num += 1
+            # Estimated total at the current batch size
+            total_batches = batch_num + (len(search_results) - end + len(batch) - 1) // len(batch)
             
-            # Clean batch data and normalize keys for PostgREST compatibility
-            cleaned_batch = []
+            request_start = time.perf_counter()
+            imported_count, error_msg, retry_smaller = self._insert_batch(
+                batch, batch_num, total_batches, file_to_record_mapping,
+                allow_retry=self.adaptive_batches and len(batch) > 1
+            )
+            batcher.observe(len(batch), time.perf_counter() - request_start, too_large=retry_smaller)
+            if retry_smaller:
+                batch_num -= 1
+                continue  # Same records again at the reduced size
             
-            # First pass: collect all unique keys across all records
-            all_keys = set()
-            for result in batch:
-                all_keys.update(result.keys())
+            total_imported += imported_count
+            if error_msg is None:
+                completed_batches += 1
+            else:
+                failed_batches += 1
+                for work_id in batch_work_ids:
+                    failed_work_ids[work_id] = error_msg
             
-            # Second pass: ensure all records have the same keys
-            for result in batch:
-                cleaned_result = {}
-                for key in all_keys:
-                    value = result.get(key)
-                    if value is not None and value != '':
-                        cleaned_result[key] = value
+            # Settle files whose last record was in this batch (a file split across
+            # batches fails if any of its batches failed)
+            for work_id in batch_work_ids:
+                remaining_records[work_id] -= 1
+                if remaining_records[work_id] == 0:
+                    if work_id in failed_work_ids:
+                        work_state.update_item(work_id, status=WorkItemStatus.FAILED,
+                                               error_message=failed_work_ids[work_id])
                     else:
-                        # Add missing keys with null for PostgREST compatibility
-                        cleaned_result[key] = None
-                cleaned_batch.append(cleaned_result)
-            
-            try:
-                # Try batch insert first
-                response = self.session.post(f"{self.api_url}/search_results", json=cleaned_batch)
-                
-                # Debug: Log batch insert attempt details
-                if self.debug_log and response.status_code == 409:
-                    logger.debug(f"🔍 BATCH INSERT CONFLICT - HTTP 409 Details:")
-                    logger.debug(f"   Response: {response.text[:500]}...")  # First 500 chars
-                    logger.debug(f"   Batch size: {len(cleaned_batch)} records")
-                
-                if response.status_code == 201:
-                    # Success!
-                    imported_records = response.json() if response.json() else []
-                    imported_count = len(imported_records)
-                    total_imported += imported_count
-                    completed_batches += 1
-                    logger.info(f"📥 Batch {batch_num}/{total_batches}: {imported_count} records imported")
-                    
-                    # Log successful records to CSV
-                    self._log_batch_success_to_csv(batch, imported_records, file_to_record_mapping)
-                    
-                elif response.status_code == 409:
-                    # Conflict - handle duplicates with individual UPSERT
-                    logger.info(f"🔄 Batch {batch_num}/{total_batches} has conflicts, using individual UPSERT...")
-                    
-                    # Debug: Show what's in this conflicting batch
-                    if self.debug_log:
-                        logger.debug(f"🔍 CONFLICT BATCH ANALYSIS - {len(cleaned_batch)} records:")
-                        seen_keys = {}
-                        for i, record in enumerate(cleaned_batch):
-                            key = f"{record.get('search_name')}/{record.get('search_state')}/{record.get('license_number')}"
-                            if key in seen_keys:
-                                logger.debug(f"   DUPLICATE KEY IN BATCH: {key}")
-                                logger.debug(f"     First occurrence: record {seen_keys[key]}")
-                                logger.debug(f"     Duplicate: record {i}")
-                            else:
-                                seen_keys[key] = i
-                            logger.debug(f"   [{i}] {key}")
-                    
-                    batch_imported = self._handle_batch_conflicts(cleaned_batch, batch_num, file_to_record_mapping)
-                    total_imported += batch_imported
-                    completed_batches += 1
-                    
-                else:
-                    # Other error - log details before raising
-                    logger.error(f"💀 HTTP Status: {response.status_code}")
-                    logger.error(f"💀 Error details: {response.text}")
-                    
-                    # Log batch details for 400 Bad Request
-                    if response.status_code == 400 and cleaned_batch:
-                        logger.error(f"💀 BATCH DEBUGGING - Records in failed batch: {len(cleaned_batch)}")
-                        logger.error(f"💀 All field names in batch: {set().union(*(r.keys() for r in cleaned_batch))}")
-                        
-                        # Log first few records to identify the problem
-                        for i, record in enumerate(cleaned_batch[:3]):
-                            logger.error(f"💀 Record {i+1}/{len(cleaned_batch)}: {json.dumps(record, indent=2, default=str)}")
-                        
-                        # Check for common problems
-                        for i, record in enumerate(cleaned_batch):
-                            # Check for None values in required fields
-                            if record.get('dataset_id') is None:
-                                logger.error(f"💀 Record {i+1} has NULL dataset_id")
-                            # Check for invalid JSON in meta/raw fields  
-                            for json_field in ['meta', 'raw']:
-                                if json_field in record and record[json_field]:
-                                    try:
-                                        if isinstance(record[json_field], str):
-                                            json.loads(record[json_field])
-                                    except json.JSONDecodeError:
-                                        logger.error(f"💀 Record {i+1} has invalid JSON in {json_field}: {record[json_field][:100]}")
-                    
-                    response.raise_for_status()
-                
-            except requests.exceptions.RequestException as e:
-                failed_batches += 1
-                logger.error(f"❌ Batch {batch_num}/{total_batches} failed: {e}")
-                
-                # Log failed batch to CSV
-                self._log_batch_failure_to_csv(batch, str(e), file_to_record_mapping)
-                
-                # Enhanced debugging for 400 errors
-                if hasattr(e, 'response') and e.response:
-                    logger.error(f"💀 HTTP Status: {e.response.status_code}")
-                    logger.error(f"💀 Error details: {e.response.text}")
-                    
-                    # Log batch details for 400 Bad Request
-                    if e.response.status_code == 400 and cleaned_batch:
-                        logger.error(f"💀 BATCH DEBUGGING - Records in failed batch: {len(cleaned_batch)}")
-                        logger.error(f"💀 All field names in batch: {set().union(*(r.keys() for r in cleaned_batch))}")
-                        
-                        # Log first few records to identify the problem
-                        for i, record in enumerate(cleaned_batch[:3]):
-                            logger.error(f"💀 Record {i+1}/{len(cleaned_batch)}: {json.dumps(record, indent=2, default=str)}")
-                        
-                        # Check for common problems
-                        for i, record in enumerate(cleaned_batch):
-                            # Check for None values in required fields
-                            if record.get('dataset_id') is None:
-                                logger.error(f"💀 Record {i+1} has NULL dataset_id")
-                            # Check for invalid JSON in meta/raw fields  
-                            for json_field in ['meta', 'raw']:
-                                if json_field in record and record[json_field]:
-                                    try:
-                                        if isinstance(record[json_field], str):
-                                            json.loads(record[json_field])
-                                    except json.JSONDecodeError:
-                                        logger.error(f"💀 Record {i+1} has invalid JSON in {json_field}: {record[json_field][:100]}")
-                    
-                    elif cleaned_batch:
-                        logger.error(f"First record in failed batch: {json.dumps(cleaned_batch[0], indent=2, default=str)}")
+                        work_state.update_item(work_id, status=WorkItemStatus.COMPLETED)
+            self.state_manager.checkpoint(work_state)
+            i = end
+        total_batches = completed_batches + failed_batches
         
         # Update phase status
         duration = time.time() - start_time
@@ -943,46 +1620,379 @@ class ResilientImporter:
             'failed_batches': failed_batches,
             'total_batches': total_batches,
             'total_imported': total_imported,
+            'batch_sizes': batcher.stats(),
             'duration_seconds': round(duration, 2)
         }
         
         logger.info(f"✅ Import complete: {total_imported} records in {completed_batches}/{total_batches} batches "
                    f"({failed_batches} failed) in {duration:.1f}s")
+        if self.adaptive_batches:
+            sizes = work_state.phases['import']['batch_sizes']
+            logger.info(f"📦 Batch sizes: {sizes['min']}-{sizes['max']} records (mean {sizes['mean']}, "
+                        f"final {sizes['final']}, {sizes['grows']} grows, {sizes['shrinks']} shrinks)")
         
         # Update stats with final import count
         self.stats['records_imported'] = total_imported
     
+    def import_pipelined(self, work_state: WorkState) -> None:
+        """
+        Phases 2-4 as one pipeline: hash -> existence check -> upload -> batched insert.
+        
+        Work items flow through bounded queues (pipeline_queue_size), so a slow stage
+        applies backpressure to the ones before it. A file's records are queued for
+        insert as soon as its screenshot is known to be in storage (or it has none);
+        items whose upload fails stay FAILED and are retried on resume.
+        """
+        import queue
+        from supabase_client import AsyncBulkClient, run_async
+        from utils.image_storage import create_image_storage
+        
+        upload_workers = max(1, self.max_concurrent_uploads)
+        logger.info(f"🚰 Pipelined import: {self.max_workers} hash workers, {upload_workers} upload workers, "
+                    f"insert batches of {self.batch_size}{' (adaptive)' if self.adaptive_batches else ''}")
+        work_state.current_phase = ProcessingPhase.IMPORT
+        
+        pending_items = [item for item in work_state.work_items if item.status != WorkItemStatus.COMPLETED]
+        if not pending_items:
+            logger.info("📋 No work items left to import")
+            return
+        
+        done = object()  # End-of-stream marker
+        check_queue = queue.Queue(maxsize=self.pipeline_queue_size)
+        upload_queue = queue.Queue(maxsize=self.pipeline_queue_size)
+        insert_queue = queue.Queue(maxsize=self.pipeline_queue_size)
+        
+        lock = threading.Lock()
+        existing_hashes = set()
+        uploads_in_flight: Dict[str, List[WorkItem]] = {}  # hash -> items waiting on that upload
+        stage_stats = {name: {'items': 0, 'busy_seconds': 0.0}
+                       for name in ('sha256', 'check', 'upload', 'import')}
+        counts = {'hashed': 0, 'cached': 0, 'hash_failed': 0, 'uploaded': 0, 'upload_failed': 0,
+                  'skipped': 0, 'completed_batches': 0, 'failed_batches': 0, 'total_imported': 0}
+        errors = []
+        start_time = time.time()
+        
+        def busy(stage: str, since: float, items: int = 1):
+            with lock:
+                stage_stats[stage]['busy_seconds'] += time.time() - since
+                stage_stats[stage]['items'] += items
+        
+        def hash_stage():
+            try:
+                needs_hash: Dict[str, List[WorkItem]] = {}
+                for item in pending_items:
+                    if item.sha256_hash is None and Path(item.png_path).exists():
+                        needs_hash.setdefault(item.png_path, []).append(item)
+                    else:
+                        check_queue.put(item)
+                
+                last = time.time()
+                
+                def on_hashed(png_path: str, sha256_hash: Optional[str], from_cache: bool):
+                    nonlocal last
+                    for item in needs_hash[png_path]:
+                        work_state.update_item(item.work_id, sha256_hash=sha256_hash)
+                        if sha256_hash:
+                            counts['hashed'] += 1
+                            counts['cached'] += from_cache
+                        else:
+                            counts['hash_failed'] += 1
+                            logger.error(f"❌ SHA256 failed for {item.work_id}")
+                    busy('sha256', last, len(needs_hash[png_path]))
+                    for item in needs_hash[png_path]:
+                        check_queue.put(item)  # Blocks while the checker is behind
+                    last = time.time()
+                
+                cache = HashCache(self.hash_cache_file) if self.hash_cache_file else None
+                try:
+                    hash_files(needs_hash.keys(), cache=cache, max_workers=self.max_workers,
+                               use_processes=self.hash_processes, progress=on_hashed)
+                finally:
+                    if cache is not None:
+                        cache.close()
+            except Exception as e:
+                errors.append(f"sha256: {e}")
+                logger.error(f"💥 Pipeline hash stage failed: {e}")
+            finally:
+                check_queue.put(done)
+        
+        def route(items: List[WorkItem]):
+            """Send hashed items to upload or straight to insert (called by the check stage)"""
+            for item in items:
+                if item.sha256_hash is None or item.image_exists:
+                    insert_queue.put(item)
+                    continue
+                with lock:
+                    if item.sha256_hash in existing_hashes:
+                        work_state.update_item(item.work_id, image_exists=True)
+                        counts['skipped'] += 1
+                        forward = True
+                    elif item.sha256_hash in uploads_in_flight:
+                        uploads_in_flight[item.sha256_hash].append(item)
+                        continue
+                    else:
+                        uploads_in_flight[item.sha256_hash] = []
+                        forward = False
+                if forward:
+                    insert_queue.put(item)
+                else:
+                    upload_queue.put(item)
+        
+        def check_stage():
+            bulk = None
+            pending: List[WorkItem] = []
+            upstream_done = False
+            
+            def flush():
+                started = time.time()
+                unknown = {item.sha256_hash for item in pending
+                           if item.sha256_hash and not item.image_exists} - existing_hashes
+                if unknown:
+                    try:
+                        found = run_async(bulk.find_existing_hashes(unknown, batch_size=50))
+                    except Exception as e:
+                        logger.warning(f"⚠️  Failed to check existing images: {e}")
+                        found = set()
+                    with lock:
+                        existing_hashes.update(found)
+                busy('check', started, len(pending))
+                route(pending)
+                pending.clear()
+            
+            try:
+                bulk = AsyncBulkClient(self.base_url, dict(self.session.headers),
+                                       max_concurrency=self.max_concurrent_uploads)
+                while True:
+                    try:
+                        item = check_queue.get(timeout=0.2)
+                    except queue.Empty:
+                        if pending:
+                            flush()
+                        continue
+                    if item is done:
+                        upstream_done = True
+                        break
+                    pending.append(item)
+                    if len(pending) >= 50:
+                        flush()
+                if pending:
+                    flush()
+            except Exception as e:
+                errors.append(f"check: {e}")
+                logger.error(f"💥 Pipeline existence check stage failed: {e}")
+                # Keep draining so the hash stage never blocks on a full queue
+                while not upstream_done:
+                    upstream_done = check_queue.get() is done
+            finally:
+                for _ in range(upload_workers):
+                    upload_queue.put(done)
+                insert_queue.put(done)
+        
+        def upload_stage():
+            storage = None
+            try:
+                storage = create_image_storage('supabase')
+            except Exception as e:
+                errors.append(f"upload: {e}")
+                logger.error(f"💥 Pipeline upload stage could not create storage: {e}")
+            
+            try:
+                while True:
+                    item = upload_queue.get()
+                    if item is done:
+                        break
+                    started = time.time()
+                    success = False
+                    max_retries = 3
+                    for attempt in range(max_retries):
+                        if storage is None:
+                            work_state.update_item(item.work_id, error_message="Image storage unavailable")
+                            break
+                        try:
+                            self._store_and_register_image(item, storage)
+                            success = True
+                            break
+                        except Exception as e:
+                            work_state.update_item(
+                                item.work_id,
+                                retry_count=attempt + 1,
+                                error_message=str(e),
+                                last_attempt=datetime.now(timezone.utc).isoformat()
+                            )
+                            if attempt < max_retries - 1:
+                                logger.warning(f"⚠️  Upload retry {attempt + 1}/{max_retries} for {item.work_id}: {e}")
+                                time.sleep(1.0 * (2 ** attempt))  # Exponential backoff
+                            else:
+                                logger.error(f"❌ Upload failed after {max_retries} attempts for {item.work_id}: {e}")
+                    busy('upload', started)
+                    
+                    with lock:
+                        waiting = uploads_in_flight.pop(item.sha256_hash, [])
+                        if success:
+                            existing_hashes.add(item.sha256_hash)
+                            counts['uploaded'] += 1
+                        else:
+                            counts['upload_failed'] += 1
+                    for ready in [item] + waiting:
+                        if success:
+                            work_state.update_item(ready.work_id, image_exists=True)
+                            insert_queue.put(ready)
+                        else:
+                            work_state.update_item(ready.work_id, status=WorkItemStatus.FAILED,
+                                                   error_message=item.error_message)
+            finally:
+                insert_queue.put(done)
+        
+        batcher = self._new_batcher()
+        
+        def insert_stage():
+            spool = self._open_record_spool(work_state)
+            file_to_record_mapping = {}
+            groups: List[Tuple[WorkItem, List[Dict]]] = []  # (item, its records) awaiting insert
+            group_records = 0
+            group_bytes = 0
+            batch_num = 0
+            
+            def insert_groups(pending: List[Tuple[WorkItem, List[Dict]]]):
+                nonlocal batch_num
+                batch = [record for _, records in pending for record in records]
+                batch_num += 1
+                started = time.time()
+                imported_count, error_msg, retry_smaller = self._insert_batch(
+                    batch, batch_num, '?', file_to_record_mapping,
+                    allow_retry=self.adaptive_batches and len(pending) > 1
+                )
+                batcher.observe(len(batch), time.time() - started, too_large=retry_smaller)
+                if retry_smaller:
+                    # Split by file so each file's records still succeed or fail together
+                    middle = len(pending) // 2
+                    insert_groups(pending[:middle])
+                    insert_groups(pending[middle:])
+                    return
+                counts['total_imported'] += imported_count
+                if error_msg is None:
+                    counts['completed_batches'] += 1
+                    for item, _ in pending:
+                        work_state.update_item(item.work_id, status=WorkItemStatus.COMPLETED)
+                else:
+                    counts['failed_batches'] += 1
+                    for item, _ in pending:
+                        work_state.update_item(item.work_id, status=WorkItemStatus.FAILED, error_message=error_msg)
+                busy('import', started, len(pending))
+            
+            def flush():
+                nonlocal groups, group_records, group_bytes
+                insert_groups(groups)
+                groups, group_records, group_bytes = [], 0, 0
+                self.state_manager.checkpoint(work_state)
+            
+            producers = upload_workers + 1  # Check stage plus every upload worker
+            try:
+                while producers:
+                    try:
+                        item = insert_queue.get(timeout=1.0)
+                    except queue.Empty:
+                        if groups:
+                            flush()  # Don't hold prepared records while upstream is busy
+                        continue
+                    if item is done:
+                        producers -= 1
+                        continue
+                    try:
+                        records, _ = self._prepare_item_records(work_state, item, spool, file_to_record_mapping)
+                    except Exception as e:
+                        self._record_preparation_failure(work_state, item, e)
+                        continue
+                    # Keep a file's records in one batch so its outcome is all-or-nothing
+                    if groups and group_records + len(records) > batcher.size:
+                        flush()
+                    groups.append((item, records))
+                    group_records += len(records)
+                    group_bytes += sum(AdaptiveBatcher.record_bytes(record) for record in records)
+                    if batcher.is_full(group_records, group_bytes):
+                        flush()
+                if groups:
+                    flush()
+            except Exception as e:
+                errors.append(f"import: {e}")
+                logger.error(f"💥 Pipeline insert stage failed: {e}")
+                # Keep draining so upstream stages never block on a full queue
+                while producers:
+                    if insert_queue.get() is done:
+                        producers -= 1
+            finally:
+                if spool:
+                    spool.close()
+        
+        threads = [threading.Thread(target=hash_stage, name='pipeline-sha256'),
+                   threading.Thread(target=check_stage, name='pipeline-check'),
+                   threading.Thread(target=insert_stage, name='pipeline-import')]
+        threads += [threading.Thread(target=upload_stage, name=f'pipeline-upload-{n}') for n in range(upload_workers)]
+        for thread in threads:
+            thread.start()
+        
+        # Progress reporting while the stages run
+        while any(thread.is_alive() for thread in threads):
+            threads[2].join(timeout=10)
+            if threads[2].is_alive():
+                elapsed = time.time() - start_time
+                logger.info(f"🚰 Pipeline progress ({elapsed:.0f}s): {stage_stats['sha256']['items']} hashed, "
+                            f"{counts['uploaded']} uploaded, {stage_stats['import']['items']} files inserted "
+                            f"({counts['total_imported']} records) | queues: check={check_queue.qsize()} "
+                            f"upload={upload_queue.qsize()} insert={insert_queue.qsize()}")
+            else:
+                for thread in threads:
+                    thread.join()
+        
+        # Phase-level stats in the same shape as the sequential phases, plus stage busy time
+        duration = round(time.time() - start_time, 2)
+        status = 'failed' if errors else 'completed'
+        work_state.phases['sha256'] = {
+            'status': status,
+            'processed': counts['hashed'],
+            'cached': counts['cached'],
+            'duration_seconds': duration,
+            'busy_seconds': round(stage_stats['sha256']['busy_seconds'], 2)
+        }
+        work_state.phases['upload'] = {
+            'status': status,
+            'completed': counts['uploaded'],
+            'failed': counts['upload_failed'],
+            'skipped': counts['skipped'],
+            'duration_seconds': duration,
+            'busy_seconds': round(stage_stats['upload']['busy_seconds'] + stage_stats['check']['busy_seconds'], 2)
+        }
+        work_state.phases['import'] = {
+            'status': status,
+            'completed_batches': counts['completed_batches'],
+            'failed_batches': counts['failed_batches'],
+            'total_batches': counts['completed_batches'] + counts['failed_batches'],
+            'total_imported': counts['total_imported'],
+            'duration_seconds': duration,
+            'batch_sizes': batcher.stats(),
+            'busy_seconds': round(stage_stats['import']['busy_seconds'], 2),
+            'mode': 'pipelined'
+        }
+        self.stats['records_imported'] = counts['total_imported']
+        
+        for name, data in stage_stats.items():
+            logger.info(f"  🚰 {name}: {data['items']} items, busy {data['busy_seconds']:.1f}s of {duration:.1f}s")
+        logger.info(f"✅ Pipelined import complete: {counts['total_imported']} records, {counts['uploaded']} uploads "
+                    f"({counts['upload_failed']} failed) in {duration:.1f}s")
+        if errors:
+            raise RuntimeError(f"Pipeline stage errors: {'; '.join(errors)}")
+    
     def _log_batch_success_to_csv(self, batch: List[Dict], imported_records: List[Dict], 
                                  file_mapping: Dict) -> None:
         """Log successful batch import to CSV with actual record IDs"""
+        if not self.debug_csv_writer:
+            return
         # For each record in the batch, find the corresponding file and log success
         for i, record in enumerate(batch):
-            # Find the original file that produced this record using source_html_file for precision
-            matching_file = None
-            record_source_html = None
-            
-            # Extract source_html_file from record's raw data
-            try:
-                if record.get('raw'):
-                    raw_data = json.loads(record['raw'])
-                    record_source_html = raw_data.get('metadata', {}).get('source_html_file')
-            except:
-                pass
-            
-            # Match by source_html_file first (most precise), fallback to name+state+timestamp
-            for file_path, file_info in file_mapping.items():
-                if record_source_html and file_info.get('source_html_file') == record_source_html:
-                    matching_file = file_path
-                    break
-                elif (not record_source_html and 
-                      file_info['pharmacy_name'] == record.get('search_name') and 
-                      file_info['search_state'] == record.get('search_state') and
-                      file_info['search_timestamp'] == record.get('search_ts')):
-                    matching_file = file_path
-                    break
-            
-            if matching_file:
-                file_info = file_mapping[matching_file]
+            # Records carry the json_path of the file that produced them
+            matching_file = record.get(SOURCE_FILE_KEY)
+            file_info = file_mapping.get(matching_file)
+            if file_info:
                 # Use the imported record ID if available, otherwise use our tracked ID
                 actual_record_id = str(imported_records[i].get('id', file_info['record_ids'][0])) if i < len(imported_records) else file_info['record_ids'][0]
                 
@@ -1001,33 +2011,13 @@ class ResilientImporter:
     def _log_batch_failure_to_csv(self, batch: List[Dict], error_msg: str, 
                                  file_mapping: Dict) -> None:
         """Log failed batch import to CSV"""
+        if not self.debug_csv_writer:
+            return
         for record in batch:
-            # Find the original file that produced this record using source_html_file for precision
-            matching_file = None
-            record_source_html = None
-            
-            # Extract source_html_file from record's raw data
-            try:
-                if record.get('raw'):
-                    raw_data = json.loads(record['raw'])
-                    record_source_html = raw_data.get('metadata', {}).get('source_html_file')
-            except:
-                pass
-            
-            # Match by source_html_file first (most precise), fallback to name+state+timestamp
-            for file_path, file_info in file_mapping.items():
-                if record_source_html and file_info.get('source_html_file') == record_source_html:
-                    matching_file = file_path
-                    break
-                elif (not record_source_html and 
-                      file_info['pharmacy_name'] == record.get('search_name') and 
-                      file_info['search_state'] == record.get('search_state') and
-                      file_info['search_timestamp'] == record.get('search_ts')):
-                    matching_file = file_path
-                    break
-            
-            if matching_file:
-                file_info = file_mapping[matching_file]
+            # Records carry the json_path of the file that produced them
+            matching_file = record.get(SOURCE_FILE_KEY)
+            file_info = file_mapping.get(matching_file)
+            if file_info:
                 self._log_file_processing(
                     matching_file,
                     file_info['pharmacy_name'],
@@ -1040,9 +2030,55 @@ class ResilientImporter:
                     error_msg
                 )
     
+    def _bulk_upsert_batch(self, batch: List[Dict], batch_num: int) -> Optional[Dict[str, int]]:
+        """
+        Resolve a conflicting batch in one round trip via the upsert_search_results RPC.
+        
+        Returns {'inserted', 'updated', 'skipped'} counts, or None when the caller should
+        fall back to per-record UPSERT (RPC not installed, or the batch was rejected).
+        """
+        if not self.bulk_upsert_available:
+            return None
+        
+        try:
+            response = self.session.post(f"{self.api_url}/rpc/upsert_search_results", json={'p_rows': batch})
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"⚠️  Bulk upsert failed for batch {batch_num}, using individual UPSERT: {e}")
+            return None
+        
+        if response.status_code == 404:
+            # Migration 20261016000002 not applied - stop trying for the rest of the run
+            self.bulk_upsert_available = False
+            logger.warning("⚠️  upsert_search_results RPC not found, conflicts will use individual UPSERT")
+            return None
+        if response.status_code != 200:
+            # e.g. a bad row in the batch - per-record UPSERT isolates it
+            logger.warning(f"⚠️  Bulk upsert rejected batch {batch_num} (HTTP {response.status_code}), "
+                           f"using individual UPSERT: {response.text[:200]}")
+            return None
+        
+        result = response.json()
+        counts = result[0] if isinstance(result, list) and result else result
+        return {key: int(counts.get(key) or 0) for key in ('inserted', 'updated', 'skipped')}
+    
     def _handle_batch_conflicts(self, batch: List[Dict], batch_num: int, 
-                               file_mapping: Dict) -> int:
-        """Handle batch conflicts by doing individual UPSERT operations"""
+                               file_mapping: Dict, source_files: Optional[List[str]] = None) -> int:
+        """Handle batch conflicts with one bulk UPSERT, or individual UPSERTs as a fallback"""
+        counts = self._bulk_upsert_batch(batch, batch_num)
+        if counts is not None:
+            imported_count = counts['inserted'] + counts['updated']
+            logger.info(f"🔄 Batch {batch_num}: {counts['inserted']} inserted, {counts['updated']} updated, "
+                        f"{counts['skipped']} skipped (not newer than the stored row, another search's row, "
+                        f"or superseded within the batch)")
+        else:
+            imported_count = self._upsert_records_individually(batch, batch_num)
+        
+        # Log upsert results to CSV
+        self._log_batch_upsert_to_csv(batch, file_mapping, source_files)
+        return imported_count
+    
+    def _upsert_records_individually(self, batch: List[Dict], batch_num: int) -> int:
+        """UPSERT each record with its own GET (and PATCH/POST); newer search_ts wins"""
         imported_count = 0
         
         for i, record in enumerate(batch):
@@ -1187,35 +2223,18 @@ class ResilientImporter:
                 continue
         
         logger.info(f"🔄 Batch {batch_num}: {imported_count}/{len(batch)} records upserted successfully")
-        
-        # Log upsert results to CSV
-        for record in batch:
-            # Find the original file that produced this record using source_html_file for precision
-            matching_file = None
-            record_source_html = None
-            
-            # Extract source_html_file from record's raw data
-            try:
-                if record.get('raw'):
-                    raw_data = json.loads(record['raw'])
-                    record_source_html = raw_data.get('metadata', {}).get('source_html_file')
-            except:
-                pass
-            
-            # Match by source_html_file first (most precise), fallback to name+state+timestamp
-            for file_path, file_info in file_mapping.items():
-                if record_source_html and file_info.get('source_html_file') == record_source_html:
-                    matching_file = file_path
-                    break
-                elif (not record_source_html and 
-                      file_info['pharmacy_name'] == record.get('search_name') and 
-                      file_info['search_state'] == record.get('search_state') and
-                      file_info['search_timestamp'] == record.get('search_ts')):
-                    matching_file = file_path
-                    break
-            
-            if matching_file:
-                file_info = file_mapping[matching_file]
+        return imported_count
+    
+    def _log_batch_upsert_to_csv(self, batch: List[Dict], file_mapping: Dict,
+                                 source_files: Optional[List[str]] = None) -> None:
+        """Log upserted batch records to CSV (source_files aligns with batch when records were cleaned)"""
+        if not self.debug_csv_writer:
+            return
+        for i, record in enumerate(batch):
+            # Records carry the json_path of the file that produced them
+            matching_file = source_files[i] if source_files else record.get(SOURCE_FILE_KEY)
+            file_info = file_mapping.get(matching_file)
+            if file_info:
                 record_id = f"{record.get('dataset_id')}-{record.get('search_name')}-{record.get('search_state')}-{record.get('license_number', 'no_license')}"
                 self._log_file_processing(
                     matching_file,
@@ -1228,8 +2247,6 @@ class ResilientImporter:
                     [record_id],
                     None
                 )
-        
-        return imported_count
     
     def check_for_duplicates(self, work_state: WorkState) -> None:
         """Check for duplicate records based on name, state, timestamp"""
@@ -1367,7 +2384,7 @@ class ResilientImporter:
         print(f"\n❌ Failed Items: {len(work_state.failed_items)}")
         if work_state.failed_items:
             for item_id in work_state.failed_items[:5]:  # Show first 5
-                item = next((i for i in work_state.work_items if i.work_id == item_id), None)
+                item = work_state.get_item(item_id)
                 if item:
                     print(f"  - {item_id}: {item.error_message}")
             if len(work_state.failed_items) > 5:
@@ -1387,6 +2404,17 @@ class ResilientImporter:
             if not self.single_file:
                 self.check_for_duplicates(work_state)
             
+            if self.pipelined:
+                # Phases 2-4 overlapped through bounded queues
+                try:
+                    self.import_pipelined(work_state)
+                finally:
+                    self.state_manager.save_state(work_state)
+                if not self.single_file:
+                    self.check_for_duplicates(work_state)
+                self.print_progress_summary(work_state)
+                return True
+            
             # Phase 2: SHA256 computation
             self.compute_sha256_parallel(work_state)
             self.state_manager.save_state(work_state)
@@ -1416,9 +2444,10 @@ class ResilientImporter:
             logger.error(f"💥 Import failed: {e}")
             return False
         finally:
-            # Close CSV debug file if open
-            if self.debug_csv_file:
-                self.debug_csv_file.close()
+            self.state_manager.close()
+            # Flush and close CSV debug file if open
+            if self.debug_csv_writer:
+                self.debug_csv_writer.close()
                 logger.info("📝 CSV debug log closed")
     
     def resume_import(self, state_file: str = "work_state.json") -> bool:
@@ -1431,6 +2460,15 @@ class ResilientImporter:
         logger.info(f"🔄 Resuming import for {work_state.tag} from {work_state.current_phase.value} phase")
         
         try:
+            if self.pipelined:
+                # Re-run every item that has not been imported yet
+                try:
+                    self.import_pipelined(work_state)
+                finally:
+                    self.state_manager.save_state(work_state)
+                self.print_progress_summary(work_state)
+                return True
+            
             # Resume from current phase
             if work_state.current_phase in [ProcessingPhase.PLANNING, ProcessingPhase.SHA256]:
                 if work_state.phases['sha256']['status'] != 'completed':
@@ -1454,9 +2492,10 @@ class ResilientImporter:
             logger.error(f"💥 Resume failed: {e}")
             return False
         finally:
-            # Close CSV debug file if open
-            if self.debug_csv_file:
-                self.debug_csv_file.close()
+            self.state_manager.close()
+            # Flush and close CSV debug file if open
+            if self.debug_csv_writer:
+                self.debug_csv_writer.close()
                 logger.info("📝 CSV debug log closed")
 
 
@@ -1471,12 +2510,29 @@ def main():
     parser.add_argument('--description', default=None)
     parser.add_argument('--max-workers', type=int, default=16, help='Max workers for SHA256')
     parser.add_argument('--max-uploads', type=int, default=10, help='Max concurrent uploads')
-    parser.add_argument('--batch-size', type=int, default=25, help='Import batch size')
+    parser.add_argument('--batch-size', type=int, default=25, help='Import batch size (starting size when adaptive)')
+    parser.add_argument('--no-adaptive-batches', action='store_true', help='Always insert exactly --batch-size records')
+    parser.add_argument('--max-batch-size', type=int, default=500, help='Largest adaptive insert batch')
+    parser.add_argument('--batch-bytes', type=int, default=2 * 1024 * 1024,
+                        help='Approximate payload budget per insert request')
+    parser.add_argument('--batch-latency', type=float, default=2.0,
+                        help='Target seconds per insert request for adaptive sizing')
     parser.add_argument('--state-file', default='work_state.json', help='Work state file')
     parser.add_argument('--resume', action='store_true', help='Resume from saved state')
     parser.add_argument('--verify-writes', action='store_true', help='Verify writes by reading back records')
     parser.add_argument('--debug-log', action='store_true', help='Enable detailed debug logging to file')
     parser.add_argument('--single-file', help='Process only a single JSON file (full path)')
+    parser.add_argument('--hash-cache', default='', help='SHA256 cache file (default: next to the state file)')
+    parser.add_argument('--no-hash-cache', action='store_true', help='Always rehash screenshots')
+    parser.add_argument('--hash-processes', action='store_true', help='Hash screenshots in a process pool')
+    parser.add_argument('--plan-window', type=int, default=1024,
+                        help='Max parse files in flight while planning (lower for bounded memory)')
+    parser.add_argument('--no-spool', action='store_true',
+                        help='Do not spool parsed records during planning (import re-reads source JSON)')
+    parser.add_argument('--pipelined', action='store_true',
+                        help='Overlap hashing, uploads and inserts instead of running phases sequentially')
+    parser.add_argument('--pipeline-queue-size', type=int, default=256,
+                        help='Max items buffered between pipeline stages')
     
     args = parser.parse_args()
     
@@ -1491,7 +2547,17 @@ def main():
         state_file=args.state_file,
         verify_writes=args.verify_writes,
         debug_log=args.debug_log,
-        single_file=args.single_file
+        single_file=args.single_file,
+        hash_cache_file=None if args.no_hash_cache else args.hash_cache,
+        hash_processes=args.hash_processes,
+        plan_window=args.plan_window,
+        spool_file=None if args.no_spool else "",
+        pipelined=args.pipelined,
+        pipeline_queue_size=args.pipeline_queue_size,
+        adaptive_batches=not args.no_adaptive_batches,
+        max_batch_size=args.max_batch_size,
+        batch_target_bytes=args.batch_bytes,
+        batch_target_latency=args.batch_latency
     )
     
     if args.resume:
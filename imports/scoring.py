@@ -9,13 +9,18 @@ database schema to provide efficient batch scoring.
 Key Features:
 - Lazy computation: Only scores needed pharmacy/search pairs
 - Batch processing with configurable batch sizes
+- Bulk mode: two set-based address fetches and one upsert per batch
+- Optional process pool for CPU-bound scoring with a single DB writer
 - Comprehensive error handling and progress tracking
-- Uses database functions to identify missing scores
+- Uses get_missing_score_pairs() to identify missing scores (keyset-paginated)
 - Atomic score updates with conflict resolution
 """
 
 import json
 import logging
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from typing import List, Tuple, Dict, Any, Optional
 from .base import BaseImporter
@@ -29,10 +34,36 @@ parent_dir = Path(__file__).parent.parent
 if str(parent_dir) not in sys.path:
     sys.path.insert(0, str(parent_dir))
 
-from scoring_plugin import Address, match_addresses
+from scoring_plugin import (
+    Address, SCORING_VERSION, address_fingerprints, match_addresses_batch, get_normalizer_cache_info
+)
 
 logger = logging.getLogger(__name__)
 
+# Compact address form sent to scoring workers: (address, suite, city, state, zip)
+AddressTuple = Tuple[Optional[str], Optional[str], Optional[str], Optional[str], Optional[str]]
+
+def _address_tuple(addr: Address) -> AddressTuple:
+    """Convert an Address into the compact tuple form used by scoring workers"""
+    return (addr.address, addr.suite, addr.city, addr.state, addr.zip)
+
+def _score_address_tuples(state_tuples: List[AddressTuple],
+                          pharmacy_tuples: List[AddressTuple]) -> List[Tuple[float, float, float, str]]:
+    """
+    Score aligned address tuples (runs inside scoring worker processes).
+    
+    Returns:
+        List of (street_score, city_state_zip_score, overall_score, input_fingerprint)
+        in input order
+    """
+    fields = ('address', 'suite', 'city', 'state', 'zip')
+    state_cols = {field: [t[i] for t in state_tuples] for i, field in enumerate(fields)}
+    pharmacy_cols = {field: [t[i] for t in pharmacy_tuples] for i, field in enumerate(fields)}
+    
+    street_scores, csz_scores, overall_scores = match_addresses_batch(state_cols, pharmacy_cols)
+    fingerprints = address_fingerprints(state_cols, pharmacy_cols)
+    return list(zip(street_scores.tolist(), csz_scores.tolist(), overall_scores.tolist(), fingerprints))
+
 class ScoringEngine(BaseImporter):
     """
     Lazy scoring engine that computes address match scores on-demand.
@@ -48,53 +79,70 @@ class ScoringEngine(BaseImporter):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.logger = logging.getLogger('ScoringEngine')
-        self.scoring_version = "v1.0"  # For tracking algorithm versions
+        self.scoring_version = SCORING_VERSION  # For tracking algorithm versions
     
     def find_missing_scores(self, states_tag: str, pharmacies_tag: str, 
-                           limit: int = 1000) -> List[Tuple[int, int]]:
+                           limit: int = 1000, page_size: int = 5000) -> List[Tuple[int, int]]:
         """
         Find pharmacy/result pairs that need scoring using database function.
         
+        Uses get_missing_score_pairs(), which anti-joins match_scores on the
+        server and pages by (pharmacy_id, result_id), so only unscored id pairs
+        are transferred.
+        
         Args:
             states_tag: Tag for the states dataset
             pharmacies_tag: Tag for the pharmacies dataset  
-            limit: Maximum number of pairs to return
+            limit: Maximum number of pairs to return (None for all)
+            page_size: Pairs fetched per keyset page
             
         Returns:
-            List of (pharmacy_id, result_id) tuples needing scores
+            List of (pharmacy_id, result_id) tuples needing scores, ordered by id
         """
-        with self.db.conn.cursor() as cur:
-            # Get all comprehensive results for these datasets
-            cur.execute("""
-                SELECT pharmacy_id, result_id, score_overall
-                FROM get_all_results_with_context(%s, %s, NULL)
-                WHERE result_id IS NOT NULL
-            """, (states_tag, pharmacies_tag))
-            all_results = cur.fetchall()
-            
-        # Filter to only those without scores
-        missing = [(row[0], row[1]) for row in all_results if row[2] is None]
+        missing = []
+        after_pharmacy_id, after_result_id = None, None
         
-        # Apply limit
-        if limit and len(missing) > limit:
-            missing = missing[:limit]
+        with self.db.conn.cursor() as cur:
+            while True:
+                want = min(page_size, limit - len(missing)) if limit else page_size
+                cur.execute("""
+                    SELECT pharmacy_id, result_id
+                    FROM get_missing_score_pairs(%s, %s, %s, %s, %s)
+                """, (states_tag, pharmacies_tag, want, after_pharmacy_id, after_result_id))
+                page = [(row[0], row[1]) for row in cur.fetchall()]
+                missing.extend(page)
+                
+                if len(page) < want or (limit and len(missing) >= limit):
+                    break
+                after_pharmacy_id, after_result_id = page[-1]
             
         self.logger.info(f"Found {len(missing)} pharmacy/result pairs needing scores")
         return missing
     
     def compute_scores(self, states_tag: str, pharmacies_tag: str, 
-                       batch_size: int = 200, max_pairs: Optional[int] = None) -> Dict[str, Any]:
+                       batch_size: int = 200, max_pairs: Optional[int] = None,
+                       bulk: bool = True, workers: int = 1) -> Dict[str, Any]:
         """
         Compute missing scores for the given dataset combination.
         
+        Pairs are sorted by (pharmacy_id, result_id) and batches are written in
+        that order regardless of the number of workers, so repeated runs over
+        the same data produce identical batches and upserts.
+        
         Args:
             states_tag: Tag for the states dataset
             pharmacies_tag: Tag for the pharmacies dataset
             batch_size: Number of scores to compute per batch
             max_pairs: Maximum pharmacy/search pairs to process (None for all)
+            bulk: Load each batch's addresses with set-based queries instead of
+                  one SELECT per pharmacy and per result
+            workers: Number of scoring processes. With workers > 1, batches are
+                     fetched in bulk here, scored in a ProcessPoolExecutor and
+                     upserted by this process; workers=1 scores in-process
             
         Returns:
-            Dict with processing statistics
+            Dict with processing statistics, including per-phase 'timings'
+            (fetch, score, write) in seconds
         """
         
         self.logger.info(f"Starting score computation for datasets: states='{states_tag}', pharmacies='{pharmacies_tag}'")
@@ -117,7 +165,11 @@ class ScoringEngine(BaseImporter):
         if max_pairs:
             missing = missing[:max_pairs]
         
-        self.logger.info(f"Processing {len(missing)} pharmacy/result pairs in batches of {batch_size}")
+        # Deterministic processing order for reproducible batches
+        missing = sorted(missing)
+        
+        self.logger.info(f"Processing {len(missing)} pharmacy/result pairs in batches of {batch_size}"
+                         f"{f' with {workers} workers' if workers > 1 else ''}")
         
         # Processing statistics
         stats = {
@@ -125,21 +177,50 @@ class ScoringEngine(BaseImporter):
             'scores_computed': 0,
             'batches_processed': 0,
             'errors': 0,
-            'start_time': datetime.now()
+            'start_time': datetime.now(),
+            'timings': {'fetch': 0.0, 'score': 0.0, 'write': 0.0},
+            'workers': workers
         }
         
-        # Process in batches
+        if workers > 1:
+            self._compute_scores_parallel(missing, batch_size, states_id, pharmacies_id, stats, workers)
+        else:
+            self._compute_scores_serial(missing, batch_size, states_id, pharmacies_id, stats, bulk)
+        
+        stats['end_time'] = datetime.now()
+        stats['duration'] = (stats['end_time'] - stats['start_time']).total_seconds()
+        
+        cache_info = get_normalizer_cache_info()
+        stats['normalizer_cache'] = {'hits': cache_info['hits'], 'misses': cache_info['misses']}
+        
+        self.logger.info(f"Scoring complete: {stats['scores_computed']} scores computed in {stats['batches_processed']} batches ({stats['errors']} errors)")
+        self.logger.info(f"Phase timings: fetch={stats['timings']['fetch']:.2f}s, "
+                         f"score={stats['timings']['score']:.2f}s, write={stats['timings']['write']:.2f}s")
+        
+        return stats
+    
+    def _compute_scores_serial(self, missing: List[Tuple[int, int]], batch_size: int,
+                               states_id: int, pharmacies_id: int,
+                               stats: Dict[str, Any], bulk: bool):
+        """Fetch, score and upsert each batch in this process"""
+        total_batches = (len(missing) + batch_size - 1) // batch_size
+        
         for i in range(0, len(missing), batch_size):
             batch = missing[i:i + batch_size]
             batch_num = i // batch_size + 1
             
-            self.logger.info(f"Processing batch {batch_num}/{(len(missing) + batch_size - 1) // batch_size}")
+            self.logger.info(f"Processing batch {batch_num}/{total_batches}")
             
             try:
-                batch_scores = self._compute_batch_scores(batch, states_id, pharmacies_id)
+                if bulk:
+                    batch_scores = self._compute_batch_scores_bulk(batch, states_id, pharmacies_id, stats['timings'])
+                else:
+                    batch_scores = self._compute_batch_scores(batch, states_id, pharmacies_id, stats['timings'])
                 
                 if batch_scores:
+                    write_start = time.perf_counter()
                     self._upsert_scores(batch_scores)
+                    stats['timings']['write'] += time.perf_counter() - write_start
                     stats['scores_computed'] += len(batch_scores)
                     self.logger.info(f"Batch {batch_num}: computed {len(batch_scores)} scores")
                 
@@ -149,13 +230,65 @@ class ScoringEngine(BaseImporter):
                 self.logger.error(f"Failed to process batch {batch_num}: {e}")
                 stats['errors'] += 1
                 continue
+    
+    def _compute_scores_parallel(self, missing: List[Tuple[int, int]], batch_size: int,
+                                 states_id: int, pharmacies_id: int,
+                                 stats: Dict[str, Any], workers: int):
+        """
+        Fan batch scoring out to a process pool with this process as the only writer.
         
-        stats['end_time'] = datetime.now()
-        stats['duration'] = (stats['end_time'] - stats['start_time']).total_seconds()
+        Batches are fetched here in bulk and sent to workers as compact address
+        tuples. Results are consumed strictly in submission order, so upserts
+        happen in the same order as the serial path. At most 2 * workers
+        batches are in flight at a time.
+        """
+        total_batches = (len(missing) + batch_size - 1) // batch_size
+        in_flight = deque()
         
-        self.logger.info(f"Scoring complete: {stats['scores_computed']} scores computed in {stats['batches_processed']} batches ({stats['errors']} errors)")
+        def _drain_one():
+            batch_num, scored_pairs, future = in_flight.popleft()
+            try:
+                wait_start = time.perf_counter()
+                scores = future.result()
+                stats['timings']['score'] += time.perf_counter() - wait_start
+                
+                batch_scores = self._build_score_rows(scored_pairs, scores, states_id, pharmacies_id)
+                if batch_scores:
+                    write_start = time.perf_counter()
+                    self._upsert_scores(batch_scores)
+                    stats['timings']['write'] += time.perf_counter() - write_start
+                    stats['scores_computed'] += len(batch_scores)
+                    self.logger.info(f"Batch {batch_num}/{total_batches}: computed {len(batch_scores)} scores")
+                
+                stats['batches_processed'] += 1
+            except Exception as e:
+                self.logger.error(f"Failed to process batch {batch_num}: {e}")
+                stats['errors'] += 1
         
-        return stats
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for i in range(0, len(missing), batch_size):
+                batch = missing[i:i + batch_size]
+                batch_num = i // batch_size + 1
+                
+                try:
+                    scored_pairs, state_addrs, pharmacy_addrs = self._fetch_batch_bulk(batch, stats['timings'])
+                except Exception as e:
+                    self.logger.error(f"Failed to fetch batch {batch_num}: {e}")
+                    stats['errors'] += 1
+                    continue
+                
+                future = executor.submit(
+                    _score_address_tuples,
+                    [_address_tuple(a) for a in state_addrs],
+                    [_address_tuple(a) for a in pharmacy_addrs]
+                )
+                in_flight.append((batch_num, scored_pairs, future))
+                
+                if len(in_flight) >= workers * 2:
+                    _drain_one()
+            
+            while in_flight:
+                _drain_one()
     
     def _get_dataset_ids(self, states_tag: str, pharmacies_tag: str) -> Optional[Tuple[int, int]]:
         """Get dataset IDs for the given tags"""
@@ -173,19 +306,25 @@ class ScoringEngine(BaseImporter):
         return None
     
     def _compute_batch_scores(self, batch: List[Tuple[int, int]], 
-                             states_id: int, pharmacies_id: int) -> List[Tuple]:
+                             states_id: int, pharmacies_id: int,
+                             timings: Optional[Dict[str, float]] = None) -> List[Tuple]:
         """
-        Compute scores for a batch of pharmacy/result pairs.
+        Compute scores for a batch of pharmacy/result pairs, fetching each
+        pharmacy and result with its own query.
         
         Args:
             batch: List of (pharmacy_id, result_id) tuples
             states_id: States dataset ID
             pharmacies_id: Pharmacies dataset ID
+            timings: Optional dict accumulating 'fetch' and 'score' seconds
             
         Returns:
             List of score tuples ready for database insertion
         """
-        batch_scores = []
+        fetch_start = time.perf_counter()
+        scored_pairs = []
+        state_addrs = []
+        pharmacy_addrs = []
         
         for pharmacy_id, result_id in batch:
             try:
@@ -200,49 +339,158 @@ class ScoringEngine(BaseImporter):
                 if not result:
                     continue
                 
-                # Create state address from the result
-                state_addr = Address(
-                    address=result['address'],
-                    suite=None,  # Search results typically don't have suite info
-                    city=result['city'],
-                    state=result['state'],
-                    zip=result['zip']
-                )
-                
-                try:
-                    street_score, csz_score, overall_score = match_addresses(state_addr, pharm_addr)
-                    
-                    # Create scoring metadata
-                    scoring_meta = {
-                        'algorithm': self.scoring_version,
-                        'timestamp': datetime.now().isoformat(),
-                        'pharmacy_id': pharmacy_id,
-                        'result_id': result_id,
-                        'search_name': result.get('search_name'),
-                        'search_state': result.get('search_state')
-                    }
-                    
-                    batch_scores.append((
-                        states_id,
-                        pharmacies_id,
-                        pharmacy_id,
-                        result_id,
-                        round(overall_score, 2),   # Round to 2 decimal places
-                        round(street_score, 2),
-                        round(csz_score, 2),
-                        json.dumps(scoring_meta)
-                    ))
-                    
-                    self.logger.debug(f"Scored pharmacy {pharmacy_id} vs result {result_id}: {overall_score:.1f}")
-                    
-                except Exception as e:
-                    self.logger.error(f"Failed to score pharmacy {pharmacy_id} result {result_id}: {e}")
-                    continue
+                state_addrs.append(self._result_address(result))
+                pharmacy_addrs.append(pharm_addr)
+                scored_pairs.append((pharmacy_id, result_id, result))
                 
             except Exception as e:
                 self.logger.error(f"Failed to process pharmacy {pharmacy_id} result {result_id}: {e}")
                 continue
         
+        if timings is not None:
+            timings['fetch'] += time.perf_counter() - fetch_start
+        
+        return self._score_pairs(scored_pairs, state_addrs, pharmacy_addrs,
+                                 states_id, pharmacies_id, timings)
+    
+    def _compute_batch_scores_bulk(self, batch: List[Tuple[int, int]], 
+                                   states_id: int, pharmacies_id: int,
+                                   timings: Optional[Dict[str, float]] = None) -> List[Tuple]:
+        """
+        Compute scores for a batch of pharmacy/result pairs using two
+        set-based queries (pharmacies and search results keyed by id)
+        and in-memory lookups.
+        
+        Args:
+            batch: List of (pharmacy_id, result_id) tuples
+            states_id: States dataset ID
+            pharmacies_id: Pharmacies dataset ID
+            timings: Optional dict accumulating 'fetch' and 'score' seconds
+            
+        Returns:
+            List of score tuples ready for database insertion
+        """
+        scored_pairs, state_addrs, pharmacy_addrs = self._fetch_batch_bulk(batch, timings)
+        return self._score_pairs(scored_pairs, state_addrs, pharmacy_addrs,
+                                 states_id, pharmacies_id, timings)
+    
+    def _fetch_batch_bulk(self, batch: List[Tuple[int, int]],
+                          timings: Optional[Dict[str, float]] = None) -> Tuple[List, List[Address], List[Address]]:
+        """
+        Load addresses for a batch with two set-based queries.
+        
+        Returns:
+            Tuple of (scored_pairs, state_addrs, pharmacy_addrs), aligned by
+            position; scored_pairs holds (pharmacy_id, result_id, result)
+        """
+        fetch_start = time.perf_counter()
+        pharmacy_map = self._get_pharmacy_addresses({pharmacy_id for pharmacy_id, _ in batch})
+        result_map = self._get_results({result_id for _, result_id in batch})
+        
+        scored_pairs = []
+        state_addrs = []
+        pharmacy_addrs = []
+        
+        for pharmacy_id, result_id in batch:
+            pharm_addr = pharmacy_map.get(pharmacy_id)
+            if not pharm_addr:
+                self.logger.warning(f"No pharmacy address found for pharmacy_id {pharmacy_id}")
+                continue
+            
+            result = result_map.get(result_id)
+            if not result:
+                continue
+            
+            state_addrs.append(self._result_address(result))
+            pharmacy_addrs.append(pharm_addr)
+            scored_pairs.append((pharmacy_id, result_id, result))
+        
+        if timings is not None:
+            timings['fetch'] += time.perf_counter() - fetch_start
+        
+        return scored_pairs, state_addrs, pharmacy_addrs
+    
+    def _result_address(self, result: Dict[str, Any]) -> Address:
+        """Create state address from a search result"""
+        return Address(
+            address=result['address'],
+            suite=None,  # Search results typically don't have suite info
+            city=result['city'],
+            state=result['state'],
+            zip=result['zip']
+        )
+    
+    def _score_pairs(self, scored_pairs: List[Tuple[int, int, Dict[str, Any]]],
+                     state_addrs: List[Address], pharmacy_addrs: List[Address],
+                     states_id: int, pharmacies_id: int,
+                     timings: Optional[Dict[str, float]] = None) -> List[Tuple]:
+        """
+        Score collected pairs in one vectorized call and build score tuples.
+        
+        Args:
+            scored_pairs: List of (pharmacy_id, result_id, result) aligned with the address lists
+            state_addrs: Search result addresses
+            pharmacy_addrs: Pharmacy addresses
+            states_id: States dataset ID
+            pharmacies_id: Pharmacies dataset ID
+            timings: Optional dict accumulating 'score' seconds
+            
+        Returns:
+            List of score tuples ready for database insertion
+        """
+        if not scored_pairs:
+            return []
+        
+        score_start = time.perf_counter()
+        
+        # Score the whole batch in one vectorized call
+        street_scores, csz_scores, overall_scores = match_addresses_batch(state_addrs, pharmacy_addrs)
+        fingerprints = address_fingerprints(state_addrs, pharmacy_addrs)
+        batch_scores = self._build_score_rows(
+            scored_pairs, zip(street_scores, csz_scores, overall_scores, fingerprints),
+            states_id, pharmacies_id
+        )
+        
+        if timings is not None:
+            timings['score'] += time.perf_counter() - score_start
+        
+        return batch_scores
+    
+    def _build_score_rows(self, scored_pairs: List[Tuple[int, int, Dict[str, Any]]], scores,
+                          states_id: int, pharmacies_id: int) -> List[Tuple]:
+        """
+        Build match_scores rows from scored pairs and aligned
+        (street_score, city_state_zip_score, overall_score, input_fingerprint) tuples.
+        """
+        batch_scores = []
+        timestamp = datetime.now().isoformat()
+        
+        for (pharmacy_id, result_id, result), (street_score, csz_score, overall_score, fingerprint) in zip(scored_pairs, scores):
+            # Create scoring metadata
+            scoring_meta = {
+                'algorithm': self.scoring_version,
+                'timestamp': timestamp,
+                'pharmacy_id': pharmacy_id,
+                'result_id': result_id,
+                'search_name': result.get('search_name'),
+                'search_state': result.get('search_state')
+            }
+            
+            batch_scores.append((
+                states_id,
+                pharmacies_id,
+                pharmacy_id,
+                result_id,
+                round(float(overall_score), 2),   # Round to 2 decimal places
+                round(float(street_score), 2),
+                round(float(csz_score), 2),
+                json.dumps(scoring_meta),
+                self.scoring_version,
+                fingerprint
+            ))
+            
+            self.logger.debug(f"Scored pharmacy {pharmacy_id} vs result {result_id}: {overall_score:.1f}")
+        
         return batch_scores
     
     def _get_pharmacy_address(self, pharmacy_id: int) -> Optional[Address]:
@@ -294,6 +542,59 @@ class ScoringEngine(BaseImporter):
             
             return None
     
+    def _get_pharmacy_addresses(self, pharmacy_ids) -> Dict[int, Address]:
+        """Get pharmacy addresses for many pharmacies in one query, keyed by id"""
+        if not pharmacy_ids:
+            return {}
+        
+        with self.db.conn.cursor() as cur:
+            cur.execute("""
+                SELECT id, address, suite, city, state, zip 
+                FROM pharmacies 
+                WHERE id = ANY(%s)
+            """, (list(pharmacy_ids),))
+            
+            return {
+                row[0]: Address(
+                    address=row[1],
+                    suite=row[2],
+                    city=row[3],
+                    state=row[4],
+                    zip=row[5]
+                )
+                for row in cur.fetchall()
+            }
+    
+    def _get_results(self, result_ids) -> Dict[int, Dict[str, Any]]:
+        """Get many search results in one query, keyed by id"""
+        if not result_ids:
+            return {}
+        
+        with self.db.conn.cursor() as cur:
+            cur.execute("""
+                SELECT id, search_name, search_state, address, city, state, zip, 
+                       license_number, license_status, result_status
+                FROM search_results 
+                WHERE id = ANY(%s)
+                AND result_status != 'no_results_found'
+            """, (list(result_ids),))
+            
+            return {
+                row[0]: {
+                    'id': row[0],
+                    'search_name': row[1],
+                    'search_state': row[2],
+                    'address': row[3],
+                    'city': row[4],
+                    'state': row[5],
+                    'zip': row[6],
+                    'license_number': row[7],
+                    'license_status': row[8],
+                    'result_status': row[9]
+                }
+                for row in cur.fetchall()
+            }
+    
     def _upsert_scores(self, scores: List[Tuple]):
         """
         Batch upsert scores to database with conflict resolution.
@@ -313,7 +614,8 @@ class ScoringEngine(BaseImporter):
                     """
                     INSERT INTO match_scores 
                         (states_dataset_id, pharmacies_dataset_id, pharmacy_id, result_id,
-                         score_overall, score_street, score_city_state_zip, scoring_meta)
+                         score_overall, score_street, score_city_state_zip, scoring_meta,
+                         scoring_version, input_fingerprint)
                     VALUES %s
                     ON CONFLICT (states_dataset_id, pharmacies_dataset_id, pharmacy_id, result_id)
                     DO UPDATE SET
@@ -321,10 +623,12 @@ class ScoringEngine(BaseImporter):
                         score_street = EXCLUDED.score_street,
                         score_city_state_zip = EXCLUDED.score_city_state_zip,
                         scoring_meta = EXCLUDED.scoring_meta,
+                        scoring_version = EXCLUDED.scoring_version,
+                        input_fingerprint = EXCLUDED.input_fingerprint,
                         created_at = now()
                     """,
                     scores,
-                    template="(%s, %s, %s, %s, %s, %s, %s, %s)"
+                    template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
                 )
                 
                 self.db.commit()
@@ -332,9 +636,113 @@ class ScoringEngine(BaseImporter):
                 
             except Exception as e:
                 self.logger.error(f"Failed to upsert scores: {e}")
-                self.conn.rollback()
+                self.db.rollback()
                 raise
     
+    def rescore_stale(self, states_tag: str, pharmacies_tag: str,
+                      batch_size: int = 200, page_size: int = 5000) -> Dict[str, Any]:
+        """
+        Recompute only the existing scores that are out of date.
+        
+        A stored score is stale when its scoring_version differs from the
+        current SCORING_VERSION or its input_fingerprint no longer matches the
+        normalized addresses it was computed from. Rows are walked in
+        (pharmacy_id, result_id) order with keyset pagination; unchanged rows
+        are skipped without touching the database.
+        
+        Args:
+            states_tag: Tag for the states dataset
+            pharmacies_tag: Tag for the pharmacies dataset
+            batch_size: Number of stale pairs to upsert per batch
+            page_size: Number of stored scores read per page
+            
+        Returns:
+            Dict with rows_checked, skipped, recomputed, errors and timings
+        """
+        stats = {
+            'rows_checked': 0,
+            'skipped': 0,
+            'recomputed': 0,
+            'errors': 0,
+            'scoring_version': self.scoring_version,
+            'timings': {'fetch': 0.0, 'score': 0.0, 'write': 0.0}
+        }
+        
+        dataset_ids = self._get_dataset_ids(states_tag, pharmacies_tag)
+        if not dataset_ids:
+            self.logger.error(f"Could not find dataset IDs for tags: {states_tag}, {pharmacies_tag}")
+            return stats
+        states_id, pharmacies_id = dataset_ids
+        
+        after = (0, 0)
+        while True:
+            fetch_start = time.perf_counter()
+            with self.db.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT ms.pharmacy_id, ms.result_id, ms.scoring_version, ms.input_fingerprint,
+                           p.address, p.suite, p.city, p.state, p.zip,
+                           sr.search_name, sr.search_state,
+                           sr.address, sr.city, sr.state, sr.zip
+                    FROM match_scores ms
+                    JOIN pharmacies p ON p.id = ms.pharmacy_id
+                    JOIN search_results sr ON sr.id = ms.result_id
+                    WHERE ms.states_dataset_id = %s
+                      AND ms.pharmacies_dataset_id = %s
+                      AND (ms.pharmacy_id, ms.result_id) > (%s, %s)
+                    ORDER BY ms.pharmacy_id, ms.result_id
+                    LIMIT %s
+                """, (states_id, pharmacies_id, after[0], after[1], page_size))
+                rows = cur.fetchall()
+            stats['timings']['fetch'] += time.perf_counter() - fetch_start
+            
+            if not rows:
+                break
+            after = (rows[-1][0], rows[-1][1])
+            stats['rows_checked'] += len(rows)
+            
+            state_addrs = [Address(address=r[11], city=r[12], state=r[13], zip=r[14]) for r in rows]
+            pharmacy_addrs = [Address(address=r[4], suite=r[5], city=r[6], state=r[7], zip=r[8]) for r in rows]
+            
+            score_start = time.perf_counter()
+            fingerprints = address_fingerprints(state_addrs, pharmacy_addrs)
+            stats['timings']['score'] += time.perf_counter() - score_start
+            
+            stale = [
+                i for i, (row, fingerprint) in enumerate(zip(rows, fingerprints))
+                if row[2] != self.scoring_version or row[3] != fingerprint
+            ]
+            stats['skipped'] += len(rows) - len(stale)
+            
+            for i in range(0, len(stale), batch_size):
+                chunk = stale[i:i + batch_size]
+                scored_pairs = [
+                    (rows[j][0], rows[j][1], {'search_name': rows[j][9], 'search_state': rows[j][10]})
+                    for j in chunk
+                ]
+                try:
+                    batch_scores = self._score_pairs(
+                        scored_pairs,
+                        [state_addrs[j] for j in chunk],
+                        [pharmacy_addrs[j] for j in chunk],
+                        states_id, pharmacies_id, stats['timings']
+                    )
+                    write_start = time.perf_counter()
+                    self._upsert_scores(batch_scores)
+                    stats['timings']['write'] += time.perf_counter() - write_start
+                    stats['recomputed'] += len(batch_scores)
+                except Exception as e:
+                    self.logger.error(f"Failed to rescore batch after pair {after}: {e}")
+                    stats['errors'] += 1
+            
+            if len(rows) < page_size:
+                break
+        
+        self.logger.info(
+            f"Rescore complete: {stats['rows_checked']} checked, {stats['recomputed']} recomputed, "
+            f"{stats['skipped']} unchanged, {stats['errors']} errors"
+        )
+        return stats
+    
     def get_scoring_stats(self, states_tag: str, pharmacies_tag: str) -> Dict[str, Any]:
         """
         Get statistics about scoring completeness for dataset combination.
@@ -354,11 +762,10 @@ class ScoringEngine(BaseImporter):
             
             states_id, pharmacies_id = dataset_ids
             
-            # Count total possible scores needed using comprehensive results
+            # Count scores still needed (anti-join on match_scores, no limit)
             cur.execute("""
                 SELECT COUNT(*) as total_needed
-                FROM get_all_results_with_context(%s, %s, NULL)
-                WHERE result_id IS NOT NULL AND score_overall IS NULL
+                FROM get_missing_score_pairs(%s, %s, NULL)
             """, (states_tag, pharmacies_tag))
             total_needed = cur.fetchone()[0]
             
@@ -413,7 +820,8 @@ class ScoringEngine(BaseImporter):
 # Convenience function for command-line usage
 def compute_scores_for_tags(states_tag: str, pharmacies_tag: str, 
                            batch_size: int = 200, max_pairs: Optional[int] = None,
-                           db_config: Optional[Dict] = None) -> Dict[str, Any]:
+                           db_config: Optional[Dict] = None, bulk: bool = True,
+                           workers: int = 1) -> Dict[str, Any]:
     """
     Standalone function to compute scores for dataset tags.
     
@@ -423,6 +831,8 @@ def compute_scores_for_tags(states_tag: str, pharmacies_tag: str,
         batch_size: Batch size for processing
         max_pairs: Maximum pairs to process (None for all)
         db_config: Database configuration dict (uses config.py if None)
+        bulk: Use set-based address fetching per batch
+        workers: Number of scoring processes (1 scores in-process)
         
     Returns:
         Processing statistics
@@ -435,7 +845,7 @@ def compute_scores_for_tags(states_tag: str, pharmacies_tag: str,
             raise ValueError("No database configuration provided and config.py not available")
     
     with ScoringEngine(db_config) as engine:
-        return engine.compute_scores(states_tag, pharmacies_tag, batch_size, max_pairs)
+        return engine.compute_scores(states_tag, pharmacies_tag, batch_size, max_pairs, bulk=bulk, workers=workers)
 
 # Example usage and testing
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+-- PharmChecker Missing Score Pairs Migration
+-- Server-side detection of pharmacy/result pairs that still need address scores
+
+-- Drop the function if it exists (for clean reinstallation)
+DROP FUNCTION IF EXISTS get_missing_score_pairs(TEXT, TEXT, INT, INT, INT);
+
+-- Function returning only the unscored (pharmacy, result) pairs plus the address
+-- fields needed to score them. Pairs are ordered by (pharmacy_id, result_id) and
+-- keyset-paginated: pass the last returned pair as p_after_pharmacy_id /
+-- p_after_result_id to get the next page. p_limit NULL returns all pairs.
+CREATE OR REPLACE FUNCTION get_missing_score_pairs(
+  p_states_tag TEXT,
+  p_pharmacies_tag TEXT,
+  p_limit INT DEFAULT 1000,
+  p_after_pharmacy_id INT DEFAULT NULL,
+  p_after_result_id INT DEFAULT NULL
+) RETURNS TABLE (
+  pharmacy_id INT,
+  result_id INT,
+  search_name TEXT,
+  search_state CHAR(2),
+  pharmacy_address TEXT,
+  pharmacy_suite TEXT,
+  pharmacy_city TEXT,
+  pharmacy_state TEXT,
+  pharmacy_zip TEXT,
+  result_address TEXT,
+  result_city TEXT,
+  result_state TEXT,
+  result_zip TEXT,
+  result_status TEXT
+) AS $$
+WITH
+dataset_ids AS (
+  SELECT
+    (SELECT id FROM datasets WHERE kind = 'states' AND tag = p_states_tag) as states_id,
+    (SELECT id FROM datasets WHERE kind = 'pharmacies' AND tag = p_pharmacies_tag) as pharmacies_id
+)
+SELECT DISTINCT ON (p.id, sr.id)
+  p.id AS pharmacy_id,
+  sr.id AS result_id,
+  sr.search_name,
+  sr.search_state,
+  p.address AS pharmacy_address,
+  p.suite AS pharmacy_suite,
+  p.city AS pharmacy_city,
+  p.state::TEXT AS pharmacy_state,
+  p.zip AS pharmacy_zip,
+  sr.address AS result_address,
+  sr.city AS result_city,
+  sr.state AS result_state,
+  sr.zip AS result_zip,
+  sr.result_status
+FROM dataset_ids d
+JOIN pharmacies p
+  ON p.dataset_id = d.pharmacies_id
+CROSS JOIN LATERAL jsonb_array_elements_text(p.state_licenses) AS lic(state_code)
+JOIN search_results sr
+  ON sr.dataset_id = d.states_id
+  AND sr.search_name = p.name
+  AND sr.search_state = lic.state_code::char(2)
+WHERE p.state_licenses IS NOT NULL
+  AND jsonb_typeof(p.state_licenses) = 'array'
+  -- Keyset pagination on (pharmacy_id, result_id)
+  AND (p_after_pharmacy_id IS NULL
+       OR (p.id, sr.id) > (p_after_pharmacy_id, COALESCE(p_after_result_id, 0)))
+  -- Anti-join: only pairs without a score for this dataset pair
+  AND NOT EXISTS (
+    SELECT 1 FROM match_scores ms
+    WHERE ms.states_dataset_id = d.states_id
+      AND ms.pharmacies_dataset_id = d.pharmacies_id
+      AND ms.pharmacy_id = p.id
+      AND ms.result_id = sr.id
+  )
+ORDER BY p.id, sr.id
+LIMIT p_limit;
+
+$$ LANGUAGE SQL STABLE;
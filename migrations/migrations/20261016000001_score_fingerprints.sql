@@ -0,0 +1,14 @@
+-- PharmChecker Score Fingerprints Migration
+-- Track which algorithm version and which normalized inputs produced each score
+
+-- Scoring algorithm version (scoring_plugin.SCORING_VERSION) used for this row
+ALTER TABLE match_scores ADD COLUMN IF NOT EXISTS scoring_version TEXT;
+
+-- Hash of the normalized pharmacy and search result address fields
+ALTER TABLE match_scores ADD COLUMN IF NOT EXISTS input_fingerprint TEXT;
+
+-- Backfill the version from scoring_meta for rows scored before this migration
+UPDATE match_scores
+SET scoring_version = scoring_meta->>'algorithm'
+WHERE scoring_version IS NULL
+  AND scoring_meta ? 'algorithm';
@@ -0,0 +1,92 @@
+-- PharmChecker Bulk Search Results Upsert Migration
+-- Server-side conflict resolution for importer batches that hit unique_search_result
+
+-- Drop the function if it exists (for clean reinstallation)
+DROP FUNCTION IF EXISTS upsert_search_results(JSONB);
+
+-- Insert a batch of search_results rows (a JSON array shaped like the table),
+-- applying the importer's "newer search_ts wins" rule to rows that already exist.
+-- Conflicts are resolved against the deployed unique_search_result constraint, which
+-- is (dataset_id, search_state, license_number) in the consolidated schema and also
+-- includes search_name in the original migration. Within the batch, the newest row per
+-- (dataset_id, search_state, license_number) wins (first occurrence on ties), even when
+-- the rows differ by search_name. A stored row is only replaced by a newer search for the
+-- same search_name; an incoming row that collides with another search's row is skipped.
+-- NULL license numbers are treated as equal. Returns how many incoming rows were inserted,
+-- updated and skipped; skipped includes rows superseded within the batch, so the three
+-- always add up to the number of rows passed in.
+CREATE OR REPLACE FUNCTION upsert_search_results(p_rows JSONB)
+RETURNS TABLE (
+  inserted INT,
+  updated INT,
+  skipped INT
+) AS $$
+WITH
+incoming AS (
+  SELECT DISTINCT ON (r.dataset_id, r.search_state, r.license_number) r.*
+  FROM jsonb_populate_recordset(NULL::search_results, p_rows) WITH ORDINALITY AS r
+  ORDER BY r.dataset_id, r.search_state, r.license_number,
+           r.search_ts DESC NULLS LAST, r.ordinality
+),
+updated_rows AS (
+  UPDATE search_results sr SET
+    search_ts = i.search_ts,
+    license_status = i.license_status,
+    license_name = i.license_name,
+    license_type = i.license_type,
+    address = i.address,
+    city = i.city,
+    state = i.state,
+    zip = i.zip,
+    issue_date = i.issue_date,
+    expiration_date = i.expiration_date,
+    result_status = i.result_status,
+    meta = i.meta,
+    raw = i.raw,
+    image_hash = i.image_hash
+  FROM incoming i
+  WHERE sr.dataset_id = i.dataset_id
+    AND sr.search_state = i.search_state
+    AND sr.search_name = i.search_name
+    AND sr.license_number IS NOT DISTINCT FROM i.license_number
+    -- Only replace with a newer search (or when the stored row has no timestamp)
+    AND i.search_ts IS NOT NULL
+    AND (sr.search_ts IS NULL OR i.search_ts > sr.search_ts)
+  RETURNING i.ordinality
+),
+inserted_rows AS (
+  INSERT INTO search_results (
+    dataset_id, search_name, search_state, search_ts, license_number, license_status,
+    license_name, license_type, address, city, state, zip, issue_date, expiration_date,
+    result_status, meta, raw, image_hash
+  )
+  SELECT
+    i.dataset_id, i.search_name, i.search_state, i.search_ts, i.license_number, i.license_status,
+    i.license_name, i.license_type, i.address, i.city, i.state, i.zip, i.issue_date, i.expiration_date,
+    i.result_status, i.meta, i.raw, i.image_hash
+  FROM incoming i
+  WHERE NOT EXISTS (
+    -- The unique constraint doesn't cover NULL license numbers
+    SELECT 1 FROM search_results sr
+    WHERE sr.dataset_id = i.dataset_id
+      AND sr.search_state = i.search_state
+      AND sr.search_name = i.search_name
+      AND sr.license_number IS NOT DISTINCT FROM i.license_number
+  )
+  ON CONFLICT ON CONSTRAINT unique_search_result DO NOTHING
+  RETURNING id
+),
+counts AS (
+  SELECT
+    (SELECT count(*) FROM inserted_rows) AS inserted,
+    -- Per incoming row: several stored rows can share a NULL license_number
+    (SELECT count(DISTINCT ordinality) FROM updated_rows) AS updated
+)
+SELECT
+  inserted::INT,
+  updated::INT,
+  -- Superseded within the batch, not newer than the stored row, or another search's row
+  (jsonb_array_length(p_rows) - inserted - updated)::INT AS skipped
+FROM counts;
+
+$$ LANGUAGE SQL VOLATILE;
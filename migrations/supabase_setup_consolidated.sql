@@ -154,12 +154,22 @@ CREATE TABLE IF NOT EXISTS app_users (
 
 -- Drop the function if it exists (for clean reinstallation)
 DROP FUNCTION IF EXISTS get_all_results_with_context(TEXT, TEXT, TEXT);
-
--- Function to get all search results with full context for client-side processing
+DROP FUNCTION IF EXISTS get_all_results_with_context(TEXT, TEXT, TEXT, INT, TEXT, TEXT);
+
+-- Function to get all search results with full context for client-side processing.
+-- Rows are ordered by (pharmacy_name, search_state), newest search first within each
+-- pair. With p_limit set the results are keyset-paginated on (pharmacy_name,
+-- search_state): a page holds whole pairs, as many as fit in p_limit rows (always at
+-- least one), so it can end early; pass the last returned row's pharmacy_name and
+-- search_state as p_after_pharmacy_name / p_after_search_state for the next page and
+-- stop on an empty page. p_limit NULL returns everything.
 CREATE OR REPLACE FUNCTION get_all_results_with_context(
   p_states_tag TEXT,
   p_pharmacies_tag TEXT,
-  p_validated_tag TEXT
+  p_validated_tag TEXT,
+  p_limit INT DEFAULT NULL,
+  p_after_pharmacy_name TEXT DEFAULT NULL,
+  p_after_search_state TEXT DEFAULT NULL
 ) RETURNS TABLE (
   pharmacy_id INT,
   pharmacy_name TEXT,
@@ -202,8 +212,29 @@ dataset_ids AS (
     (SELECT id FROM datasets WHERE kind = 'pharmacies' AND tag = p_pharmacies_tag) as pharmacies_id,
     (SELECT id FROM datasets WHERE kind = 'validated' AND tag = p_validated_tag) as validated_id
 ),
+claimed_states AS (
+  -- (pharmacy, state) pairs from claimed licenses
+  SELECT
+    p.id AS pharmacy_id,
+    (jsonb_array_elements_text(p.state_licenses))::char(2) AS state_code
+  FROM pharmacies p, dataset_ids d
+  WHERE p.dataset_id = d.pharmacies_id
+    AND p.state_licenses IS NOT NULL 
+    AND p.state_licenses <> '[]'::jsonb
+),
+page_keys AS (
+  -- The next p_limit (pharmacy_name, search_state) keys after the cursor; each yields
+  -- at least one row, so no more are needed for a page of p_limit rows
+  SELECT DISTINCT p.name AS pharmacy_name, cs.state_code
+  FROM claimed_states cs
+  JOIN pharmacies p ON p.id = cs.pharmacy_id
+  WHERE p_after_pharmacy_name IS NULL
+     OR (p.name, cs.state_code) > (p_after_pharmacy_name, p_after_search_state::char(2))
+  ORDER BY p.name, cs.state_code
+  LIMIT p_limit
+),
 pharmacy_state_pairs AS (
-  -- Get all (pharmacy, state) pairs from claimed licenses
+  -- Get the (pharmacy, state) pairs on this page
   SELECT 
     p.id AS pharmacy_id,
     p.name AS pharmacy_name,
@@ -211,14 +242,14 @@ pharmacy_state_pairs AS (
     p.city AS pharmacy_city,
     p.state AS pharmacy_state,
     p.zip AS pharmacy_zip,
-    (jsonb_array_elements_text(p.state_licenses))::char(2) AS state_code,
+    cs.state_code,
     d.pharmacies_id,
     d.states_id,
     d.validated_id
-  FROM pharmacies p, dataset_ids d
-  WHERE p.dataset_id = d.pharmacies_id
-    AND p.state_licenses IS NOT NULL 
-    AND p.state_licenses <> '[]'::jsonb
+  FROM claimed_states cs
+  JOIN pharmacies p ON p.id = cs.pharmacy_id
+  JOIN page_keys pk ON pk.pharmacy_name = p.name AND pk.state_code = cs.state_code
+  CROSS JOIN dataset_ids d
 ),
 all_results AS (
   -- Get ALL search results for pharmacy-state pairs (no aggregation)
@@ -287,6 +318,20 @@ with_overrides AS (
       OR (vo.override_type = 'empty')
     )
     AND vo.dataset_id = ar.validated_id
+),
+page_rows AS (
+  -- Whole (pharmacy_name, search_state) keys that fit in p_limit rows (at least one)
+  SELECT pharmacy_name, search_state
+  FROM (
+    SELECT
+      pharmacy_name,
+      search_state,
+      count(*) AS key_rows,
+      sum(count(*)) OVER (ORDER BY pharmacy_name, search_state) AS rows_through
+    FROM with_overrides
+    GROUP BY pharmacy_name, search_state
+  ) k
+  WHERE p_limit IS NULL OR rows_through <= p_limit OR rows_through = key_rows
 )
 -- Return all records without aggregation
 SELECT
@@ -323,9 +368,11 @@ SELECT
   states_id as states_dataset_id,
   validated_id as validated_dataset_id
 FROM with_overrides
-ORDER BY pharmacy_name, search_state, search_timestamp DESC NULLS LAST, result_id;
+WHERE (pharmacy_name, search_state) IN (SELECT pharmacy_name, search_state FROM page_rows)
+-- pharmacy_id and override_type only break ties, so repeated calls return the same order
+ORDER BY pharmacy_name, search_state, search_timestamp DESC NULLS LAST, result_id, pharmacy_id, override_type;
 
-$$ LANGUAGE SQL;
+$$ LANGUAGE SQL STABLE;
 
 -- Drop existing function if it exists (for clean reinstallation)
 DROP FUNCTION IF EXISTS check_validation_consistency(TEXT, TEXT, TEXT);
@@ -469,6 +516,196 @@ CREATE INDEX IF NOT EXISTS ix_app_users_github_login ON app_users(github_login)
 CREATE INDEX IF NOT EXISTS ix_app_users_email ON app_users(email) WHERE email IS NOT NULL;
 CREATE INDEX IF NOT EXISTS ix_app_users_active ON app_users(is_active) WHERE is_active = true;
 
+-- =============================================================================
+-- MIGRATION 4: Missing Score Pairs Function
+-- =============================================================================
+
+-- Drop the function if it exists (for clean reinstallation)
+DROP FUNCTION IF EXISTS get_missing_score_pairs(TEXT, TEXT, INT, INT, INT);
+
+-- Function returning only the unscored (pharmacy, result) pairs plus the address
+-- fields needed to score them. Pairs are ordered by (pharmacy_id, result_id) and
+-- keyset-paginated: pass the last returned pair as p_after_pharmacy_id /
+-- p_after_result_id to get the next page. p_limit NULL returns all pairs.
+CREATE OR REPLACE FUNCTION get_missing_score_pairs(
+  p_states_tag TEXT,
+  p_pharmacies_tag TEXT,
+  p_limit INT DEFAULT 1000,
+  p_after_pharmacy_id INT DEFAULT NULL,
+  p_after_result_id INT DEFAULT NULL
+) RETURNS TABLE (
+  pharmacy_id INT,
+  result_id INT,
+  search_name TEXT,
+  search_state CHAR(2),
+  pharmacy_address TEXT,
+  pharmacy_suite TEXT,
+  pharmacy_city TEXT,
+  pharmacy_state TEXT,
+  pharmacy_zip TEXT,
+  result_address TEXT,
+  result_city TEXT,
+  result_state TEXT,
+  result_zip TEXT,
+  result_status TEXT
+) AS $$
+WITH
+dataset_ids AS (
+  SELECT
+    (SELECT id FROM datasets WHERE kind = 'states' AND tag = p_states_tag) as states_id,
+    (SELECT id FROM datasets WHERE kind = 'pharmacies' AND tag = p_pharmacies_tag) as pharmacies_id
+)
+SELECT DISTINCT ON (p.id, sr.id)
+  p.id AS pharmacy_id,
+  sr.id AS result_id,
+  sr.search_name,
+  sr.search_state,
+  p.address AS pharmacy_address,
+  p.suite AS pharmacy_suite,
+  p.city AS pharmacy_city,
+  p.state::TEXT AS pharmacy_state,
+  p.zip AS pharmacy_zip,
+  sr.address AS result_address,
+  sr.city AS result_city,
+  sr.state AS result_state,
+  sr.zip AS result_zip,
+  sr.result_status
+FROM dataset_ids d
+JOIN pharmacies p
+  ON p.dataset_id = d.pharmacies_id
+CROSS JOIN LATERAL jsonb_array_elements_text(p.state_licenses) AS lic(state_code)
+JOIN search_results sr
+  ON sr.dataset_id = d.states_id
+  AND sr.search_name = p.name
+  AND sr.search_state = lic.state_code::char(2)
+WHERE p.state_licenses IS NOT NULL
+  AND jsonb_typeof(p.state_licenses) = 'array'
+  -- Keyset pagination on (pharmacy_id, result_id)
+  AND (p_after_pharmacy_id IS NULL
+       OR (p.id, sr.id) > (p_after_pharmacy_id, COALESCE(p_after_result_id, 0)))
+  -- Anti-join: only pairs without a score for this dataset pair
+  AND NOT EXISTS (
+    SELECT 1 FROM match_scores ms
+    WHERE ms.states_dataset_id = d.states_id
+      AND ms.pharmacies_dataset_id = d.pharmacies_id
+      AND ms.pharmacy_id = p.id
+      AND ms.result_id = sr.id
+  )
+ORDER BY p.id, sr.id
+LIMIT p_limit;
+
+$$ LANGUAGE SQL STABLE;
+
+-- =============================================================================
+-- MIGRATION 5: Score Fingerprints
+-- =============================================================================
+
+-- Scoring algorithm version (scoring_plugin.SCORING_VERSION) used for this row
+ALTER TABLE match_scores ADD COLUMN IF NOT EXISTS scoring_version TEXT;
+
+-- Hash of the normalized pharmacy and search result address fields
+ALTER TABLE match_scores ADD COLUMN IF NOT EXISTS input_fingerprint TEXT;
+
+-- Backfill the version from scoring_meta for rows scored before this migration
+UPDATE match_scores
+SET scoring_version = scoring_meta->>'algorithm'
+WHERE scoring_version IS NULL
+  AND scoring_meta ? 'algorithm';
+
+-- =============================================================================
+-- MIGRATION 6: Bulk Search Results Upsert
+-- =============================================================================
+
+-- Drop the function if it exists (for clean reinstallation)
+DROP FUNCTION IF EXISTS upsert_search_results(JSONB);
+
+-- Insert a batch of search_results rows (a JSON array shaped like the table),
+-- applying the importer's "newer search_ts wins" rule to rows that already exist.
+-- Conflicts are resolved against the deployed unique_search_result constraint, which
+-- is (dataset_id, search_state, license_number) in the consolidated schema and also
+-- includes search_name in the original migration. Within the batch, the newest row per
+-- (dataset_id, search_state, license_number) wins (first occurrence on ties), even when
+-- the rows differ by search_name. A stored row is only replaced by a newer search for the
+-- same search_name; an incoming row that collides with another search's row is skipped.
+-- NULL license numbers are treated as equal. Returns how many incoming rows were inserted,
+-- updated and skipped; skipped includes rows superseded within the batch, so the three
+-- always add up to the number of rows passed in.
+CREATE OR REPLACE FUNCTION upsert_search_results(p_rows JSONB)
+RETURNS TABLE (
+  inserted INT,
+  updated INT,
+  skipped INT
+) AS $$
+WITH
+incoming AS (
+  SELECT DISTINCT ON (r.dataset_id, r.search_state, r.license_number) r.*
+  FROM jsonb_populate_recordset(NULL::search_results, p_rows) WITH ORDINALITY AS r
+  ORDER BY r.dataset_id, r.search_state, r.license_number,
+           r.search_ts DESC NULLS LAST, r.ordinality
+),
+updated_rows AS (
+  UPDATE search_results sr SET
+    search_ts = i.search_ts,
+    license_status = i.license_status,
+    license_name = i.license_name,
+    license_type = i.license_type,
+    address = i.address,
+    city = i.city,
+    state = i.state,
+    zip = i.zip,
+    issue_date = i.issue_date,
+    expiration_date = i.expiration_date,
+    result_status = i.result_status,
+    meta = i.meta,
+    raw = i.raw,
+    image_hash = i.image_hash
+  FROM incoming i
+  WHERE sr.dataset_id = i.dataset_id
+    AND sr.search_state = i.search_state
+    AND sr.search_name = i.search_name
+    AND sr.license_number IS NOT DISTINCT FROM i.license_number
+    -- Only replace with a newer search (or when the stored row has no timestamp)
+    AND i.search_ts IS NOT NULL
+    AND (sr.search_ts IS NULL OR i.search_ts > sr.search_ts)
+  RETURNING i.ordinality
+),
+inserted_rows AS (
+  INSERT INTO search_results (
+    dataset_id, search_name, search_state, search_ts, license_number, license_status,
+    license_name, license_type, address, city, state, zip, issue_date, expiration_date,
+    result_status, meta, raw, image_hash
+  )
+  SELECT
+    i.dataset_id, i.search_name, i.search_state, i.search_ts, i.license_number, i.license_status,
+    i.license_name, i.license_type, i.address, i.city, i.state, i.zip, i.issue_date, i.expiration_date,
+    i.result_status, i.meta, i.raw, i.image_hash
+  FROM incoming i
+  WHERE NOT EXISTS (
+    -- The unique constraint doesn't cover NULL license numbers
+    SELECT 1 FROM search_results sr
+    WHERE sr.dataset_id = i.dataset_id
+      AND sr.search_state = i.search_state
+      AND sr.search_name = i.search_name
+      AND sr.license_number IS NOT DISTINCT FROM i.license_number
+  )
+  ON CONFLICT ON CONSTRAINT unique_search_result DO NOTHING
+  RETURNING id
+),
+counts AS (
+  SELECT
+    (SELECT count(*) FROM inserted_rows) AS inserted,
+    -- Per incoming row: several stored rows can share a NULL license_number
+    (SELECT count(DISTINCT ordinality) FROM updated_rows) AS updated
+)
+SELECT
+  inserted::INT,
+  updated::INT,
+  -- Superseded within the batch, not newer than the stored row, or another search's row
+  (jsonb_array_length(p_rows) - inserted - updated)::INT AS skipped
+FROM counts;
+
+$$ LANGUAGE SQL VOLATILE;
+
 -- =============================================================================
 -- RECORD MIGRATIONS AS APPLIED
 -- =============================================================================
@@ -478,7 +715,11 @@ INSERT INTO pharmchecker_migrations (version, name) VALUES
   ('20240101000000_initial_schema', '20240101000000 Initial Schema'),
   ('20240101000001_comprehensive_functions', '20240101000001 Comprehensive Functions'),
   ('20240101000002_indexes_and_performance', '20240101000002 Indexes And Performance'),
-  ('20240814000000_image_sha256_clean', '20240814000000 Clean SHA256 Image System')
+  ('20240814000000_image_sha256_clean', '20240814000000 Clean SHA256 Image System'),
+  ('20261016000000_missing_score_pairs', '20261016000000 Missing Score Pairs Function'),
+  ('20261016000001_score_fingerprints', '20261016000001 Score Fingerprints'),
+  ('20261016000002_upsert_search_results', '20261016000002 Bulk Search Results Upsert'),
+  ('20261016000003_paged_comprehensive_results', '20261016000003 Keyset-Paged Comprehensive Results')
 ON CONFLICT (version) DO NOTHING;
 
 -- =============================================================================
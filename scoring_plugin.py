@@ -11,14 +11,23 @@ Key adaptations:
 - Matches the API expected by the lazy scoring engine
 """
 
+import hashlib
+import os
 import re
 from dataclasses import dataclass
-from typing import Optional, Tuple
-from rapidfuzz import fuzz
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from rapidfuzz import fuzz, process
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Scoring algorithm version stored with every score row. Bump this whenever
+# normalization, _calculate_similarity or the score weights change so that
+# existing scores are picked up by ScoringEngine.rescore_stale().
+SCORING_VERSION = "v1.0"
+
 @dataclass
 class Address:
     """Address data structure matching PharmChecker database fields"""
@@ -28,8 +37,22 @@ class Address:
     state: Optional[str] = None
     zip: Optional[str] = None
 
+# Default bound for each normalization cache (distinct raw strings kept)
+DEFAULT_NORMALIZE_CACHE_SIZE = int(os.getenv('SCORING_NORMALIZE_CACHE_SIZE', '65536'))
+
 class AddressNormalizer:
-    """Address normalization for consistent comparison"""
+    """
+    Address normalization for consistent comparison.
+    
+    Results are memoized per raw input string in bounded LRU caches, so a
+    pharmacy address compared against hundreds of search results is only
+    normalized once. Pass cache_size=0 to disable caching.
+    """
+    
+    # Pre-compiled patterns used by the normalizers
+    TOKEN_PUNCT_RE = re.compile(r'[^\w]')
+    PUNCT_RE = re.compile(r'[^\w\s]')
+    DIGIT_RE = re.compile(r'\d')
     
     STREET_SUFFIXES = {
         'st': 'street', 'st.': 'street', 'str': 'street',
@@ -75,11 +98,61 @@ class AddressNormalizer:
         'wisconsin': 'wi', 'wyoming': 'wy'
     }
     
+    def __init__(self, cache_size: Optional[int] = DEFAULT_NORMALIZE_CACHE_SIZE):
+        """
+        Args:
+            cache_size: Maximum entries per normalization cache (None for unbounded, 0 to disable)
+        """
+        self.cache_size = cache_size
+        self._normalize_cached = lru_cache(maxsize=cache_size, typed=True)(self._normalize)
+        self._normalize_state_cached = lru_cache(maxsize=cache_size, typed=True)(self._normalize_state)
+        self._normalize_zip_cached = lru_cache(maxsize=cache_size, typed=True)(self._normalize_zip)
+    
     def normalize(self, text: Optional[str]) -> str:
-        """Normalize address component for comparison"""
+        """Normalize address component for comparison (cached)"""
         if not text:
             return ""
+        return self._normalize_cached(text)
+    
+    def normalize_state(self, state: Optional[str]) -> str:
+        """Normalize state name or abbreviation (cached)"""
+        if not state:
+            return ""
+        return self._normalize_state_cached(state)
+    
+    def normalize_zip(self, zip_code: Optional[str]) -> str:
+        """Normalize ZIP code (cached)"""
+        if not zip_code:
+            return ""
+        return self._normalize_zip_cached(zip_code)
+    
+    def cache_info(self) -> Dict[str, Any]:
+        """Get hit/miss counters for the normalization caches"""
+        info = {}
+        for name, cached in (('normalize', self._normalize_cached),
+                             ('normalize_state', self._normalize_state_cached),
+                             ('normalize_zip', self._normalize_zip_cached)):
+            stats = cached.cache_info()
+            info[name] = {
+                'hits': stats.hits,
+                'misses': stats.misses,
+                'size': stats.currsize,
+                'maxsize': stats.maxsize
+            }
         
+        caches = list(info.values())
+        info['hits'] = sum(c['hits'] for c in caches)
+        info['misses'] = sum(c['misses'] for c in caches)
+        return info
+    
+    def clear_cache(self):
+        """Drop all cached normalizations and reset counters"""
+        self._normalize_cached.cache_clear()
+        self._normalize_state_cached.cache_clear()
+        self._normalize_zip_cached.cache_clear()
+    
+    def _normalize(self, text: str) -> str:
+        """Normalize address component for comparison"""
         # Convert to lowercase and strip whitespace
         text = text.lower().strip()
         
@@ -89,7 +162,7 @@ class AddressNormalizer:
         
         for token in tokens:
             # Remove punctuation from token for matching
-            clean_token = re.sub(r'[^\w]', '', token)
+            clean_token = self.TOKEN_PUNCT_RE.sub('', token)
             
             # Check for direction abbreviations
             if clean_token in self.DIRECTIONS:
@@ -105,16 +178,13 @@ class AddressNormalizer:
         normalized = ' '.join(normalized_tokens)
         
         # Remove any remaining punctuation and extra spaces
-        normalized = re.sub(r'[^\w\s]', '', normalized)
+        normalized = self.PUNCT_RE.sub('', normalized)
         normalized = ' '.join(normalized.split())
         
         return normalized
     
-    def normalize_state(self, state: Optional[str]) -> str:
+    def _normalize_state(self, state: str) -> str:
         """Normalize state name or abbreviation"""
-        if not state:
-            return ""
-        
         state = state.lower().strip()
         
         # If it's a full state name, convert to abbreviation
@@ -123,18 +193,55 @@ class AddressNormalizer:
         
         return state
     
-    def normalize_zip(self, zip_code: Optional[str]) -> str:
+    def _normalize_zip(self, zip_code: str) -> str:
         """Normalize ZIP code (first 5 digits only)"""
-        if not zip_code:
-            return ""
-        
         # Extract first 5 digits
-        digits = re.findall(r'\d', str(zip_code))
+        digits = self.DIGIT_RE.findall(str(zip_code))
         return ''.join(digits[:5])
 
 # Global normalizer instance
 _normalizer = AddressNormalizer()
 
+def configure_normalizer_cache(cache_size: Optional[int]) -> AddressNormalizer:
+    """
+    Replace the shared normalizer with one using a different cache bound.
+    
+    Args:
+        cache_size: Maximum entries per normalization cache (None for unbounded, 0 to disable)
+    
+    Returns:
+        The new shared AddressNormalizer
+    """
+    global _normalizer
+    _normalizer = AddressNormalizer(cache_size=cache_size)
+    return _normalizer
+
+def get_normalizer_cache_info() -> Dict[str, Any]:
+    """Get hit/miss counters for the shared normalizer's caches"""
+    return _normalizer.cache_info()
+
+@dataclass
+class NormalizedAddresses:
+    """Column-wise normalized address components, ready for match_addresses_batch"""
+    street: List[str]
+    suite: List[str]
+    city: List[str]
+    state: List[str]
+    zip: List[str]
+    
+    def __len__(self) -> int:
+        return len(self.street)
+    
+    def take(self, indices: Sequence[int]) -> 'NormalizedAddresses':
+        """Select rows by position (e.g. to align pharmacies with result pairs)"""
+        return NormalizedAddresses(
+            street=[self.street[i] for i in indices],
+            suite=[self.suite[i] for i in indices],
+            city=[self.city[i] for i in indices],
+            state=[self.state[i] for i in indices],
+            zip=[self.zip[i] for i in indices]
+        )
+
 def _calculate_similarity(str1: str, str2: str) -> float:
     """Calculate similarity between two strings using RapidFuzz"""
     if not str1 or not str2:
@@ -255,6 +362,203 @@ def match_addresses(state_addr: Address, pharmacy_addr: Address) -> Tuple[float,
     
     return (street_score_scaled, csz_score_scaled, overall_score_scaled)
 
+ADDRESS_FIELDS = ('address', 'suite', 'city', 'state', 'zip')
+
+def _address_columns(addrs: Any) -> Dict[str, List[Optional[str]]]:
+    """
+    Convert columnar or row-wise address input into per-field lists.
+    
+    Accepts a pandas DataFrame (or any mapping of field name -> column) with
+    address/suite/city/state/zip columns, or a sequence of Address objects.
+    Missing columns are treated as all-None; NaN values become None.
+    """
+    if hasattr(addrs, 'columns') or isinstance(addrs, dict):
+        lengths = {len(addrs[field]) for field in ADDRESS_FIELDS if field in addrs}
+        if len(lengths) > 1:
+            raise ValueError(f"Address columns have mismatched lengths: {sorted(lengths)}")
+        size = lengths.pop() if lengths else 0
+        columns = {}
+        for field in ADDRESS_FIELDS:
+            if field in addrs:
+                columns[field] = [_clean_value(v) for v in addrs[field]]
+            else:
+                columns[field] = [None] * size
+        return columns
+    
+    addrs = list(addrs)
+    return {field: [_clean_value(getattr(a, field)) for a in addrs] for field in ADDRESS_FIELDS}
+
+def _clean_value(value: Any) -> Optional[str]:
+    """Map None/NaN to None so columnar input behaves like Address fields"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+def normalize_addresses(addrs: Any) -> NormalizedAddresses:
+    """
+    Normalize a whole address dataset once.
+    
+    Use this to pre-normalize a pharmacies dataset before scoring it against
+    many search results; the returned object can be passed (or .take()-n) as
+    either argument of match_addresses_batch without normalizing again.
+    
+    Args:
+        addrs: DataFrame / dict of columns (address, suite, city, state, zip)
+            or a sequence of Address objects
+    
+    Returns:
+        NormalizedAddresses with one entry per input row
+    """
+    if isinstance(addrs, NormalizedAddresses):
+        return addrs
+    
+    cols = _address_columns(addrs)
+    return NormalizedAddresses(
+        street=[_normalizer.normalize(v) for v in cols['address']],
+        suite=[_normalizer.normalize(v) for v in cols['suite']],
+        city=[_normalizer.normalize(v) for v in cols['city']],
+        state=[_normalizer.normalize_state(v) for v in cols['state']],
+        zip=[_normalizer.normalize_zip(v) for v in cols['zip']]
+    )
+
+def address_fingerprints(state_addrs: Any, pharmacy_addrs: Any) -> List[str]:
+    """
+    Fingerprint the normalized inputs of each state/pharmacy address pair.
+    
+    Two pairs with the same fingerprint always receive the same scores under
+    the same SCORING_VERSION, so a stored fingerprint that still matches the
+    current addresses means the stored score is up to date.
+    
+    Args:
+        state_addrs: Search result addresses (any form accepted by match_addresses_batch)
+        pharmacy_addrs: Pharmacy addresses, same forms
+    
+    Returns:
+        List of hex digests, one per pair
+    """
+    state_norm = normalize_addresses(state_addrs)
+    pharm_norm = normalize_addresses(pharmacy_addrs)
+    
+    if len(state_norm) != len(pharm_norm):
+        raise ValueError(f"Address inputs have different lengths: {len(state_norm)} vs {len(pharm_norm)}")
+    
+    fingerprints = []
+    for i in range(len(state_norm)):
+        key = '\x1f'.join((
+            state_norm.street[i], state_norm.suite[i], state_norm.city[i], state_norm.state[i], state_norm.zip[i],
+            pharm_norm.street[i], pharm_norm.suite[i], pharm_norm.city[i], pharm_norm.state[i], pharm_norm.zip[i]
+        ))
+        fingerprints.append(hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest())
+    return fingerprints
+
+def _calculate_similarity_batch(left: Sequence[str], right: Sequence[str]) -> np.ndarray:
+    """
+    Vectorized _calculate_similarity for element-wise string pairs.
+    
+    Callers only pass pairs where both sides are non-empty, so the empty-string
+    special cases of the scalar version do not apply here.
+    """
+    if not left:
+        return np.zeros(0, dtype=np.float64)
+    
+    def _scores(scorer):
+        return process.cpdist(left, right, scorer=scorer, dtype=np.float64, workers=1)
+    
+    simple = _scores(fuzz.ratio)
+    partial = _scores(fuzz.partial_ratio)
+    token_sort = _scores(fuzz.token_sort_ratio)
+    token_set = _scores(fuzz.token_set_ratio)
+    
+    # Same weighting and operation order as _calculate_similarity
+    return (simple * 0.2 + partial * 0.2 + token_sort * 0.3 + token_set * 0.3) / 100.0
+
+def _pairwise_similarity(left: List[str], right: List[str], mask: np.ndarray) -> np.ndarray:
+    """Compute similarity for the masked pairs, leaving other positions at 0.0"""
+    result = np.zeros(len(left), dtype=np.float64)
+    idx = np.flatnonzero(mask)
+    if idx.size:
+        result[idx] = _calculate_similarity_batch([left[i] for i in idx], [right[i] for i in idx])
+    return result
+
+def match_addresses_batch(state_addrs: Any, pharmacy_addrs: Any) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized match_addresses for many state/pharmacy address pairs.
+    
+    Pairs are compared element-wise: state_addrs[i] is scored against
+    pharmacy_addrs[i]. Results are identical to calling match_addresses on
+    each pair, but the fuzzy matching runs through RapidFuzz's bulk scorers
+    instead of one Python call per pair.
+    
+    Args:
+        state_addrs: Addresses from state board search results - a DataFrame or
+            dict of columns (address, suite, city, state, zip), a sequence
+            of Address objects, or NormalizedAddresses from normalize_addresses
+        pharmacy_addrs: Addresses from the pharmacy database, same forms
+    
+    Returns:
+        Tuple of NumPy arrays (street_scores, city_state_zip_scores, overall_scores),
+        each on the 0.0-100.0 scale
+    """
+    state_norm = normalize_addresses(state_addrs)
+    pharm_norm = normalize_addresses(pharmacy_addrs)
+    
+    n = len(state_norm)
+    if len(pharm_norm) != n:
+        raise ValueError(f"Address inputs have different lengths: {n} vs {len(pharm_norm)}")
+    
+    if n == 0:
+        empty = np.zeros(0, dtype=np.float64)
+        return (empty, empty.copy(), empty.copy())
+    
+    state_street, pharm_street = state_norm.street, pharm_norm.street
+    state_suite, pharm_suite = state_norm.suite, pharm_norm.suite
+    state_city, pharm_city = state_norm.city, pharm_norm.city
+    state_state = np.array(state_norm.state, dtype=object)
+    pharm_state = np.array(pharm_norm.state, dtype=object)
+    state_zip = np.array(state_norm.zip, dtype=object)
+    pharm_zip = np.array(pharm_norm.zip, dtype=object)
+    
+    def _present(values) -> np.ndarray:
+        return np.fromiter((bool(v) for v in values), dtype=bool, count=n)
+    
+    # Street score
+    has_street = _present(state_street) & _present(pharm_street)
+    street_similarity = _pairwise_similarity(state_street, pharm_street, has_street)
+    street_exact = np.array(state_street, dtype=object) == np.array(pharm_street, dtype=object)
+    street_score = np.where(street_exact, 1.0, street_similarity * 0.95)
+    
+    # Suite matching consideration
+    state_has_suite = _present(state_suite)
+    pharm_has_suite = _present(pharm_suite)
+    both_suite = has_street & state_has_suite & pharm_has_suite
+    one_suite = has_street & (state_has_suite ^ pharm_has_suite)
+    suite_similarity = _pairwise_similarity(state_suite, pharm_suite, both_suite)
+    street_score = np.where(
+        both_suite,
+        np.where(suite_similarity >= 0.8, np.minimum(1.0, street_score + 0.05), street_score * 0.9),
+        street_score
+    )
+    street_score = np.where(one_suite, street_score * 0.95, street_score)
+    street_score = np.where(has_street, street_score, 0.0)
+    
+    # City/state/zip score
+    has_city = _present(state_city) & _present(pharm_city)
+    city_similarity = _pairwise_similarity(state_city, pharm_city, has_city)
+    state_match = _present(state_state) & _present(pharm_state) & (state_state == pharm_state)
+    zip_match = _present(state_zip) & _present(pharm_zip) & (state_zip == pharm_zip)
+    
+    csz_score = np.zeros(n, dtype=np.float64)
+    csz_score = np.where(has_city, csz_score + city_similarity * 0.4, csz_score)
+    csz_score = np.where(state_match, csz_score + 0.3, csz_score)
+    csz_score = np.where(zip_match, csz_score + 0.3, csz_score)
+    
+    # Overall score
+    overall_score = np.where(has_street, (0.7 * street_score) + (0.3 * csz_score), csz_score * 0.6)
+    
+    return (street_score * 100.0, csz_score * 100.0, overall_score * 100.0)
+
 # Convenience function for testing and debugging
 def match_addresses_debug(state_addr: Address, pharmacy_addr: Address) -> dict:
     """
@@ -1,10 +1,18 @@
 """
 Supabase client wrapper for PharmChecker API POC
 """
+import asyncio
+import json
 import os
 import sys
+import threading
+import time
 import requests
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Iterator, Iterable, Mapping, Set, Tuple
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -17,6 +25,140 @@ except ImportError:
     SUPABASE_LIB_AVAILABLE = False
     Client = None
 
+# HTTP connection pool / retry settings shared by all Supabase REST calls
+HTTP_POOL_SIZE = int(os.getenv('SUPABASE_HTTP_POOL_SIZE', '20'))
+HTTP_MAX_RETRIES = int(os.getenv('SUPABASE_HTTP_MAX_RETRIES', '3'))
+HTTP_BACKOFF_FACTOR = float(os.getenv('SUPABASE_HTTP_BACKOFF', '0.5'))
+
+# Max in-flight requests for AsyncBulkClient fan-out operations
+BULK_MAX_CONCURRENCY = int(os.getenv('SUPABASE_BULK_CONCURRENCY', '10'))
+
+
+class LatencyHistogram:
+    """Thread-safe request latency histogram keyed by endpoint"""
+    
+    BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+    
+    def record(self, endpoint: str, seconds: float):
+        """Record one request duration for an endpoint"""
+        ms = seconds * 1000.0
+        bucket = next((i for i, limit in enumerate(self.BUCKETS_MS) if ms <= limit), len(self.BUCKETS_MS))
+        with self._lock:
+            entry = self._endpoints.get(endpoint)
+            if entry is None:
+                entry = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                         'buckets': [0] * (len(self.BUCKETS_MS) + 1)}
+                self._endpoints[endpoint] = entry
+            entry['count'] += 1
+            entry['total_ms'] += ms
+            entry['max_ms'] = max(entry['max_ms'], ms)
+            entry['buckets'][bucket] += 1
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per-endpoint count, total/mean/max latency and bucket counts, slowest total first"""
+        labels = [f"<={limit}ms" for limit in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+        with self._lock:
+            items = [(endpoint, dict(entry, buckets=list(entry['buckets'])))
+                     for endpoint, entry in self._endpoints.items()]
+        
+        stats = {}
+        for endpoint, entry in sorted(items, key=lambda item: item[1]['total_ms'], reverse=True):
+            stats[endpoint] = {
+                'count': entry['count'],
+                'total_ms': round(entry['total_ms'], 1),
+                'mean_ms': round(entry['total_ms'] / entry['count'], 1),
+                'max_ms': round(entry['max_ms'], 1),
+                'buckets': dict(zip(labels, entry['buckets']))
+            }
+        return stats
+    
+    def reset(self):
+        """Drop all recorded latencies"""
+        with self._lock:
+            self._endpoints.clear()
+
+
+def _endpoint_key(method: str, url: str) -> str:
+    """Group a request URL by method and resource, e.g. 'POST /rest/v1/rpc/get_all_results_with_context'"""
+    path = urlsplit(url).path
+    # Keep the resource part only so storage object paths don't create one key per file
+    return f"{method.upper()} {'/'.join(path.split('/')[:5])}"
+
+
+class _RetryPolicy(Retry):
+    """
+    Retry idempotent requests on 429/5xx, and any request on 429/503.
+    
+    429 and 503 mean the request was rejected before it was processed, so
+    retrying inserts and RPC calls is safe for those statuses only.
+    """
+    
+    REJECTED_STATUSES = frozenset({429, 503})
+    
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if self.total and status_code in self.REJECTED_STATUSES:
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class InstrumentedSession(requests.Session):
+    """requests.Session that records per-endpoint latency"""
+    
+    def __init__(self, latency: LatencyHistogram = None):
+        super().__init__()
+        self.latency = latency or LatencyHistogram()
+    
+    def request(self, method, url, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().request(method, url, *args, **kwargs)
+        finally:
+            self.latency.record(_endpoint_key(method, url), time.perf_counter() - start)
+
+
+def create_http_session(pool_size: int = HTTP_POOL_SIZE, max_retries: int = HTTP_MAX_RETRIES,
+                        backoff_factor: float = HTTP_BACKOFF_FACTOR) -> InstrumentedSession:
+    """Create a keep-alive session with a sized connection pool, gzip and retry/backoff"""
+    session = InstrumentedSession()
+    retry = _RetryPolicy(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+    return session
+
+
+_http_session: Optional[InstrumentedSession] = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session() -> InstrumentedSession:
+    """Get the process-wide pooled HTTP session shared by all Supabase clients"""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                _http_session = create_http_session()
+    return _http_session
+
+
+# Tables whose rows are also removed by ON DELETE CASCADE from another dataset table
+CASCADE_CHILD_TABLES = frozenset({'match_scores', 'images'})
+
+# Rows per page for keyset-paged RPCs. PostgREST truncates every response to the
+# server's db max-rows (1000 on a default Supabase project), so pages must not be larger.
+RPC_PAGE_SIZE = 1000
+
 
 class SupabaseClient:
     """Client for interacting with Supabase via REST API and Python client"""
@@ -26,6 +168,9 @@ class SupabaseClient:
         self.anon_key = os.getenv('SUPABASE_ANON_KEY')
         self.service_key = os.getenv('SUPABASE_SERVICE_KEY')
         
+        # Pooled keep-alive session shared across clients
+        self.session = get_http_session()
+        
         # Create Supabase client if library is available
         self.client = None
         if SUPABASE_LIB_AVAILABLE and self.url and self.anon_key:
@@ -48,7 +193,7 @@ class SupabaseClient:
         
         try:
             # Test via REST API
-            response = requests.get(f"{self.url}/rest/v1/", headers=self.headers, timeout=5)
+            response = self.session.get(f"{self.url}/rest/v1/", headers=self.headers, timeout=5)
             return response.status_code == 200
         except Exception:
             return False
@@ -68,7 +213,7 @@ class SupabaseClient:
         try:
             # Query information_schema via REST API
             url = f"{self.url}/rest/v1/rpc/list_tables"
-            response = requests.post(url, headers=self.headers, json={}, timeout=10)
+            response = self.session.post(url, headers=self.headers, json={}, timeout=10)
             
             if response.status_code == 200:
                 return response.json()
@@ -89,7 +234,7 @@ class SupabaseClient:
             WHERE table_schema = 'public' 
             ORDER BY table_name
             """
-            response = requests.post(url, headers=self.headers, json={"query": query}, timeout=10)
+            response = self.session.post(url, headers=self.headers, json={"query": query}, timeout=10)
             
             if response.status_code == 200:
                 return response.json()
@@ -108,7 +253,7 @@ class SupabaseClient:
             else:
                 # Fallback to REST API
                 url = f"{self.url}/rest/v1/rpc/execute_sql"
-                response = requests.post(url, headers=self.headers, json={"query": query}, timeout=30)
+                response = self.session.post(url, headers=self.headers, json={"query": query}, timeout=30)
                 
                 if response.status_code == 200:
                     return response.json()
@@ -122,7 +267,7 @@ class SupabaseClient:
         try:
             url = f"{self.url}/rest/v1/datasets"
             params = {"select": "*", "order": "created_at.desc", "limit": "100"}
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
+            response = self.session.get(url, headers=self.headers, params=params, timeout=10)
             
             if response.status_code == 200:
                 return response.json()
@@ -140,7 +285,7 @@ class SupabaseClient:
             if filters:
                 params.update(filters)
             
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
+            response = self.session.get(url, headers=self.headers, params=params, timeout=10)
             
             if response.status_code == 200:
                 return response.json()
@@ -160,7 +305,7 @@ class SupabaseClient:
             if filters:
                 params.update(filters)
             
-            response = requests.get(url, headers=headers, params=params, timeout=10)
+            response = self.session.get(url, headers=headers, params=params, timeout=10)
             
             if response.status_code in [200, 206]:  # 206 = Partial Content (paginated)
                 content_range = response.headers.get('content-range', '')
@@ -173,7 +318,7 @@ class SupabaseClient:
             fallback_params = params.copy()
             fallback_params['limit'] = '100000'  # Very high limit
             
-            fallback_response = requests.get(url, headers=self.headers, params=fallback_params, timeout=60)
+            fallback_response = self.session.get(url, headers=self.headers, params=fallback_params, timeout=60)
             if fallback_response.status_code == 200:
                 return len(fallback_response.json())
             
@@ -186,7 +331,7 @@ class SupabaseClient:
         try:
             url = f"{self.url}/rest/v1/rpc/{function_name}"
             data = params or {}
-            response = requests.post(url, headers=self.headers, json=data, timeout=30)
+            response = self.session.post(url, headers=self.headers, json=data, timeout=30)
             
             if response.status_code == 200:
                 return response.json()
@@ -203,6 +348,66 @@ class SupabaseClient:
             "p_validated_tag": validated_tag
         })
     
+    def get_comprehensive_results_page(self, states_tag: str, pharmacies_tag: str, validated_tag: str = "",
+                                       limit: int = RPC_PAGE_SIZE, after_pharmacy_name: str = None,
+                                       after_search_state: str = None) -> List[Dict]:
+        """Get one keyset page of comprehensive results (whole pharmacy/state pairs, at most limit rows)"""
+        return self.call_rpc_function("get_all_results_with_context", {
+            "p_states_tag": states_tag,
+            "p_pharmacies_tag": pharmacies_tag,
+            "p_validated_tag": validated_tag,
+            "p_limit": limit,
+            "p_after_pharmacy_name": after_pharmacy_name,
+            "p_after_search_state": after_search_state
+        })
+    
+    def iter_comprehensive_results(self, states_tag: str, pharmacies_tag: str, validated_tag: str = "",
+                                   page_size: int = RPC_PAGE_SIZE) -> Iterator[List[Dict]]:
+        """Yield pages of comprehensive results, following the (pharmacy_name, search_state) keyset"""
+        after_pharmacy_name, after_search_state = None, None
+        while True:
+            page = self.get_comprehensive_results_page(states_tag, pharmacies_tag, validated_tag, page_size,
+                                                       after_pharmacy_name, after_search_state)
+            if isinstance(page, dict) and 'error' in page:
+                raise Exception(page['error'])
+            # Pages end on whole pairs and may be short, so only an empty page is the end
+            if not page:
+                return
+            yield page
+            after_pharmacy_name = page[-1]['pharmacy_name']
+            after_search_state = page[-1]['search_state']
+    
+    def get_missing_score_pairs(self, states_tag: str, pharmacies_tag: str, limit: int = RPC_PAGE_SIZE,
+                                after_pharmacy_id: int = None, after_result_id: int = None) -> List[Dict]:
+        """Get one keyset page of unscored pharmacy/result pairs with their address fields"""
+        return self.call_rpc_function("get_missing_score_pairs", {
+            "p_states_tag": states_tag,
+            "p_pharmacies_tag": pharmacies_tag,
+            "p_limit": limit,
+            "p_after_pharmacy_id": after_pharmacy_id,
+            "p_after_result_id": after_result_id
+        })
+    
+    def iter_missing_score_pairs(self, states_tag: str, pharmacies_tag: str,
+                                 page_size: int = RPC_PAGE_SIZE) -> Iterator[List[Dict]]:
+        """Yield pages of unscored pairs, following the (pharmacy_id, result_id) keyset"""
+        after_pharmacy_id, after_result_id = None, None
+        while True:
+            page = self.get_missing_score_pairs(states_tag, pharmacies_tag, page_size,
+                                                after_pharmacy_id, after_result_id)
+            if isinstance(page, dict) and 'error' in page:
+                raise Exception(page['error'])
+            # A short page may just be capped at the server's max-rows
+            if not page:
+                return
+            yield page
+            after_pharmacy_id = page[-1]['pharmacy_id']
+            after_result_id = page[-1]['result_id']
+    
+    def get_latency_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-endpoint request latency histogram for this process"""
+        return self.session.latency.snapshot()
+    
     def get_project_info(self) -> Dict:
         """Get basic project information"""
         return {
@@ -224,7 +429,7 @@ class SupabaseClient:
         """Delete a dataset and all its associated data from Supabase"""
         try:
             # First get dataset info for confirmation
-            dataset_response = requests.get(
+            dataset_response = self.session.get(
                 f"{self.url}/rest/v1/datasets?id=eq.{dataset_id}",
                 headers=self.headers,
                 timeout=10
@@ -249,29 +454,24 @@ class SupabaseClient:
             elif kind == 'validated':
                 tables_to_clean = ['validated_overrides']
             
-            # Delete from associated tables first
+            # Delete from associated tables first, concurrently. Child tables go in
+            # a first wave so they don't race the cascades from their parents.
+            child_tables = [t for t in tables_to_clean if t in CASCADE_CHILD_TABLES]
+            parent_tables = [t for t in tables_to_clean if t not in CASCADE_CHILD_TABLES]
             deleted_counts = {}
-            for table in tables_to_clean:
-                try:
-                    delete_response = requests.delete(
-                        f"{self.url}/rest/v1/{table}?dataset_id=eq.{dataset_id}",
-                        headers=self.headers,
-                        timeout=30
-                    )
-                    
-                    # Get count from Content-Range header
-                    content_range = delete_response.headers.get('Content-Range', '')
-                    if '/' in content_range:
-                        count = content_range.split('/')[-1]
-                        deleted_counts[table] = count
-                    else:
-                        deleted_counts[table] = "unknown"
-                        
-                except Exception as e:
-                    deleted_counts[table] = f"error: {e}"
+            try:
+                bulk = AsyncBulkClient.from_client(self)
+            except ImportError:
+                bulk = None  # No aiohttp - delete one table at a time
+            for wave in (child_tables, parent_tables):
+                if wave and bulk:
+                    deleted_counts.update(run_async(bulk.delete_by_dataset(wave, dataset_id)))
+                elif wave:
+                    deleted_counts.update({table: self._delete_dataset_rows(table, dataset_id) for table in wave})
+            deleted_counts = {table: deleted_counts[table] for table in tables_to_clean}
             
             # Finally delete the dataset itself
-            dataset_delete_response = requests.delete(
+            dataset_delete_response = self.session.delete(
                 f"{self.url}/rest/v1/datasets?id=eq.{dataset_id}",
                 headers=self.headers,
                 timeout=10
@@ -293,7 +493,7 @@ class SupabaseClient:
         """Rename a dataset tag in Supabase"""
         try:
             # Check if new tag already exists
-            check_response = requests.get(
+            check_response = self.session.get(
                 f"{self.url}/rest/v1/datasets?tag=eq.{new_tag}",
                 headers=self.headers,
                 timeout=10
@@ -305,7 +505,7 @@ class SupabaseClient:
                     return {"error": f"Dataset with tag '{new_tag}' already exists"}
             
             # Update the tag
-            update_response = requests.patch(
+            update_response = self.session.patch(
                 f"{self.url}/rest/v1/datasets?id=eq.{dataset_id}",
                 headers=self.headers,
                 json={"tag": new_tag},
@@ -320,48 +520,210 @@ class SupabaseClient:
         except Exception as e:
             return {"error": str(e)}
     
+    def _delete_dataset_rows(self, table: str, dataset_id: int) -> str:
+        """Delete one table's rows for a dataset; returns the deleted count as delete_by_dataset does"""
+        try:
+            response = self.session.delete(f"{self.url}/rest/v1/{table}?dataset_id=eq.{dataset_id}",
+                                           headers=self.headers, timeout=30)
+            content_range = response.headers.get('Content-Range', '')
+            return content_range.split('/')[-1] if '/' in content_range else "unknown"
+        except Exception as e:
+            return f"error: {e}"
+    
     def get_table_counts_supabase(self, tables: List[str]) -> Dict[str, str]:
-        """Get record counts for multiple tables from Supabase"""
-        counts = {}
-        for table in tables:
+        """Get record counts for multiple tables from Supabase (counted concurrently)"""
+        try:
+            bulk = AsyncBulkClient.from_client(self)
+        except ImportError:
+            # No aiohttp - count one table at a time
+            counts = {}
+            for table in tables:
+                try:
+                    response = self.session.head(f"{self.url}/rest/v1/{table}",
+                                                 headers={**self.headers, 'Prefer': 'count=exact'}, timeout=10)
+                    count_range = response.headers.get('Content-Range', '')
+                    counts[table] = count_range.split('/')[-1] if '/' in count_range else "Unable to count"
+                except Exception as e:
+                    counts[table] = f"Error: {str(e)[:30]}"
+            return counts
+        return run_async(bulk.get_table_counts(tables))
+
+
+def run_async(coro):
+    """Run a coroutine to completion from synchronous code"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # Already inside an event loop (e.g. notebooks) - run on a helper thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+class AsyncBulkClient:
+    """
+    aiohttp client for fan-out REST operations against Supabase.
+    
+    Runs independent requests concurrently under a bounded semaphore and
+    returns the same result shapes as the serial SupabaseClient methods.
+    Request latencies are recorded in the shared HTTP session histogram.
+    """
+    
+    def __init__(self, url: str, headers: Dict[str, str], max_concurrency: int = BULK_MAX_CONCURRENCY,
+                 timeout: float = 30):
+        self.rest_url = f"{url.rstrip('/')}/rest/v1"
+        self.storage_url = f"{url.rstrip('/')}/storage/v1"
+        self.headers = {k: v for k, v in headers.items() if v is not None}
+        self.max_concurrency = max(1, max_concurrency)
+        # Imported here so SupabaseClient works without aiohttp installed
+        import aiohttp
+        self._aiohttp = aiohttp
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.latency = get_http_session().latency
+    
+    @classmethod
+    def from_client(cls, client: 'SupabaseClient', **kwargs) -> 'AsyncBulkClient':
+        """Build a bulk client from an existing SupabaseClient's URL and headers"""
+        return cls(client.url, client.headers, **kwargs)
+    
+    def open_session(self) -> 'aiohttp.ClientSession':
+        """New aiohttp session sized to max_concurrency, with the client's auth headers"""
+        connector = self._aiohttp.TCPConnector(limit=self.max_concurrency)
+        return self._aiohttp.ClientSession(connector=connector, timeout=self.timeout, headers=self.headers)
+    
+    async def _request(self, session: 'aiohttp.ClientSession', semaphore: asyncio.Semaphore,
+                       method: str, url: str, **kwargs) -> Tuple[int, Mapping[str, str], Any]:
+        """Issue one request; returns (status, case-insensitive headers, parsed JSON body or None)"""
+        from multidict import CIMultiDict  # Ships with aiohttp
+        async with semaphore:
+            start = time.perf_counter()
             try:
-                # Use HEAD request with proper authentication
-                url = f"{self.url}/rest/v1/{table}"
-                headers = self.headers.copy()
-                headers['Prefer'] = 'count=exact'
-                
-                response = requests.head(url, headers=headers, timeout=10)
+                async with session.request(method, url, **kwargs) as response:
+                    body = None
+                    if method != 'HEAD' and response.content_type == 'application/json':
+                        body = await response.json()
+                    return response.status, CIMultiDict(response.headers), body
+            finally:
+                self.latency.record(_endpoint_key(method, url), time.perf_counter() - start)
+    
+    async def get_table_counts(self, tables: List[str]) -> Dict[str, str]:
+        """Exact record counts per table, same shape as SupabaseClient.get_table_counts_supabase"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        count_headers = {'Prefer': 'count=exact'}
+        
+        async def count_table(session, table: str) -> str:
+            url = f"{self.rest_url}/{table}"
+            try:
+                status, headers, _ = await self._request(session, semaphore, 'HEAD', url, headers=count_headers)
+                count_range = headers.get('Content-Range', '')
+                if '/' in count_range:
+                    return count_range.split('/')[-1]
+                if status != 200:
+                    return f"Error (status {status})"
                 
-                count_range = response.headers.get('Content-Range', '')
+                # Try GET with limit 1 to get count
+                _, headers, _ = await self._request(session, semaphore, 'GET', url,
+                                                    headers=count_headers, params={'limit': '1'})
+                count_range = headers.get('Content-Range', '')
                 if '/' in count_range:
-                    count = count_range.split('/')[-1]
-                    counts[table] = count
-                elif response.status_code == 200:
-                    # Try GET with limit 1 to get count
-                    get_response = requests.get(
-                        url, 
-                        headers=headers, 
-                        params={'limit': '1'}, 
-                        timeout=10
-                    )
-                    count_range = get_response.headers.get('Content-Range', '')
-                    if '/' in count_range:
-                        count = count_range.split('/')[-1]
-                        counts[table] = count
-                    else:
-                        # Fallback: sample and estimate
-                        try:
-                            data = self.get_table_data_via_rest(table, limit=100)
-                            counts[table] = f"{len(data)}+ (sampled)"
-                        except:
-                            counts[table] = "Unable to count"
-                else:
-                    counts[table] = f"Error (status {response.status_code})"
-                    
+                    return count_range.split('/')[-1]
+                
+                # Fallback: sample and estimate
+                try:
+                    status, _, data = await self._request(session, semaphore, 'GET', url, params={'limit': '100'})
+                    if status == 200 and isinstance(data, list):
+                        return f"{len(data)}+ (sampled)"
+                except Exception:
+                    pass
+                return "Unable to count"
             except Exception as e:
-                counts[table] = f"Error: {str(e)[:30]}"
-        return counts
-
+                return f"Error: {str(e)[:30]}"
+        
+        async with self.open_session() as session:
+            counts = await asyncio.gather(*(count_table(session, table) for table in tables))
+        return dict(zip(tables, counts))
+    
+    async def find_existing_hashes(self, hashes: Iterable[str], batch_size: int = 50) -> Set[str]:
+        """
+        Return the subset of content hashes that already have image_assets rows.
+        
+        Hashes are queried in batches (to stay under URL length limits) with
+        the batches in flight concurrently. Raises on any failed batch.
+        """
+        hash_list = list(hashes)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        url = f"{self.rest_url}/image_assets"
+        
+        async def check_batch(session, batch: List[str]) -> Set[str]:
+            hash_filter = ','.join(f'"{h}"' for h in batch)
+            status, _, data = await self._request(session, semaphore, 'GET', url, params={
+                'select': 'content_hash',
+                'content_hash': f'in.({hash_filter})'
+            })
+            if status != 200:
+                raise Exception(f"image_assets lookup failed: status {status}")
+            return {asset['content_hash'] for asset in data or []}
+        
+        async with self.open_session() as session:
+            batches = await asyncio.gather(*(
+                check_batch(session, hash_list[i:i + batch_size])
+                for i in range(0, len(hash_list), batch_size)
+            ))
+        return set().union(*batches)
+    
+    async def upload_object(self, session: 'aiohttp.ClientSession', semaphore: asyncio.Semaphore,
+                            bucket: str, object_path: str, data: bytes, content_type: str) -> bool:
+        """
+        Upload one object to Supabase Storage.
+        
+        Returns True when uploaded, False when the object already existed. Raises on other errors.
+        """
+        url = f"{self.storage_url}/object/{bucket}/{object_path}"
+        status, _, body = await self._request(session, semaphore, 'POST', url, data=data,
+                                              headers={'Content-Type': content_type, 'x-upsert': 'false'})
+        if status in (200, 201):
+            return True
+        # Storage reports duplicates as 409, or as 400 with a "Duplicate" error body
+        body_text = json.dumps(body) if body is not None else ''
+        if status == 409 or (status == 400 and ('Duplicate' in body_text or 'already exists' in body_text)):
+            return False
+        raise Exception(f"Storage upload failed for {object_path}: status {status} {body_text[:200]}")
+    
+    async def insert_rows(self, session: 'aiohttp.ClientSession', semaphore: asyncio.Semaphore,
+                          table: str, rows: List[Dict[str, Any]], on_conflict: Optional[str] = None) -> None:
+        """Insert rows in one request; with on_conflict, rows that already exist are skipped. Raises on failure."""
+        params = {'on_conflict': on_conflict} if on_conflict else None
+        prefer = 'resolution=ignore-duplicates,return=minimal' if on_conflict else 'return=minimal'
+        status, _, body = await self._request(session, semaphore, 'POST', f"{self.rest_url}/{table}",
+                                              json=rows, params=params, headers={'Prefer': prefer})
+        if status not in (200, 201, 204):
+            raise Exception(f"{table} insert failed: status {status} {json.dumps(body)[:200] if body else ''}")
+    
+    async def delete_by_dataset(self, tables: List[str], dataset_id: int) -> Dict[str, str]:
+        """
+        Delete rows with dataset_id from each table concurrently.
+        
+        Returns deleted counts per table (from Content-Range), "unknown" when
+        the count isn't reported, or "error: ..." when the request fails.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def delete_table(session, table: str) -> str:
+            try:
+                _, headers, _ = await self._request(
+                    session, semaphore, 'DELETE', f"{self.rest_url}/{table}",
+                    params={'dataset_id': f'eq.{dataset_id}'}
+                )
+                content_range = headers.get('Content-Range', '')
+                if '/' in content_range:
+                    return content_range.split('/')[-1]
+                return "unknown"
+            except Exception as e:
+                return f"error: {e}"
+        
+        async with self.open_session() as session:
+            counts = await asyncio.gather(*(delete_table(session, table) for table in tables))
+        return dict(zip(tables, counts))
 
 def create_supabase_client() -> SupabaseClient:
     """Factory function to create Supabase client"""
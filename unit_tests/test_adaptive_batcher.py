@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+AdaptiveBatcher: search_results batch sizes shrink on oversized / slow requests
+and grow on fast full-sized ones
+"""
+
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from imports.resilient_importer import AdaptiveBatcher
+
+
+def test_grows_on_fast_full_batches():
+    batcher = AdaptiveBatcher(initial_size=20, max_size=40, target_latency=2.0)
+    batcher.observe(20, latency=0.5)
+    assert batcher.size == 25
+    for _ in range(10):
+        batcher.observe(batcher.size, latency=0.5)
+    assert batcher.size == 40  # Capped at max_size
+    assert batcher.grows == 4
+
+
+def test_does_not_grow_on_short_or_on_target_batches():
+    batcher = AdaptiveBatcher(initial_size=20, target_latency=2.0)
+    batcher.observe(7, latency=0.1)  # Tail / byte-capped batch
+    batcher.observe(20, latency=3.0)  # Over target but not 2x
+    assert batcher.size == 20
+    assert batcher.grows == batcher.shrinks == 0
+
+
+def test_shrinks_on_slow_batches():
+    batcher = AdaptiveBatcher(initial_size=100, target_latency=2.0)
+    batcher.observe(100, latency=5.0)
+    assert batcher.size == 75
+    assert batcher.shrinks == 1
+
+
+def test_too_large_halves_and_caps_growth():
+    batcher = AdaptiveBatcher(initial_size=100, max_size=500)
+    batcher.observe(100, latency=30.0, too_large=True)
+    assert batcher.size == 50
+    assert batcher.max_size == 99
+    assert batcher.retries == 1
+    assert batcher.size_counts == {}  # Failed attempts are not counted as sent
+
+    for _ in range(20):
+        batcher.observe(batcher.size, latency=0.1)
+    assert batcher.size == 99  # Never grows back to the size that failed
+
+
+def test_too_large_bottoms_out_at_one():
+    batcher = AdaptiveBatcher(initial_size=1)
+    batcher.observe(1, latency=0.0, too_large=True)
+    assert batcher.size == batcher.max_size == 1
+    batcher.observe(1, latency=10.0)
+    assert batcher.size == 1
+
+
+def test_non_adaptive_keeps_fixed_size():
+    batcher = AdaptiveBatcher(initial_size=25, adaptive=False)
+    batcher.observe(25, latency=0.1)
+    batcher.observe(25, latency=10.0)
+    assert batcher.size == 25
+    assert batcher.stats()['sizes'] == {'25': 2}
+
+
+def test_next_batch_end_respects_byte_budget():
+    overhead = AdaptiveBatcher.RECORD_OVERHEAD_BYTES
+    batcher = AdaptiveBatcher(initial_size=10, target_bytes=3 * (1000 + overhead))
+    records = [{'raw': 'x' * 1000} for _ in range(10)]
+    assert batcher.next_batch_end(records, 0) == 3
+    assert batcher.next_batch_end(records, 8) == 10
+
+    # A single record over the budget still goes out on its own
+    assert batcher.next_batch_end([{'raw': 'x' * 10 ** 7}, {}], 0) == 1
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Client-side scoring (UnifiedClient.trigger_scoring) must produce the same scores
+and input fingerprints as the ScoringEngine, or rescore_stale treats them as stale
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from client import UnifiedClient
+from imports.scoring import _score_address_tuples
+
+MISSING_PAIR = {
+    'pharmacy_id': 7,
+    'result_id': 11,
+    'pharmacy_address': '123 Main Street',
+    'pharmacy_suite': 'Suite 200',
+    'pharmacy_city': 'Austin',
+    'pharmacy_state': 'TX',
+    'pharmacy_zip': '78701',
+    'result_address': '123 Main St Ste 200',
+    'result_city': 'Austin',
+    'result_state': 'TX',
+    'result_zip': '78701-1234',
+}
+
+
+@pytest.fixture
+def client():
+    """UnifiedClient with the Supabase calls trigger_scoring makes stubbed out"""
+    client = UnifiedClient.__new__(UnifiedClient)
+    client.inserted = []
+    client.iter_missing_score_pairs = lambda *args, **kwargs: iter([[dict(MISSING_PAIR)]])
+    client._get_dataset_id = lambda tag, kind: 1 if kind == 'states' else 2
+    client._insert_scores = lambda scores: client.inserted.extend(scores) or {'success': True}
+    return client
+
+
+def test_client_side_scores_match_engine_for_pharmacy_with_suite(client):
+    result = client.trigger_scoring('states_tag', 'pharmacies_tag')
+    assert result.get('scores_computed') == 1, result
+
+    state_tuple = (MISSING_PAIR['result_address'], None, MISSING_PAIR['result_city'],
+                   MISSING_PAIR['result_state'], MISSING_PAIR['result_zip'])
+    pharmacy_tuple = (MISSING_PAIR['pharmacy_address'], MISSING_PAIR['pharmacy_suite'],
+                      MISSING_PAIR['pharmacy_city'], MISSING_PAIR['pharmacy_state'],
+                      MISSING_PAIR['pharmacy_zip'])
+    [(street, csz, overall, fingerprint)] = _score_address_tuples([state_tuple], [pharmacy_tuple])
+
+    score = client.inserted[0]
+    assert score['input_fingerprint'] == fingerprint
+    assert score['score_street'] == round(street, 2)
+    assert score['score_city_state_zip'] == round(csz, 2)
+    assert score['score_overall'] == round(overall, 2)
+
+
+def test_suite_changes_the_fingerprint():
+    state_tuple = ('123 Main St', None, 'Austin', 'TX', '78701')
+    with_suite = _score_address_tuples([state_tuple], [('123 Main Street', 'Suite 200', 'Austin', 'TX', '78701')])
+    without_suite = _score_address_tuples([state_tuple], [('123 Main Street', None, 'Austin', 'TX', '78701')])
+    assert with_suite[0][3] != without_suite[0][3]
+
+
+def test_scoring_failure_is_reported(client, monkeypatch):
+    import scoring_plugin
+
+    def fail(*args, **kwargs):
+        raise ValueError('bad address batch')
+
+    monkeypatch.setattr(scoring_plugin, 'match_addresses_batch', fail)
+    result = client.trigger_scoring('states_tag', 'pharmacies_tag')
+    assert result == {'error': 'bad address batch'}
+    assert client.inserted == []
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Keyset paging of get_all_results_with_context through SupabaseClient.iter_comprehensive_results
+
+Needs a scratch PostgreSQL database (see the cur fixture in conftest.py). PostgREST is
+simulated by calling the function with named arguments and truncating each response to
+MAX_ROWS, like the server's db max-rows.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from supabase_client import SupabaseClient
+
+MAX_ROWS = 6
+
+
+@pytest.fixture
+def datasets(cur):
+    cur.execute("INSERT INTO datasets (kind, tag) VALUES ('pharmacies', 'test_pharmacies') RETURNING id")
+    pharmacies_id = cur.fetchone()[0]
+    cur.execute("INSERT INTO datasets (kind, tag) VALUES ('validated', 'test_validated') RETURNING id")
+    validated_id = cur.fetchone()[0]
+
+    pharmacies = [
+        ('Acme', ['TX', 'CA', 'FL']),
+        ('Acme', ['TX']),  # Same name, second pharmacy: same (pharmacy_name, search_state) key
+        ('Beta Rx', ['NY']),
+        ('Corner Drug', ['TX', 'WA']),
+        ('delta pharmacy', ['OR']),
+    ]
+    for name, states in pharmacies:
+        cur.execute("INSERT INTO pharmacies (dataset_id, name, address, city, state, zip, state_licenses) "
+                    "VALUES (%s, %s, '1 Main St', 'Austin', 'TX', '78701', %s::jsonb)",
+                    (pharmacies_id, name, json.dumps(states)))
+
+    results = [
+        ('Acme', 'TX', 'L1', '2024-01-01'), ('Acme', 'TX', 'L2', '2024-03-01'), ('Acme', 'TX', 'L3', None),
+        ('Acme', 'CA', 'C1', '2024-02-01'),
+        ('Beta Rx', 'NY', 'N1', '2024-02-01'), ('Beta Rx', 'NY', 'N2', '2024-02-02'),
+        ('Corner Drug', 'WA', 'W1', '2024-01-05'),
+        ('delta pharmacy', 'OR', 'O1', '2024-01-06'),
+    ]
+    for name, state, license_number, ts in results:
+        cur.execute("INSERT INTO search_results (dataset_id, search_name, search_state, license_number, search_ts) "
+                    "VALUES (%s, %s, %s, %s, %s)", (cur.dataset_id, name, state, license_number, ts))
+
+    # An 'empty' and a 'present' override on the same pair multiply that pair's rows
+    cur.execute("INSERT INTO validated_overrides (dataset_id, pharmacy_name, state_code, license_number, override_type) "
+                "VALUES (%s, 'Beta Rx', 'NY', 'N1', 'present'), (%s, 'Beta Rx', 'NY', NULL, 'empty')",
+                (validated_id, validated_id))
+    return 'test_states', 'test_pharmacies', 'test_validated'
+
+
+def rpc(cur, params):
+    args = ', '.join(f"{name} := %({name})s" for name in params)
+    cur.execute(f"SELECT row_to_json(r) FROM get_all_results_with_context({args}) r", params)
+    return [row[0] for row in cur.fetchall()][:MAX_ROWS]
+
+
+@pytest.fixture
+def client(cur):
+    client = SupabaseClient.__new__(SupabaseClient)
+    client.call_rpc_function = lambda function_name, params=None: rpc(cur, params)
+    return client
+
+
+def unpaged(cur, tags):
+    cur.execute("SELECT row_to_json(r) FROM get_all_results_with_context(%s, %s, %s) r", tags)
+    return [row[0] for row in cur.fetchall()]
+
+
+@pytest.mark.parametrize('page_size', [1, 2, 3, MAX_ROWS])
+def test_pages_reassemble_the_full_result(cur, datasets, client, page_size):
+    expected = unpaged(cur, datasets)
+    assert len(expected) > MAX_ROWS
+
+    pages = list(client.iter_comprehensive_results(*datasets, page_size=page_size))
+    assert [row for page in pages for row in page] == expected
+    assert len(pages) > 1
+
+
+def test_pages_hold_whole_pairs_within_page_size(cur, datasets, client):
+    pages = list(client.iter_comprehensive_results(*datasets, page_size=3))
+    keys = [[(row['pharmacy_name'], row['search_state']) for row in page] for page in pages]
+    for i, page in enumerate(keys):
+        # Only a single pair larger than page_size may overflow it
+        assert len(page) <= 3 or len(set(page)) == 1
+        if i:
+            assert page[0] > keys[i - 1][-1]
+
+
+def test_newest_search_first_within_pair(cur, datasets, client):
+    rows = [row for page in client.iter_comprehensive_results(*datasets, page_size=1)
+            if page[0]['pharmacy_name'] == 'Acme' for row in page]
+    tx = [row['license_number'] for row in rows if row['search_state'] == 'TX']
+    assert tx == ['L2', 'L2', 'L1', 'L1', 'L3', 'L3']
+
+
+def test_empty_datasets(cur, client):
+    assert list(client.iter_comprehensive_results('missing', 'missing', '')) == []
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+read_image_dimensions: PNG IHDR and JPEG SOF parsing without decoding the image
+"""
+
+import os
+import struct
+import sys
+import zlib
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_storage import HEADER_READ_SIZE, ImageStorage, read_image_dimensions
+
+
+def png(width, height):
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', ihdr) + chunk(b'IDAT', zlib.compress(b'\x00' * 4)) + chunk(b'IEND', b'')
+
+
+def segment(marker, payload):
+    return struct.pack('>BBH', 0xFF, marker, len(payload) + 2) + payload
+
+
+def jpeg(width, height, sof=0xC0, app_payload=b'JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00'):
+    frame = struct.pack('>BHHB', 8, height, width, 3) + b'\x01\x22\x00\x02\x11\x01\x03\x11\x01'
+    return (b'\xff\xd8'
+            + segment(0xE0, app_payload)
+            + segment(0xDB, b'\x00' + bytes(64))  # DQT
+            + segment(0xC4, b'\x00' + bytes(16) + b'\x00')  # DHT, before SOF as some encoders write it
+            + segment(sof, frame)
+            + segment(0xDA, b'\x03\x01\x00\x02\x11\x03\x11\x00\x3f\x00')  # SOS
+            + b'\x12\x34\xff\x00\x56'  # Entropy-coded data
+            + b'\xff\xd9')
+
+
+def test_png():
+    assert read_image_dimensions(png(1280, 720)) == (1280, 720)
+
+
+def test_baseline_jpeg():
+    assert read_image_dimensions(jpeg(640, 480)) == (640, 480)
+
+
+def test_progressive_jpeg():
+    assert read_image_dimensions(jpeg(1920, 1080, sof=0xC2)) == (1920, 1080)
+
+
+def test_jpeg_with_long_app_segment():
+    # e.g. an embedded EXIF thumbnail or ICC profile ahead of the frame header
+    data = jpeg(800, 600, app_payload=b'Exif\x00\x00' + bytes(60000))
+    assert read_image_dimensions(data) == (800, 600)
+    assert read_image_dimensions(data[:HEADER_READ_SIZE]) == (800, 600)
+
+
+def test_jpeg_fill_bytes_and_standalone_markers():
+    data = jpeg(320, 200)
+    data = data[:2] + b'\xff\xff\xff\xd0' + data[2:]  # Fill bytes, then RST0
+    assert read_image_dimensions(data) == (320, 200)
+
+
+def test_unrecognised_or_truncated():
+    assert read_image_dimensions(b'GIF89a' + bytes(20)) is None
+    assert read_image_dimensions(png(10, 10)[:20]) is None
+    # Frame header beyond the bytes read: no guess, callers fall back to PIL
+    assert read_image_dimensions(jpeg(800, 600, app_payload=bytes(60000))[:1000]) is None
+    assert read_image_dimensions(b'\xff\xd8\x00\x00' + bytes(20)) is None
+
+
+def test_metadata_uses_header(tmp_path):
+    path = tmp_path / 'shot.jpg'
+    path.write_bytes(jpeg(1024, 768, sof=0xC2))
+    storage = ImageStorage(backend_type='local', base_cache_dir=str(tmp_path / 'cache'))
+    metadata = storage.get_image_metadata(path)
+    assert (metadata['width'], metadata['height']) == (1024, 768)
+    assert metadata['content_type'] == 'image/jpeg'
+
+    _, _, ingested, stored = storage.ingest_local(path)
+    assert stored
+    assert (ingested['width'], ingested['height']) == (1024, 768)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+match_addresses_batch must score every pair exactly as the scalar match_addresses does
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scoring_plugin import Address, match_addresses, match_addresses_batch
+
+PHARMACY = Address(address='123 Main Street', suite='Suite 200', city='Austin', state='TX', zip='78701')
+
+# (state board address, pharmacy address) pairs covering each scoring branch
+PAIRS = [
+    # Exact and normalized-exact matches
+    (Address('123 Main Street', 'Suite 200', 'Austin', 'TX', '78701'), PHARMACY),
+    (Address('123 MAIN ST', 'STE 200', 'AUSTIN', 'Texas', '78701-1234'), PHARMACY),
+    # Fuzzy street, suite similar / dissimilar / on one side only
+    (Address('123 Main St', 'Ste 201', 'Austin', 'TX', '78701'), PHARMACY),
+    (Address('123 Main St', 'Unit B', 'Austin', 'TX', '78701'), PHARMACY),
+    (Address('123 Main St', None, 'Austin', 'TX', '78701'), PHARMACY),
+    (Address('125 North Main Avenue', None, 'Austin', 'TX', '78701'),
+     Address('125 N Main Ave', None, 'Austin', 'TX', '78701')),
+    # Different street, partial city/state/zip agreement
+    (Address('9 Elm Rd', None, 'Round Rock', 'TX', '78664'), PHARMACY),
+    (Address('123 Main St', None, 'Austin', 'CA', '90210'), PHARMACY),
+    (Address('123 Main St', None, 'Austin', 'tx', None), PHARMACY),
+    # Missing street on either side falls back to city/state/zip only
+    (Address(None, None, 'Austin', 'TX', '78701'), PHARMACY),
+    (Address('', 'Suite 200', 'Austin', 'TX', '78701'), PHARMACY),
+    (Address('123 Main St', None, 'Austin', 'TX', '78701'), Address(None, None, 'Austin', 'TX', '78701')),
+    # Nothing to compare
+    (Address(), Address()),
+    (Address('   ', None, None, None, None), PHARMACY),
+]
+
+
+def test_batch_matches_scalar():
+    street, csz, overall = match_addresses_batch([s for s, _ in PAIRS], [p for _, p in PAIRS])
+
+    for i, (state_addr, pharmacy_addr) in enumerate(PAIRS):
+        expected = match_addresses(state_addr, pharmacy_addr)
+        assert (street[i], csz[i], overall[i]) == pytest.approx(expected, abs=1e-9), PAIRS[i]
+
+
+def test_batch_accepts_columns():
+    columns = {field: [getattr(s, field) for s, _ in PAIRS]
+               for field in ('address', 'suite', 'city', 'state', 'zip')}
+    from_columns = match_addresses_batch(columns, [p for _, p in PAIRS])
+    from_objects = match_addresses_batch([s for s, _ in PAIRS], [p for _, p in PAIRS])
+
+    for got, expected in zip(from_columns, from_objects):
+        assert got.tolist() == expected.tolist()
+
+
+def test_batch_rejects_length_mismatch():
+    with pytest.raises(ValueError):
+        match_addresses_batch([PHARMACY, PHARMACY], [PHARMACY])
+
+
+def test_empty_batch():
+    assert all(len(scores) == 0 for scores in match_addresses_batch([], []))
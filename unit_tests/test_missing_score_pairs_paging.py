@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+SupabaseClient.iter_missing_score_pairs must follow the keyset to the end even when
+the server caps each response below the requested page size
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from supabase_client import SupabaseClient
+
+MAX_ROWS = 1000  # PostgREST db max-rows on a default Supabase project
+PAIRS = [{'pharmacy_id': i // 3, 'result_id': i} for i in range(2500)]
+
+
+def get_missing_score_pairs(function_name, params=None):
+    after = params['p_after_pharmacy_id']
+    remaining = [pair for pair in PAIRS
+                 if after is None or (pair['pharmacy_id'], pair['result_id']) >
+                 (after, params['p_after_result_id'] or 0)]
+    return remaining[:params['p_limit']][:MAX_ROWS]
+
+
+@pytest.fixture
+def client():
+    client = SupabaseClient.__new__(SupabaseClient)
+    client.call_rpc_function = get_missing_score_pairs
+    return client
+
+
+@pytest.mark.parametrize('page_size', [7, MAX_ROWS, 5000])
+def test_all_pairs_are_returned(client, page_size):
+    pages = list(client.iter_missing_score_pairs('states', 'pharmacies', page_size=page_size))
+    assert [pair for page in pages for pair in page] == PAIRS
+    assert all(pages)
+
+
+def test_rpc_error_is_raised(client):
+    client.call_rpc_function = lambda function_name, params=None: {'error': 'RPC call failed: 404'}
+    with pytest.raises(Exception, match='404'):
+        list(client.iter_missing_score_pairs('states', 'pharmacies'))
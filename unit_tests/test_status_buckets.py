@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+calculate_status_buckets must reproduce the per-row status functions it replaced
+(app.py / ApiDatabaseManager / validation_local) for each rule set
+"""
+
+import itertools
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.status import (
+    COMPUTED_FIELD_RULES, MATRIX_RULES, VALIDATION_RULES, StatusThresholds, calculate_status_buckets
+)
+
+THRESHOLDS = StatusThresholds(match=85, weak_match=60)
+
+OVERRIDE_TYPES = [None, 'empty', 'present']
+SCORES = [None, 100.0, 85.0, 84.9, 60.0, 59.9, 0.0]
+RESULT_STATUSES = [None, 'results_found', 'no_results_found']
+RESULT_IDS = [None, 1]
+
+
+@pytest.fixture
+def rule_matrix():
+    return pd.DataFrame(
+        list(itertools.product(OVERRIDE_TYPES, SCORES, RESULT_STATUSES, RESULT_IDS)),
+        columns=['override_type', 'score_overall', 'result_status', 'result_id']
+    )
+
+
+# Baseline row-wise implementations, as they were before the shared engine
+
+def matrix_status(row):
+    if row.get('result_status') == 'no_results_found':
+        return 'not found'
+    elif pd.isna(row.get('result_id')):
+        return 'no data'
+    elif pd.notna(row.get('override_type')):
+        return 'validated'
+    elif pd.notna(row.get('score_overall')):
+        score = float(row['score_overall'])
+        if score >= 85:
+            return 'match'
+        elif score >= 60:
+            return 'weak match'
+        else:
+            return 'no match'
+    else:
+        return 'no data'
+
+
+def validation_status(row):
+    override_type = row.get('override_type')
+    if override_type == 'empty':
+        return 'validated empty'
+    elif override_type == 'present':
+        return 'validated present'
+
+    score = row.get('score_overall')
+    if pd.isna(score):
+        return 'no data'
+    elif score >= 85:
+        return 'match'
+    elif score >= 60:
+        return 'weak match'
+    else:
+        return 'no match'
+
+
+def computed_field_status(row):
+    if row.get('override_type') == 'empty':
+        return 'no data'
+    elif row.get('override_type') == 'present':
+        score = row.get('score_overall')
+        if pd.isna(score):
+            return 'no data'
+        elif score >= 85:
+            return 'match'
+        elif score >= 60:
+            return 'weak match'
+        else:
+            return 'no match'
+    elif pd.isna(row.get('latest_result_id', row.get('result_id'))):
+        return 'no data'
+    elif pd.isna(row.get('score_overall')):
+        return 'no data'
+    elif row.get('score_overall', 0) >= 85:
+        return 'match'
+    elif row.get('score_overall', 0) >= 60:
+        return 'weak match'
+    else:
+        return 'no match'
+
+
+@pytest.mark.parametrize('rules, baseline', [
+    (MATRIX_RULES, matrix_status),
+    (VALIDATION_RULES, validation_status),
+    (COMPUTED_FIELD_RULES, computed_field_status),
+])
+def test_matches_baseline(rule_matrix, rules, baseline):
+    expected = rule_matrix.apply(baseline, axis=1).tolist()
+    assert calculate_status_buckets(rule_matrix, rules, THRESHOLDS).tolist() == expected
+
+
+def test_latest_result_id_fallback(rule_matrix):
+    df = rule_matrix.rename(columns={'result_id': 'latest_result_id'})
+    expected = df.apply(computed_field_status, axis=1).tolist()
+    assert calculate_status_buckets(df, COMPUTED_FIELD_RULES, THRESHOLDS).tolist() == expected
+
+
+def test_missing_columns_default_to_null():
+    df = pd.DataFrame({'score_overall': [90.0, 70.0, 10.0, np.nan]})
+    assert calculate_status_buckets(df, VALIDATION_RULES, THRESHOLDS).tolist() == [
+        'match', 'weak match', 'no match', 'no data'
+    ]
+
+
+def test_custom_thresholds():
+    df = pd.DataFrame({'score_overall': [95.0, 90.0, 75.0]})
+    assert calculate_status_buckets(df, (), StatusThresholds(match=92, weak_match=80)).tolist() == [
+        'match', 'weak match', 'no match'
+    ]
+
+
+def test_empty_frame():
+    assert calculate_status_buckets(pd.DataFrame(), MATRIX_RULES).tolist() == []
+
+
+def test_unknown_rule():
+    with pytest.raises(ValueError):
+        calculate_status_buckets(pd.DataFrame({'score_overall': [1.0]}), ('bogus',))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for the upsert_search_results RPC against the consolidated Supabase schema
+
+Needs a scratch PostgreSQL database (see the cur fixture in conftest.py).
+"""
+
+import json
+
+
+def row(cur, name='Acme', state='TX', license_number='L1', ts='2024-01-01T00:00:00', status='Active'):
+    return {'dataset_id': cur.dataset_id, 'search_name': name, 'search_state': state,
+            'search_ts': ts, 'license_number': license_number, 'license_status': status}
+
+
+def upsert(cur, rows):
+    cur.execute("SELECT inserted, updated, skipped FROM upsert_search_results(%s::jsonb)", (json.dumps(rows),))
+    return cur.fetchone()
+
+
+def stored(cur):
+    cur.execute("SELECT search_name, license_number, search_ts::text, license_status "
+                "FROM search_results ORDER BY search_name, license_number")
+    return cur.fetchall()
+
+
+def test_inserts_new_rows(cur):
+    assert upsert(cur, [row(cur), row(cur, license_number='L2')]) == (2, 0, 0)
+    assert len(stored(cur)) == 2
+
+
+def test_newer_search_ts_wins(cur):
+    upsert(cur, [row(cur, ts='2024-02-01T00:00:00', status='Active')])
+
+    # Older search is ignored
+    assert upsert(cur, [row(cur, ts='2024-01-01T00:00:00', status='Expired')]) == (0, 0, 1)
+    assert stored(cur) == [('Acme', 'L1', '2024-02-01 00:00:00', 'Active')]
+
+    # Same timestamp is ignored
+    assert upsert(cur, [row(cur, ts='2024-02-01T00:00:00', status='Expired')]) == (0, 0, 1)
+
+    # Newer search replaces the stored row
+    assert upsert(cur, [row(cur, ts='2024-03-01T00:00:00', status='Expired')]) == (0, 1, 0)
+    assert stored(cur) == [('Acme', 'L1', '2024-03-01 00:00:00', 'Expired')]
+
+
+def test_newest_row_in_batch_wins(cur):
+    rows = [row(cur, ts='2024-01-01T00:00:00', status='Old'),
+            row(cur, ts='2024-03-01T00:00:00', status='New'),
+            row(cur, ts='2024-02-01T00:00:00', status='Middle')]
+    assert upsert(cur, rows) == (1, 0, 2)
+    assert stored(cur) == [('Acme', 'L1', '2024-03-01 00:00:00', 'New')]
+
+
+def test_collision_with_another_search_is_skipped(cur):
+    # unique_search_result is (dataset_id, search_state, license_number) in this schema
+    upsert(cur, [row(cur, name='Acme')])
+    assert upsert(cur, [row(cur, name='Acme Pharmacy LLC', ts='2024-05-01T00:00:00')]) == (0, 0, 1)
+    assert stored(cur) == [('Acme', 'L1', '2024-01-01 00:00:00', 'Active')]
+
+
+def test_null_license_numbers_match(cur):
+    assert upsert(cur, [row(cur, license_number=None)]) == (1, 0, 0)
+    assert upsert(cur, [row(cur, license_number=None)]) == (0, 0, 1)
+    assert upsert(cur, [row(cur, license_number=None, ts='2024-02-01T00:00:00')]) == (0, 1, 0)
+    assert len(stored(cur)) == 1
+
+
+def test_rows_differing_by_search_name_in_batch_are_counted(cur):
+    # One (dataset_id, search_state, license_number) slot: only the newest row is kept
+    rows = [row(cur, name='Acme', ts='2024-01-01T00:00:00'),
+            row(cur, name='Acme Pharmacy LLC', ts='2024-02-01T00:00:00'),
+            row(cur, name='ACME RX', ts='2024-01-15T00:00:00')]
+    assert upsert(cur, rows) == (1, 0, 2)
+    assert stored(cur) == [('Acme Pharmacy LLC', 'L1', '2024-02-01 00:00:00', 'Active')]
+
+
+def test_counts_add_up_to_rows_sent(cur):
+    upsert(cur, [row(cur, ts='2024-01-01T00:00:00'), row(cur, license_number='L2')])
+    rows = [row(cur, ts='2024-02-01T00:00:00'),                      # superseded by the next row
+            row(cur, name='Other', ts='2024-03-01T00:00:00'),         # another search's row
+            row(cur, license_number='L2'),                            # not newer
+            row(cur, license_number='L3'),                            # insert
+            row(cur, license_number='L3', ts='2023-01-01T00:00:00')]  # superseded in batch
+    assert upsert(cur, rows) == (1, 0, 4)
+
+
+def test_updates_are_counted_per_incoming_row(cur):
+    # NULL license numbers aren't covered by the unique constraint, so older data can hold duplicates
+    for _ in range(2):
+        cur.execute("INSERT INTO search_results (dataset_id, search_name, search_state, search_ts) "
+                    "VALUES (%s, 'Acme', 'TX', '2024-01-01')", (cur.dataset_id,))
+    assert upsert(cur, [row(cur, license_number=None, ts='2024-02-01T00:00:00')]) == (0, 1, 0)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+WorkStateManager persistence: snapshot + journal replay, compaction, and recovery
+from a torn final journal line
+"""
+
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from imports.resilient_importer import (
+    ProcessingPhase, WorkItem, WorkItemStatus, WorkState, WorkStateManager
+)
+
+
+def make_state(n=3):
+    items = [WorkItem(work_id=f"w{i}", json_path=f"{i}.json", png_path=f"{i}.png",
+                      directory="d", pharmacy_name=f"Pharmacy {i}", search_state="TX",
+                      search_timestamp=None, dedup_key=f"k{i}", estimated_size=100)
+             for i in range(n)]
+    return WorkState(dataset_id=1, tag="t", total_files=n, total_images=n,
+                     start_time="2024-01-01T00:00:00", phases={}, work_items=items,
+                     failed_items=[], completed_items=[], last_update="")
+
+
+def snapshot(state):
+    return [(i.work_id, i.status, i.sha256_hash, i.image_exists, i.error_message)
+            for i in state.work_items]
+
+
+def test_journal_replays_over_snapshot(tmp_path):
+    manager = WorkStateManager(str(tmp_path / "state.json"))
+    state = make_state()
+    manager.save_state(state)
+
+    state.update_item("w0", status=WorkItemStatus.COMPLETED, sha256_hash="abc")
+    state.update_item("w1", status=WorkItemStatus.FAILED, error_message="boom")
+    state.update_item("w2", image_exists=True)
+    state.current_phase = ProcessingPhase.UPLOAD
+    state.phases = {"upload": {"done": 1}}
+    manager.checkpoint(state)
+    manager.close()
+
+    loaded = WorkStateManager(str(tmp_path / "state.json")).load_state()
+    assert snapshot(loaded) == snapshot(state)
+    assert loaded.completed_items == ["w0"]
+    assert loaded.failed_items == ["w1"]
+    assert loaded.current_phase == ProcessingPhase.UPLOAD
+    assert loaded.phases == {"upload": {"done": 1}}
+
+
+def test_checkpoint_compacts_large_journal(tmp_path):
+    manager = WorkStateManager(str(tmp_path / "state.json"), compact_every=2)
+    state = make_state()
+    manager.save_state(state)
+
+    for item in state.work_items:
+        state.update_item(item.work_id, status=WorkItemStatus.COMPLETED)
+    manager.checkpoint(state)
+
+    # Compaction folded everything into the snapshot and truncated the journal
+    assert manager.journal_file.stat().st_size == 0
+    state.update_item("w0", sha256_hash="after")
+    manager.close()
+
+    loaded = WorkStateManager(str(tmp_path / "state.json")).load_state()
+    assert snapshot(loaded) == snapshot(state)
+    assert loaded.completed_items == ["w0", "w1", "w2"]
+
+
+def test_torn_final_line_is_ignored(tmp_path):
+    manager = WorkStateManager(str(tmp_path / "state.json"))
+    state = make_state()
+    manager.save_state(state)
+    state.update_item("w0", status=WorkItemStatus.COMPLETED)
+    manager.close()
+    with open(manager.journal_file, "a", encoding="utf-8") as f:
+        f.write('{"id":"w1","status":"comp')
+
+    reloaded_manager = WorkStateManager(str(tmp_path / "state.json"))
+    loaded = reloaded_manager.load_state()
+    assert loaded.get_item("w0").status == WorkItemStatus.COMPLETED
+    assert loaded.get_item("w1").status == WorkItemStatus.PENDING
+
+    # Loading compacted the journal, so new entries don't follow the torn line
+    assert reloaded_manager.journal_file.stat().st_size == 0
+    loaded.update_item("w2", status=WorkItemStatus.FAILED)
+    reloaded_manager.close()
+
+    again = WorkStateManager(str(tmp_path / "state.json")).load_state()
+    assert again.get_item("w0").status == WorkItemStatus.COMPLETED
+    assert again.get_item("w2").status == WorkItemStatus.FAILED
@@ -22,6 +22,7 @@ except ImportError as e:
     logging.warning(f"API client not available: {e}")
 
 from config import get_config_summary, API_CACHE_TTL, API_RETRY_COUNT
+from utils.status import calculate_status_buckets, COMPUTED_FIELD_RULES
 
 logger = logging.getLogger(__name__)
 
@@ -199,16 +200,15 @@ class ApiDatabaseManager:
         """Get all search results for dataset combination using comprehensive function"""
         if self.use_api and self.client:
             try:
-                # Call the comprehensive results API
-                results_list = self._api_request_with_retry(
-                    self.client.get_comprehensive_results,
+                # Page through the comprehensive results API, building the frame per page
+                df = self._api_request_with_retry(
+                    self.client.get_comprehensive_results_frame,
                     states_tag=states_tag,
                     pharmacies_tag=pharmacies_tag, 
                     validated_tag=validated_tag or ""
                 )
                 
-                if isinstance(results_list, list) and len(results_list) > 0:
-                    df = pd.DataFrame(results_list)
+                if not df.empty:
                     
                     # Add computed fields that were previously done in SQL
                     df = self._add_computed_fields(df)
@@ -350,27 +350,29 @@ class ApiDatabaseManager:
             return self._use_fallback('get_pharmacies', pharmacies_tag)
     
     def find_missing_scores(self, states_tag: str, pharmacies_tag: str) -> pd.DataFrame:
-        """Find pharmacy/result pairs that need scoring"""
-        # This uses comprehensive results, so implement via API if possible
-        try:
-            comprehensive_df = self.get_comprehensive_results(states_tag, pharmacies_tag, None, False)
-            
-            if comprehensive_df.empty:
-                return pd.DataFrame()
-            
-            # Find results without scores
-            missing_scores = comprehensive_df[
-                (comprehensive_df['result_id'].notna()) &  # Has search results
-                (comprehensive_df['score_overall'].isna())  # But no scores
-            ][['pharmacy_id', 'result_id']].drop_duplicates()
-            
-            return missing_scores
-            
-        except Exception as e:
-            logger.error(f"find_missing_scores failed: {e}")
-            if self.allow_fallback:
-                return self._use_fallback('find_missing_scores', states_tag, pharmacies_tag)
-            return pd.DataFrame()
+        """Find pharmacy/result pairs that need scoring
+        
+        Uses the get_missing_score_pairs() function, which anti-joins match_scores
+        server-side and returns only unscored id pairs plus their address fields.
+        """
+        if self.use_api and self.client:
+            try:
+                def fetch_pages() -> pd.DataFrame:
+                    pages = [
+                        pd.DataFrame(page)
+                        for page in self.client.iter_missing_score_pairs(states_tag, pharmacies_tag)
+                    ]
+                    return pd.concat(pages, ignore_index=True) if pages else pd.DataFrame()
+                
+                return self._api_request_with_retry(fetch_pages)
+                
+            except Exception as e:
+                # An empty frame would read as "nothing to score", e.g. when the
+                # get_missing_score_pairs migration hasn't been applied
+                logger.error(f"API find_missing_scores failed: {e}")
+                raise
+        else:
+            raise Exception("API client not available - cannot find missing scores")
     
     def compute_missing_scores(self, states_tag: str, pharmacies_tag: str, batch_size: int = 50) -> Dict[str, Any]:
         """Compute missing scores via API and scoring plugin"""
@@ -383,7 +385,7 @@ class ApiDatabaseManager:
                 if str(parent_dir) not in sys.path:
                     sys.path.insert(0, str(parent_dir))
                 
-                from scoring_plugin import Address, match_addresses
+                from scoring_plugin import SCORING_VERSION, address_fingerprints, match_addresses_batch
                 
                 # Find missing scores
                 missing_df = self.find_missing_scores(states_tag, pharmacies_tag)
@@ -402,53 +404,37 @@ class ApiDatabaseManager:
                     batch = missing_df.iloc[start_idx:start_idx + batch_size]
                     batch_scores = []
                     
-                    for _, row in batch.iterrows():
-                        pharmacy_id = int(row['pharmacy_id'])
-                        result_id = int(row['result_id'])
-                        
-                        try:
-                            # Get pharmacy address via API
-                            pharmacy_data = self.get_table_data('pharmacies', limit=1, filters={'id': f'eq.{pharmacy_id}'})
-                            if not pharmacy_data:
-                                continue
-                            
-                            pharmacy = pharmacy_data[0]
-                            pharmacy_address = Address(
-                                street=pharmacy.get('address', ''),
-                                city=pharmacy.get('city', ''),
-                                state=pharmacy.get('state', ''),
-                                zip_code=pharmacy.get('zip', '')
-                            )
-                            
-                            # Get result address via API
-                            result_data = self.get_table_data('search_results', limit=1, filters={'id': f'eq.{result_id}'})
-                            if not result_data:
-                                continue
-                                
-                            result = result_data[0]
-                            result_address = Address(
-                                street=result.get('address', ''),
-                                city=result.get('city', ''),
-                                state=result.get('state', ''),
-                                zip_code=result.get('zip', '')
-                            )
-                            
-                            # Compute score using scoring plugin
-                            score = match_addresses(pharmacy_address, result_address)
-                            
-                            # Prepare score for database update
-                            batch_scores.append({
-                                'pharmacy_id': pharmacy_id,
-                                'result_id': result_id,
-                                'score_overall': score.overall,
-                                'score_street': score.street,
-                                'score_city_state_zip': score.city_state_zip,
-                                'computed_at': 'now()'  # PostgreSQL function
-                            })
-                            
-                        except Exception as e:
-                            logger.warning(f"Failed to compute score for pharmacy {pharmacy_id}, result {result_id}: {e}")
-                            continue
+                    # Address fields come with the missing pairs - no per-row lookups needed
+                    result_addrs = {
+                        'address': batch['result_address'].tolist(),
+                        'city': batch['result_city'].tolist(),
+                        'state': batch['result_state'].tolist(),
+                        'zip': batch['result_zip'].tolist()
+                    }
+                    pharmacy_addrs = {
+                        'address': batch['pharmacy_address'].tolist(),
+                        'suite': batch['pharmacy_suite'].tolist(),
+                        'city': batch['pharmacy_city'].tolist(),
+                        'state': batch['pharmacy_state'].tolist(),
+                        'zip': batch['pharmacy_zip'].tolist()
+                    }
+                    street_scores, csz_scores, overall_scores = match_addresses_batch(result_addrs, pharmacy_addrs)
+                    fingerprints = address_fingerprints(result_addrs, pharmacy_addrs)
+                    
+                    for pharmacy_id, result_id, street, csz, overall, fingerprint in zip(
+                            batch['pharmacy_id'], batch['result_id'],
+                            street_scores, csz_scores, overall_scores, fingerprints):
+                        # Prepare score for database update
+                        batch_scores.append({
+                            'pharmacy_id': int(pharmacy_id),
+                            'result_id': int(result_id),
+                            'score_overall': round(float(overall), 2),
+                            'score_street': round(float(street), 2),
+                            'score_city_state_zip': round(float(csz), 2),
+                            'scoring_version': SCORING_VERSION,
+                            'input_fingerprint': fingerprint,
+                            'computed_at': 'now()'  # PostgreSQL function
+                        })
                     
                     # Insert/update scores via API if we have any
                     if batch_scores:
@@ -622,46 +608,12 @@ class ApiDatabaseManager:
         if df.empty:
             return df
         
-        # Use fallback manager's implementation if available
-        if self.fallback_manager:
-            return self.fallback_manager._add_computed_fields(df)
-        
-        # Basic implementation without fallback
-        df['status_bucket'] = df.apply(self._calculate_status_bucket, axis=1)
+        df['status_bucket'] = calculate_status_buckets(df, COMPUTED_FIELD_RULES)
         df['record_count'] = df.groupby(['pharmacy_name', 'search_state'])['result_id'].transform('count')
         df['latest_result_id'] = df['result_id']
         
         return df
     
-    def _calculate_status_bucket(self, row) -> str:
-        """Calculate status bucket for a result row"""
-        if self.fallback_manager:
-            return self.fallback_manager._calculate_status_bucket(row)
-        
-        # Basic implementation
-        if row.get('override_type') == 'empty':
-            return 'no data'
-        elif row.get('override_type') == 'present':
-            score = row.get('score_overall')
-            if pd.isna(score):
-                return 'no data'
-            elif score >= 85:
-                return 'match'
-            elif score >= 60:
-                return 'weak match'
-            else:
-                return 'no match'
-        elif pd.isna(row.get('latest_result_id', row.get('result_id'))):
-            return 'no data'
-        elif pd.isna(row.get('score_overall')):
-            return 'no data'
-        elif row.get('score_overall', 0) >= 85:
-            return 'match'
-        elif row.get('score_overall', 0) >= 60:
-            return 'weak match'
-        else:
-            return 'no match'
-    
     def _basic_aggregate_for_matrix(self, full_df: pd.DataFrame) -> pd.DataFrame:
         """Basic aggregation logic for matrix view when no fallback available"""
         logger.debug(f"_basic_aggregate_for_matrix called with {len(full_df)} rows")
@@ -684,27 +636,15 @@ class ApiDatabaseManager:
             # Group and select first row from each group
             matrix_df = full_df.groupby(['pharmacy_id', 'pharmacy_name', 'search_state'], dropna=False).first().reset_index()
             
-            # Add record count by counting group sizes
-            record_counts = full_df.groupby(['pharmacy_name', 'search_state']).size().to_dict()
-            matrix_df['record_count'] = matrix_df.apply(
-                lambda row: record_counts.get((row['pharmacy_name'], row['search_state']), 1), 
-                axis=1
-            )
+            # Add record count by joining group sizes (pairs with no counted rows default to 1)
+            record_counts = full_df.groupby(['pharmacy_name', 'search_state']).size().rename('record_count')
+            matrix_df = matrix_df.drop(columns=['record_count'], errors='ignore')
+            matrix_df = matrix_df.join(record_counts, on=['pharmacy_name', 'search_state'])
+            matrix_df['record_count'] = matrix_df['record_count'].fillna(1).astype(int)
             
             # Add status_bucket and warnings columns that the GUI expects
-            if self.fallback_manager:
-                # Use fallback manager's methods for status calculation if available
-                try:
-                    matrix_df['status_bucket'] = matrix_df.apply(self.fallback_manager._calculate_status_bucket, axis=1)
-                    matrix_df['warnings'] = matrix_df.apply(lambda row: self.fallback_manager._calculate_warnings(row, full_df), axis=1)
-                except Exception:
-                    # If fallback fails, use basic calculation
-                    matrix_df['status_bucket'] = matrix_df.apply(self._calculate_status_bucket, axis=1)
-                    matrix_df['warnings'] = None
-            else:
-                # Use basic status calculation
-                matrix_df['status_bucket'] = matrix_df.apply(self._calculate_status_bucket, axis=1)
-                matrix_df['warnings'] = None
+            matrix_df['status_bucket'] = calculate_status_buckets(matrix_df, COMPUTED_FIELD_RULES)
+            matrix_df['warnings'] = None
             
             logger.debug(f"Successfully aggregated to {len(matrix_df)} rows")
             return matrix_df
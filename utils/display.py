@@ -5,13 +5,15 @@ Handles UI components, formatting, and styling
 
 import streamlit as st
 import pandas as pd
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
 import os
 import sys
 import logging
+import threading
+import time
 from dotenv import load_dotenv
 
 # Initialize logger
@@ -20,6 +22,142 @@ logger = logging.getLogger(__name__)
 # Add project root to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Signed screenshot URLs, shared by every session in this process:
+# storage_path -> (signed URL, unix expiry time)
+SIGNED_URL_TTL = 3600  # Seconds a signed URL is valid for
+SIGNED_URL_MARGIN = 300  # Re-sign this long before expiry so a rendered page never shows a dead link
+SIGNED_URL_BATCH_SIZE = 100  # Paths per create_signed_urls request
+_signed_url_cache: Dict[str, Tuple[str, float]] = {}
+_signed_url_lock = threading.Lock()
+_storage_client = None
+_image_cache = None
+
+
+def _get_storage_client():
+    """Supabase client for signing screenshot URLs, created once per process"""
+    global _storage_client
+    if _storage_client is not None:
+        return _storage_client
+    
+    # Try Streamlit secrets first, then fall back to environment variables
+    try:
+        supabase_url = st.secrets.get('SUPABASE_URL') or os.getenv('SUPABASE_URL')
+        service_key = st.secrets.get('SUPABASE_SERVICE_KEY') or os.getenv('SUPABASE_SERVICE_KEY')
+    except Exception:
+        # Fallback to environment variables if secrets not available
+        load_dotenv()
+        supabase_url = os.getenv('SUPABASE_URL')
+        service_key = os.getenv('SUPABASE_SERVICE_KEY')
+    
+    if not supabase_url or not service_key:
+        logger.error("Supabase credentials not available for image display")
+        logger.error(f"SUPABASE_URL: {'✓' if supabase_url else '✗'}")
+        logger.error(f"SUPABASE_SERVICE_KEY: {'✓' if service_key else '✗'}")
+        return None
+    
+    try:
+        from supabase import create_client
+    except ImportError as e:
+        logger.error(f"Supabase client not available for image display: {e}")
+        logger.error("Make sure 'supabase>=2.0.0' is in requirements.txt")
+        return None
+    
+    _storage_client = create_client(supabase_url, service_key)
+    return _storage_client
+
+
+def _get_image_cache():
+    """Read-through local cache of Supabase screenshots, shared by every session"""
+    global _image_cache
+    if _image_cache is None:
+        client = _get_storage_client()
+        if client is None:
+            return None
+        from utils.image_storage import ImageStorage
+        _image_cache = ImageStorage('supabase', supabase_client=client)
+    return _image_cache
+
+
+def sign_screenshot_urls(storage_paths: List[str]) -> Dict[str, str]:
+    """
+    Signed URLs for Supabase screenshot paths, served from the process-wide cache.
+    
+    Paths without a still-valid cached URL are signed together through
+    create_signed_urls, so a detail page costs at most one storage call per
+    SIGNED_URL_BATCH_SIZE screenshots, and none while its URLs remain valid.
+    
+    Args:
+        storage_paths: Paths from image_assets (e.g., 'sha256/ab/cd/hash.png')
+        
+    Returns:
+        Dict of storage_path -> signed URL (paths that could not be signed are omitted)
+    """
+    now = time.time()
+    urls = {}
+    missing = []
+    with _signed_url_lock:
+        for path in dict.fromkeys(p for p in storage_paths if p):
+            cached = _signed_url_cache.get(path)
+            if cached and cached[1] - SIGNED_URL_MARGIN > now:
+                urls[path] = cached[0]
+            else:
+                missing.append(path)
+    
+    if not missing:
+        return urls
+    
+    client = _get_storage_client()
+    if client is None:
+        return urls
+    
+    bucket = client.storage.from_('imagecache')
+    for start in range(0, len(missing), SIGNED_URL_BATCH_SIZE):
+        chunk = missing[start:start + SIGNED_URL_BATCH_SIZE]
+        try:
+            expires_at = time.time() + SIGNED_URL_TTL
+            signed = bucket.create_signed_urls(chunk, SIGNED_URL_TTL)
+        except Exception as e:
+            logger.error(f"Error creating signed URLs for {len(chunk)} screenshots: {e}")
+            continue
+        
+        with _signed_url_lock:
+            for path, entry in zip(chunk, signed or []):
+                path = entry.get('path') or path
+                url = entry.get('signedURL') or entry.get('signedUrl')
+                if entry.get('error') or not url:
+                    logger.error(f"Failed to create signed URL for {path}: {entry.get('error')}")
+                    continue
+                _signed_url_cache[path] = (url, expires_at)
+                urls[path] = url
+    
+    return urls
+
+
+def prefetch_screenshot_urls(results: pd.DataFrame) -> None:
+    """
+    Make every Supabase screenshot in a set of results displayable up front.
+    
+    Missing images are pulled into the local read-through cache in parallel;
+    without that cache they are signed with one batched request instead.
+    """
+    if results is None or results.empty or 'screenshot_path' not in results.columns:
+        return
+    paths = results['screenshot_path']
+    if 'screenshot_storage_type' in results.columns:
+        paths = paths[results['screenshot_storage_type'] == 'supabase']
+    paths = [p for p in dict.fromkeys(paths.dropna()) if not os.path.exists(os.path.join('imagecache', p))]
+    if not paths:
+        return
+    
+    image_cache = _get_image_cache()
+    if image_cache is None:
+        sign_screenshot_urls(paths)
+        return
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=min(8, len(paths))) as executor:
+        list(executor.map(image_cache.fetch_cached, paths))
+
+
 def get_image_display_url(storage_path: str, storage_type: str) -> Optional[str]:
     """
     Convert SHA256 storage path to displayable URL
@@ -44,48 +182,14 @@ def get_image_display_url(storage_path: str, storage_type: str) -> Optional[str]
             return None
             
     elif storage_type == 'supabase':
-        # For Supabase, create signed URL
+        # For Supabase, serve from the local read-through cache, falling back to
+        # a cached (or freshly batch-signed) URL
         try:
-            # Try Streamlit secrets first, then fall back to environment variables
-            try:
-                supabase_url = st.secrets.get('SUPABASE_URL') or os.getenv('SUPABASE_URL')
-                service_key = st.secrets.get('SUPABASE_SERVICE_KEY') or os.getenv('SUPABASE_SERVICE_KEY')
-            except Exception:
-                # Fallback to environment variables if secrets not available
-                load_dotenv()
-                supabase_url = os.getenv('SUPABASE_URL')
-                service_key = os.getenv('SUPABASE_SERVICE_KEY')
-            
-            if not supabase_url or not service_key:
-                logger.error("Supabase credentials not available for image display")
-                logger.error(f"SUPABASE_URL: {'✓' if supabase_url else '✗'}")
-                logger.error(f"SUPABASE_SERVICE_KEY: {'✓' if service_key else '✗'}")
-                return None
-                
-            # Try to create signed URL using Supabase client
-            try:
-                from supabase import create_client
-                supabase = create_client(supabase_url, service_key)
-                
-                # Generate signed URL (valid for 1 hour)
-                signed_url_response = supabase.storage.from_('imagecache').create_signed_url(
-                    storage_path, expires_in=3600
-                )
-                
-                if 'signedURL' in signed_url_response:
-                    return signed_url_response['signedURL']
-                else:
-                    logger.error(f"Failed to create signed URL for {storage_path}")
-                    return None
-                    
-            except ImportError as e:
-                logger.error(f"Supabase client not available for image display: {e}")
-                logger.error("Make sure 'supabase>=2.0.0' is in requirements.txt")
-                return None
-            except Exception as e:
-                logger.error(f"Error creating signed URL for {storage_path}: {e}")
-                return None
-                
+            image_cache = _get_image_cache()
+            local_path = image_cache.fetch_cached(storage_path) if image_cache else None
+            if local_path:
+                return str(local_path)
+            return sign_screenshot_urls([storage_path]).get(storage_path)
         except Exception as e:
             logger.error(f"Error handling Supabase image URL: {e}")
             return None
@@ -93,8 +197,6 @@ def get_image_display_url(storage_path: str, storage_type: str) -> Optional[str]
     else:
         logger.warning(f"Unknown storage type: {storage_type}")
         return None
-from imports.validated import ValidatedImporter
-from config import get_db_config
 
 def format_score(score: Optional[float]) -> str:
     """Format score value for display"""
@@ -233,9 +335,9 @@ def display_results_table(df: pd.DataFrame,
     
     # Recalculate status column with validation awareness
     if 'status_bucket' in display_df.columns:
-        from utils.validation_local import calculate_status_simple
+        from utils.validation_local import calculate_status_simple_column
         # Recalculate status buckets using validation-aware function
-        display_df['status_bucket'] = display_df.apply(calculate_status_simple, axis=1)
+        display_df['status_bucket'] = calculate_status_simple_column(display_df)
         display_df['Status'] = display_df['status_bucket'].apply(format_status_badge)
         display_df = display_df.drop('status_bucket', axis=1)
     
@@ -645,6 +747,9 @@ def display_row_detail_section(selected_row: Dict, datasets: Dict[str, str], deb
             else:
                 st.markdown("⚪ **Not Validated**")
     else:
+        # Fetch or sign every screenshot on this page up front (no storage calls on reruns)
+        prefetch_screenshot_urls(search_results)
+        
         # Create pulldown for each search result
         for i, (_, result) in enumerate(search_results.iterrows()):
             # Get score information for highlighting
@@ -0,0 +1,207 @@
+"""
+Persistent SHA256 cache for screenshot files.
+
+Digests are stored in a small SQLite sidecar keyed on (path, size, mtime_ns, inode),
+so unchanged files are never re-read on later imports. Files that do need hashing
+are read via mmap (or large buffered reads), optionally across a process pool.
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Read size for files that can't be mmapped
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Default sidecar file name, placed next to the importer's work state file
+HASH_CACHE_FILENAME = '.sha256_cache.sqlite'
+
+PathLike = Union[str, Path]
+
+
+def sha256_file(file_path: PathLike) -> str:
+    """
+    Compute the SHA256 hex digest of a file.
+
+    Uses mmap so the whole file is hashed in one call without copying it into
+    Python buffers; falls back to 1 MB reads when mmap isn't possible.
+    """
+    with open(file_path, 'rb') as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return hashlib.sha256(mm).hexdigest()
+        except (ValueError, OSError):
+            # Empty files and some special filesystems can't be mapped
+            f.seek(0)
+            sha256_hash = hashlib.sha256()
+            for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b""):
+                sha256_hash.update(chunk)
+            return sha256_hash.hexdigest()
+
+
+def _hash_one(file_path: str) -> Tuple[str, Optional[str]]:
+    """Hash a single file, returning (path, digest or None); runs in worker processes"""
+    try:
+        return file_path, sha256_file(file_path)
+    except OSError as e:
+        logger.error(f"SHA256 failed for {file_path}: {e}")
+        return file_path, None
+
+
+def _stat_key(file_path: str) -> Optional[Tuple[int, int, int]]:
+    """(size, mtime_ns, inode) for a file, or None if it can't be stat'ed"""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+class HashCache:
+    """SQLite-backed cache of file digests keyed on (path, size, mtime_ns, inode)."""
+
+    def __init__(self, cache_path: PathLike):
+        """
+        Open (or create) a hash cache.
+
+        Args:
+            cache_path: SQLite file to store digests in
+        """
+        self.cache_path = Path(cache_path)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.cache_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS file_hashes (
+                path     TEXT PRIMARY KEY,
+                size     INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode    INTEGER NOT NULL,
+                sha256   TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, file_path: PathLike, stat_key: Optional[Tuple[int, int, int]] = None) -> Optional[str]:
+        """Return the cached digest if the file's size, mtime and inode are unchanged"""
+        path = os.path.abspath(file_path)
+        stat_key = stat_key or _stat_key(path)
+        if stat_key is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, inode, sha256 FROM file_hashes WHERE path = ?", (path,)
+            ).fetchone()
+            if row and tuple(row[:3]) == stat_key:
+                self.hits += 1
+                return row[3]
+            self.misses += 1
+        return None
+
+    def put_many(self, entries: Iterable[Tuple[PathLike, Tuple[int, int, int], str]]):
+        """Store (path, (size, mtime_ns, inode), digest) entries"""
+        rows = [(os.path.abspath(path), *key, digest) for path, key, digest in entries]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, inode, sha256) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def put(self, file_path: PathLike, digest: str, stat_key: Optional[Tuple[int, int, int]] = None):
+        """Store one digest (stat is taken now if not given)"""
+        stat_key = stat_key or _stat_key(os.path.abspath(file_path))
+        if stat_key is not None:
+            self.put_many([(file_path, stat_key, digest)])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def hash_file(file_path: PathLike, cache: Optional[HashCache] = None) -> str:
+    """SHA256 of a file, served from cache when the file is unchanged"""
+    if cache is None:
+        return sha256_file(file_path)
+    path = os.path.abspath(file_path)
+    stat_key = _stat_key(path)
+    digest = cache.get(path, stat_key)
+    if digest is None:
+        digest = sha256_file(path)
+        if stat_key is not None:
+            cache.put(path, digest, stat_key)
+    return digest
+
+
+def hash_files(file_paths: Iterable[PathLike], cache: Optional[HashCache] = None,
+               max_workers: int = 8, use_processes: bool = False,
+               progress=None) -> Dict[str, Optional[str]]:
+    """
+    SHA256 many files, reusing cached digests for unchanged files.
+
+    Args:
+        file_paths: Files to hash
+        cache: Optional HashCache consulted first and updated with new digests
+        max_workers: Parallel hashing workers for cache misses
+        use_processes: Hash misses in a process pool instead of threads
+        progress: Optional callback(path, digest, cached) called once per file
+
+    Returns:
+        Dict mapping each input path (as given, stringified) to its digest, or None on error
+    """
+    results: Dict[str, Optional[str]] = {}
+    pending: List[Tuple[str, str, Optional[Tuple[int, int, int]]]] = []
+
+    for file_path in file_paths:
+        original = str(file_path)
+        path = os.path.abspath(original)
+        stat_key = _stat_key(path)
+        digest = cache.get(path, stat_key) if cache is not None and stat_key is not None else None
+        if digest is not None:
+            results[original] = digest
+            if progress:
+                progress(original, digest, True)
+        else:
+            pending.append((original, path, stat_key))
+
+    if not pending:
+        return results
+
+    executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    new_entries = []
+    with executor_cls(max_workers=max(1, max_workers)) as executor:
+        chunksize = max(1, len(pending) // (max(1, max_workers) * 4)) if use_processes else 1
+        hashed = executor.map(_hash_one, [path for _, path, _ in pending], chunksize=chunksize)
+        for (original, path, stat_key), (_, digest) in zip(pending, hashed):
+            results[original] = digest
+            if digest is not None and stat_key is not None:
+                new_entries.append((path, stat_key, digest))
+            if progress:
+                progress(original, digest, False)
+            if cache is not None and len(new_entries) >= 1000:
+                cache.put_many(new_entries)
+                new_entries = []
+
+    if cache is not None:
+        cache.put_many(new_entries)
+    return results
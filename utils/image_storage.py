@@ -7,34 +7,95 @@ using SHA256 hashes. Supports both local filesystem and Supabase Storage backend
 
 import hashlib
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple, Dict, Any, BinaryIO
+from typing import Optional, Tuple, Dict, Any, BinaryIO, Iterable, List, Set
 import logging
 import os
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timezone
+
+from utils.hash_cache import READ_CHUNK_SIZE, HashCache, hash_file, hash_files
 
 logger = logging.getLogger(__name__)
 
+# Bytes read to find image dimensions: PNG needs 24, JPEG SOF markers can follow
+# sizeable EXIF/ICC segments
+HEADER_READ_SIZE = 64 * 1024
+
+# JPEG start-of-frame markers (SOF0-SOF15 except DHT, JPG and DAC)
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def read_image_dimensions(header: bytes) -> Optional[Tuple[int, int]]:
+    """
+    (width, height) from the first bytes of a PNG or JPEG file, without decoding it.
+    
+    Args:
+        header: Leading bytes of the file (the whole file is fine too)
+        
+    Returns:
+        (width, height), or None if the format isn't recognised or the header is too short
+    """
+    if header[:8] == b'\x89PNG\r\n\x1a\n' and header[12:16] == b'IHDR' and len(header) >= 24:
+        return int.from_bytes(header[16:20], 'big'), int.from_bytes(header[20:24], 'big')
+    
+    if header[:2] == b'\xff\xd8':
+        i = 2
+        while i + 9 <= len(header):
+            if header[i] != 0xFF:
+                return None
+            marker = header[i + 1]
+            if marker == 0xFF:  # Fill byte
+                i += 1
+                continue
+            if marker in _JPEG_SOF_MARKERS:
+                height = int.from_bytes(header[i + 5:i + 7], 'big')
+                width = int.from_bytes(header[i + 7:i + 9], 'big')
+                return width, height
+            if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # Standalone markers
+                i += 2
+                continue
+            i += 2 + int.from_bytes(header[i + 2:i + 4], 'big')
+    return None
+
 
 class ImageStorage:
     """Manages image storage with SHA256-based deduplication."""
     
-    def __init__(self, backend_type: str = 'local', base_cache_dir: str = 'imagecache'):
+    def __init__(self, backend_type: str = 'local', base_cache_dir: str = 'imagecache',
+                 hash_cache: Optional[HashCache] = None, supabase_client=None,
+                 read_cache_max_bytes: Optional[int] = None):
         """
         Initialize ImageStorage.
         
         Args:
             backend_type: 'local' or 'supabase'
             base_cache_dir: Base directory for local image cache
+            hash_cache: Optional persistent digest cache for unchanged source files
+            supabase_client: Existing Supabase client to reuse instead of creating one
+            read_cache_max_bytes: Size cap for Supabase images cached under base_cache_dir
+                (defaults to IMAGE_READ_CACHE_MB, 1024 MB)
         """
         self.backend_type = backend_type
         self.base_cache_dir = Path(base_cache_dir)
-        self.supabase_client = None
+        self.hash_cache = hash_cache
+        self.supabase_client = supabase_client
+        if read_cache_max_bytes is None:
+            read_cache_max_bytes = int(float(os.getenv('IMAGE_READ_CACHE_MB', '1024')) * 1024 * 1024)
+        self.read_cache_max_bytes = read_cache_max_bytes
+        self._read_cache_bytes: Optional[int] = None  # Sized lazily on first fetch
+        self._evict_above = read_cache_max_bytes  # Raised when what's left can't be evicted
+        self._pending_access: Dict[str, None] = {}  # Hashes read since the last last_accessed update
+        self._last_access_flush = time.time()
+        self._cache_lock = threading.Lock()
+        self._known_remote: Set[str] = set()  # Hashes known to be in the Supabase bucket
         
         if backend_type == 'local':
             # Ensure local cache directory exists
             self.base_cache_dir.mkdir(parents=True, exist_ok=True)
-        elif backend_type == 'supabase':
+        elif backend_type == 'supabase' and supabase_client is None:
             self._init_supabase()
     
     def _init_supabase(self):
@@ -62,11 +123,7 @@ class ImageStorage:
         Returns:
             SHA256 hash as hex string
         """
-        sha256_hash = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(8192), b""):
-                sha256_hash.update(chunk)
-        return sha256_hash.hexdigest()
+        return hash_file(file_path, self.hash_cache)
     
     def compute_sha256_from_bytes(self, data: bytes) -> str:
         """
@@ -121,6 +178,63 @@ class ImageStorage:
         
         return storage_path
     
+    def ingest_local(self, source_path: Path) -> Tuple[str, str, Dict[str, Any], bool]:
+        """
+        Hash and store an image in the local cache in a single pass over the source.
+        
+        The source is streamed once into a temp file inside base_cache_dir while it is
+        hashed, then atomically renamed to its sha256/ab/cd/<hash> path, or discarded if
+        that content is already stored. Concurrent importers are safe: each writes its
+        own temp file, and a rename over an existing entry replaces identical bytes.
+        When the hash cache already knows the file and the content is stored, only the
+        header is read.
+        
+        Args:
+            source_path: Path to source image file
+            
+        Returns:
+            Tuple of (content_hash, storage_path, metadata, newly stored)
+        """
+        source_path = Path(source_path)
+        content_hash = self.hash_cache.get(source_path) if self.hash_cache else None
+        if content_hash is not None:
+            storage_path = self.get_storage_path(content_hash, source_path.suffix)
+            if (self.base_cache_dir / storage_path).exists():
+                logger.info(f"Image already exists (deduplicated): {content_hash[:8]}...")
+                return content_hash, storage_path, self.get_image_metadata(source_path), False
+        
+        self.base_cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.base_cache_dir / f".ingest-{os.getpid()}-{threading.get_ident()}.tmp"
+        sha256_hash = hashlib.sha256()
+        header = b''
+        try:
+            with open(source_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                for chunk in iter(lambda: src.read(READ_CHUNK_SIZE), b""):
+                    sha256_hash.update(chunk)
+                    dst.write(chunk)
+                    if len(header) < HEADER_READ_SIZE:
+                        header += chunk[:HEADER_READ_SIZE - len(header)]
+            content_hash = sha256_hash.hexdigest()
+            storage_path = self.get_storage_path(content_hash, source_path.suffix)
+            full_path = self.base_cache_dir / storage_path
+            
+            if full_path.exists():
+                stored = False
+                logger.info(f"Image already exists (deduplicated): {content_hash[:8]}...")
+            else:
+                full_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copystat(source_path, tmp_path)  # Keep copy2's timestamps
+                os.replace(tmp_path, full_path)
+                stored = True
+                logger.info(f"Stored new image: {content_hash[:8]}... -> {storage_path}")
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        
+        if self.hash_cache:
+            self.hash_cache.put(source_path, content_hash)
+        return content_hash, storage_path, self.get_image_metadata(source_path, header=header), stored
+    
     def store_supabase(self, source_path: Path, content_hash: str) -> str:
         """
         Store image in Supabase Storage with SHA256-based path.
@@ -133,6 +247,9 @@ class ImageStorage:
             Storage path in Supabase bucket
         """
         storage_path = self.get_storage_path(content_hash, source_path.suffix)
+        if content_hash in self._known_remote:
+            logger.info(f"Image already exists in Supabase (deduplicated): {content_hash[:8]}...")
+            return storage_path
         
         # Check if file already exists (deduplication)
         try:
@@ -171,12 +288,17 @@ class ImageStorage:
         }
         return content_types.get(extension.lower(), 'application/octet-stream')
     
-    def get_image_metadata(self, file_path: Path) -> Dict[str, Any]:
+    def get_image_metadata(self, file_path: Path, header: Optional[bytes] = None) -> Dict[str, Any]:
         """
         Extract image metadata.
         
+        Dimensions come from the PNG IHDR chunk or JPEG SOF marker; PIL is only
+        used for other formats.
+        
         Args:
             file_path: Path to image file
+            header: Leading bytes of the file if the caller already has them
+                (e.g. from hashing or uploading), saving a read
             
         Returns:
             Dictionary with metadata (file_size, content_type, etc.)
@@ -187,6 +309,18 @@ class ImageStorage:
             'content_type': self._get_content_type(file_path.suffix),
         }
         
+        try:
+            if header is None:
+                with open(file_path, 'rb') as f:
+                    header = f.read(HEADER_READ_SIZE)
+            dimensions = read_image_dimensions(header)
+        except OSError as e:
+            logger.debug(f"Could not read image header: {e}")
+            dimensions = None
+        if dimensions:
+            metadata['width'], metadata['height'] = dimensions
+            return metadata
+        
         # Try to get image dimensions (optional)
         try:
             from PIL import Image
@@ -208,20 +342,163 @@ class ImageStorage:
         Returns:
             Tuple of (content_hash, storage_path, metadata)
         """
+        if self.backend_type != 'supabase':
+            # Hash, copy and read dimensions in one pass
+            content_hash, storage_path, metadata, _ = self.ingest_local(source_path)
+            return content_hash, storage_path, metadata
+        
         # Compute hash
         content_hash = self.compute_sha256(source_path)
-        
-        # Store based on backend type
-        if self.backend_type == 'supabase':
-            storage_path = self.store_supabase(source_path, content_hash)
-        else:
-            storage_path = self.store_local(source_path, content_hash)
+        storage_path = self.store_supabase(source_path, content_hash)
         
         # Get metadata
         metadata = self.get_image_metadata(source_path)
         
         return content_hash, storage_path, metadata
     
+    def _find_existing_remote(self, storage_paths: Dict[str, str]) -> Set[str]:
+        """
+        Which content hashes are already in the Supabase bucket.
+        
+        Hashes registered in image_assets are checked 100 at a time; the rest are
+        checked with one storage list() per sha256/ab/cd prefix directory.
+        
+        Args:
+            storage_paths: content_hash -> storage path
+            
+        Returns:
+            Set of content hashes that don't need uploading
+        """
+        existing = {h for h in storage_paths if h in self._known_remote}
+        unknown = [h for h in storage_paths if h not in existing]
+        
+        try:
+            for start in range(0, len(unknown), 100):
+                response = self.supabase_client.table('image_assets').select('content_hash').eq(
+                    'storage_type', 'supabase'
+                ).in_('content_hash', unknown[start:start + 100]).execute()
+                existing.update(row['content_hash'].strip() for row in response.data or [])
+        except Exception as e:
+            logger.debug(f"image_assets existence check failed, listing storage instead: {e}")
+        
+        by_directory: Dict[str, List[str]] = {}
+        for content_hash in unknown:
+            if content_hash not in existing:
+                directory, _, name = storage_paths[content_hash].rpartition('/')
+                by_directory.setdefault(directory, []).append(name)
+        bucket = self.supabase_client.storage.from_('imagecache')
+        for directory, names in by_directory.items():
+            try:
+                listed = {entry.get('name') for entry in bucket.list(path=directory) or []}
+            except Exception as e:
+                logger.debug(f"Error listing {directory} (likely doesn't exist): {e}")
+                continue
+            existing.update(Path(name).stem for name in names if name in listed)
+        
+        self._known_remote.update(existing)
+        return existing
+    
+    def _upload_supabase(self, source_path: Path, storage_path: str):
+        """Upload one file to the Supabase bucket (an already-present object counts as success)"""
+        try:
+            with open(source_path, 'rb') as f:
+                self.supabase_client.storage.from_('imagecache').upload(
+                    storage_path, f, file_options={'content-type': self._get_content_type(source_path.suffix)}
+                )
+        except Exception as e:
+            if 'Duplicate' not in str(e) and '409' not in str(e):
+                raise
+    
+    def store_images(self, source_paths: Iterable[Path], max_workers: int = 8) -> Dict[str, Dict[str, Any]]:
+        """
+        Store many images at once: hash, check existence in bulk, upload only what's missing.
+        
+        Unlike store_image, a failed Supabase upload is reported rather than silently
+        stored locally.
+        
+        Args:
+            source_paths: Image files to store
+            max_workers: Concurrent hashing/upload workers
+            
+        Returns:
+            Dict mapping each source path (stringified) to its outcome:
+            {'status': 'uploaded' | 'exists' | 'stored' | 'failed', 'content_hash',
+             'storage_path', 'metadata', 'error'}
+        """
+        source_paths = [Path(p) for p in source_paths]
+        report: Dict[str, Dict[str, Any]] = {}
+        
+        if self.backend_type != 'supabase':
+            # One read and at most one write per image
+            def ingest(source_path: Path) -> Dict[str, Any]:
+                try:
+                    content_hash, storage_path, metadata, stored = self.ingest_local(source_path)
+                except OSError as e:
+                    return {'status': 'failed', 'content_hash': None, 'storage_path': None,
+                            'metadata': None, 'error': str(e)}
+                return {'status': 'stored' if stored else 'exists', 'content_hash': content_hash,
+                        'storage_path': storage_path, 'metadata': metadata, 'error': None}
+            
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                for source_path, outcome in zip(source_paths, executor.map(ingest, source_paths)):
+                    report[str(source_path)] = outcome
+            return report
+        
+        digests = hash_files(source_paths, self.hash_cache, max_workers=max_workers)
+        by_hash: Dict[str, List[Path]] = {}  # content_hash -> files with that content
+        
+        for source_path in source_paths:
+            content_hash = digests.get(str(source_path))
+            outcome = {'status': 'failed', 'content_hash': content_hash, 'storage_path': None,
+                       'metadata': None, 'error': None}
+            report[str(source_path)] = outcome
+            if content_hash is None:
+                outcome['error'] = 'could not read file'
+                continue
+            try:
+                outcome['metadata'] = self.get_image_metadata(source_path)
+            except OSError as e:
+                outcome['error'] = str(e)
+                continue
+            outcome['storage_path'] = self.get_storage_path(content_hash, source_path.suffix)
+            by_hash.setdefault(content_hash, []).append(source_path)
+        
+        def finish(content_hash: str, status: str, error: Optional[str] = None):
+            for source_path in by_hash[content_hash]:
+                report[str(source_path)].update(status=status, error=error)
+                status = 'exists' if status == 'uploaded' else status  # Duplicates in this call
+        
+        existing = self._find_existing_remote(
+            {content_hash: report[str(paths[0])]['storage_path'] for content_hash, paths in by_hash.items()}
+        )
+        for content_hash in existing:
+            finish(content_hash, 'exists')
+        
+        def upload(content_hash: str) -> Tuple[str, Optional[str]]:
+            source_path = by_hash[content_hash][0]
+            try:
+                self._upload_supabase(source_path, report[str(source_path)]['storage_path'])
+                return content_hash, None
+            except Exception as e:
+                return content_hash, str(e)
+        
+        missing = [content_hash for content_hash in by_hash if content_hash not in existing]
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(missing)))) as executor:
+                for content_hash, error in executor.map(upload, missing):
+                    if error is None:
+                        self._known_remote.add(content_hash)
+                        finish(content_hash, 'uploaded')
+                    else:
+                        logger.error(f"Failed to upload {content_hash[:8]}... to Supabase: {error}")
+                        finish(content_hash, 'failed', error)
+        
+        counts: Dict[str, int] = {}
+        for outcome in report.values():
+            counts[outcome['status']] = counts.get(outcome['status'], 0) + 1
+        logger.info(f"Stored {len(report)} images: " + ", ".join(f"{n} {k}" for k, n in sorted(counts.items())))
+        return report
+    
     def get_local_path(self, content_hash: str, extension: str = '.png') -> Path:
         """
         Get local filesystem path for a content hash.
@@ -236,6 +513,137 @@ class ImageStorage:
         storage_path = self.get_storage_path(content_hash, extension)
         return self.base_cache_dir / storage_path
     
+    def fetch_cached(self, storage_path: str) -> Optional[Path]:
+        """
+        Read-through local copy of a Supabase screenshot.
+        
+        Images are content-addressed, so a file already at base_cache_dir/storage_path
+        is always current and is served without contacting storage. On a miss the image
+        is downloaded, checked against its hash and written there, evicting the least
+        recently accessed Supabase images (per image_assets.last_accessed) once the
+        cache exceeds read_cache_max_bytes.
+        
+        Args:
+            storage_path: Path from image_assets (e.g., 'sha256/ab/cd/hash.png')
+            
+        Returns:
+            Local file path, or None if the image could not be fetched
+        """
+        if not storage_path:
+            return None
+        full_path = self.base_cache_dir / storage_path
+        content_hash = Path(storage_path).stem
+        
+        if full_path.exists():
+            self._record_access(content_hash, full_path)
+            return full_path
+        
+        if self.supabase_client is None:
+            return None
+        
+        try:
+            data = self.supabase_client.storage.from_('imagecache').download(storage_path)
+        except Exception as e:
+            logger.warning(f"Failed to fetch {storage_path} from Supabase: {e}")
+            return None
+        
+        if self.compute_sha256_from_bytes(data) != content_hash:
+            logger.error(f"Downloaded image does not match its hash, not caching: {storage_path}")
+            return None
+        
+        # Write atomically so a concurrent reader never sees a partial file
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = full_path.with_name(f"{full_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, full_path)
+        logger.debug(f"Cached Supabase image: {content_hash[:8]}... -> {full_path}")
+        
+        with self._cache_lock:
+            if self._read_cache_bytes is not None:
+                self._read_cache_bytes += len(data)
+        self._record_access(content_hash, full_path)
+        self._enforce_read_cache_limit()
+        return full_path
+    
+    def _record_access(self, content_hash: str, full_path: Path):
+        """Note a cache read; last_accessed is updated in image_assets in batches"""
+        try:
+            os.utime(full_path)  # Local recency for assets image_assets doesn't know about
+        except OSError:
+            pass
+        with self._cache_lock:
+            self._pending_access[content_hash] = None
+            due = len(self._pending_access) >= 50 or time.time() - self._last_access_flush >= 60
+        if due:
+            self.flush_access_times()
+    
+    def flush_access_times(self):
+        """Write pending cache reads to image_assets.last_accessed"""
+        with self._cache_lock:
+            hashes = list(self._pending_access)
+            self._pending_access = {}
+            self._last_access_flush = time.time()
+        if not hashes or self.supabase_client is None:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        try:
+            for start in range(0, len(hashes), 100):
+                self.supabase_client.table('image_assets').update({'last_accessed': now}).in_(
+                    'content_hash', hashes[start:start + 100]
+                ).execute()
+        except Exception as e:
+            logger.debug(f"Could not update image_assets.last_accessed: {e}")
+    
+    def _enforce_read_cache_limit(self):
+        """Evict least recently accessed Supabase images once the cache is over its cap"""
+        cache_root = self.base_cache_dir / 'sha256'
+        with self._cache_lock:
+            if self._read_cache_bytes is None:
+                self._read_cache_bytes = sum(p.stat().st_size for p in cache_root.rglob('*') if p.is_file())
+            if self._read_cache_bytes <= self._evict_above:
+                return
+        
+        # Only images whose primary copy is in Supabase may be evicted; local-backend
+        # assets share this directory and are the only copy
+        files = {p.stem: p for p in cache_root.rglob('*') if p.is_file() and not p.name.endswith('.tmp')}
+        self.flush_access_times()
+        last_accessed = {}
+        try:
+            hashes = list(files)
+            for start in range(0, len(hashes), 100):
+                response = self.supabase_client.table('image_assets').select(
+                    'content_hash,last_accessed'
+                ).eq('storage_type', 'supabase').in_('content_hash', hashes[start:start + 100]).execute()
+                for row in response.data or []:
+                    last_accessed[row['content_hash'].strip()] = row['last_accessed'] or ''
+        except Exception as e:
+            logger.warning(f"Skipping image cache eviction, could not read image_assets: {e}")
+            return
+        
+        # Oldest first; ties (e.g. never updated) broken by local file time
+        candidates = sorted(last_accessed, key=lambda h: (last_accessed[h], files[h].stat().st_mtime))
+        target = int(self.read_cache_max_bytes * 0.9)
+        evicted = 0
+        with self._cache_lock:
+            for content_hash in candidates:
+                if self._read_cache_bytes <= target:
+                    break
+                path = files[content_hash]
+                try:
+                    size = path.stat().st_size
+                    path.unlink()
+                except OSError:
+                    continue
+                self._read_cache_bytes -= size
+                evicted += 1
+            # Don't rescan on every fetch when local-backend images alone exceed the cap
+            self._evict_above = max(self.read_cache_max_bytes,
+                                    self._read_cache_bytes + self.read_cache_max_bytes // 10)
+        if evicted:
+            logger.info(f"Evicted {evicted} cached Supabase images "
+                        f"({self._read_cache_bytes / 1024 / 1024:.0f} MB remain)")
+    
     def delete_image(self, content_hash: str, storage_path: str, storage_type: str) -> bool:
         """
         Delete image from storage.
@@ -0,0 +1,99 @@
+"""
+Vectorized status bucketing for PharmChecker results
+Shared by the Results Matrix, States dashboard, detail views and ApiDatabaseManager
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class StatusThresholds:
+    """Address score cut-offs for match buckets (score >= match -> 'match', >= weak_match -> 'weak match')"""
+    match: float = float(os.getenv('STATUS_MATCH_THRESHOLD', '85'))
+    weak_match: float = float(os.getenv('STATUS_WEAK_MATCH_THRESHOLD', '60'))
+
+
+DEFAULT_THRESHOLDS = StatusThresholds()
+
+# Rule sets, evaluated in order before falling back to score buckets.
+#   not_found       result_status 'no_results_found' -> 'not found'
+#   missing_result  no result_id -> 'no data'
+#   validated       any override -> 'validated'
+#   validated_kind  'empty'/'present' overrides -> 'validated empty'/'validated present'
+#   empty_no_data   'empty' override -> 'no data'
+#   present_scored  'present' override -> score bucket (skips later rules)
+MATRIX_RULES = ('not_found', 'missing_result', 'validated')
+VALIDATION_RULES = ('validated_kind',)
+COMPUTED_FIELD_RULES = ('empty_no_data', 'present_scored', 'missing_result')
+
+
+def _column(df: pd.DataFrame, name: str) -> pd.Series:
+    """Column by name, or an all-null column when it's absent"""
+    if name in df.columns:
+        return df[name]
+    return pd.Series(None, index=df.index, dtype=object)
+
+
+def score_buckets(scores, thresholds: StatusThresholds = DEFAULT_THRESHOLDS) -> np.ndarray:
+    """Bucket overall scores into 'match' / 'weak match' / 'no match', 'no data' for missing scores"""
+    values = pd.to_numeric(pd.Series(scores), errors='coerce').to_numpy(dtype=float)
+    return np.select(
+        [np.isnan(values), values >= thresholds.match, values >= thresholds.weak_match],
+        ['no data', 'match', 'weak match'],
+        default='no match'
+    ).astype(object)
+
+
+def calculate_status_buckets(df: pd.DataFrame, rules: Sequence[str] = VALIDATION_RULES,
+                             thresholds: Optional[StatusThresholds] = None) -> np.ndarray:
+    """
+    Compute a status bucket for every row of a results DataFrame in one pass.
+
+    Args:
+        df: Results with any of override_type, score_overall, result_status, result_id
+        rules: Ordered rule names (see MATRIX_RULES etc.) applied before score buckets
+        thresholds: Score cut-offs (defaults to DEFAULT_THRESHOLDS)
+
+    Returns:
+        Object array of status bucket strings aligned with df's rows
+    """
+    if df.empty:
+        return np.array([], dtype=object)
+
+    thresholds = thresholds or DEFAULT_THRESHOLDS
+    override_type = _column(df, 'override_type')
+    result_id = df['result_id'] if 'result_id' in df.columns else _column(df, 'latest_result_id')
+    scored = score_buckets(_column(df, 'score_overall').to_numpy(), thresholds)
+
+    conditions = []
+    choices = []
+    for rule in rules:
+        if rule == 'not_found':
+            conditions.append((_column(df, 'result_status') == 'no_results_found').to_numpy())
+            choices.append('not found')
+        elif rule == 'missing_result':
+            conditions.append(result_id.isna().to_numpy())
+            choices.append('no data')
+        elif rule == 'validated':
+            conditions.append(override_type.notna().to_numpy())
+            choices.append('validated')
+        elif rule == 'validated_kind':
+            conditions.extend([(override_type == 'empty').to_numpy(), (override_type == 'present').to_numpy()])
+            choices.extend(['validated empty', 'validated present'])
+        elif rule == 'empty_no_data':
+            conditions.append((override_type == 'empty').to_numpy())
+            choices.append('no data')
+        elif rule == 'present_scored':
+            conditions.append((override_type == 'present').to_numpy())
+            choices.append(scored)
+        else:
+            raise ValueError(f"Unknown status rule: {rule}")
+
+    if not conditions:
+        return scored
+    return np.select(conditions, choices, default=scored).astype(object)
@@ -9,6 +9,8 @@ from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 import logging
 
+from utils.status import calculate_status_buckets, VALIDATION_RULES
+
 logger = logging.getLogger(__name__)
 
 def initialize_loaded_data_state():
@@ -35,24 +37,12 @@ def get_validated_license(row: pd.Series) -> Optional[str]:
 
 def calculate_status_simple(row: pd.Series) -> str:
     """Single status calculation function using database JOIN fields"""
-    
-    # Check validation status first (HIGHEST PRIORITY)
-    override_type = row.get('override_type')
-    if override_type == 'empty':
-        return 'validated empty'
-    elif override_type == 'present':
-        return 'validated present'
-    
-    # Fall back to score-based status
-    score = row.get('score_overall')
-    if pd.isna(score): 
-        return 'no data'
-    elif score >= 85: 
-        return 'match'
-    elif score >= 60: 
-        return 'weak match'  
-    else: 
-        return 'no match'
+    return calculate_status_simple_column(row.to_frame().T)[0]
+
+def calculate_status_simple_column(df: pd.DataFrame):
+    """Vectorized calculate_status_simple over every row of a DataFrame"""
+    # Validation status first (HIGHEST PRIORITY), then score-based status
+    return calculate_status_buckets(df, VALIDATION_RULES)
 
 
 def load_dataset_combination(pharmacies_tag: str, states_tag: str, validated_tag: Optional[str] = None) -> bool: